@@ -1,101 +1,140 @@
-"""BigQuery data loading with Streamlit caching."""
+"""Warehouse data loading with Streamlit caching.
+
+Loaders cache their results per data version: the transform records a new
+version in ``data_versions`` each time it publishes the analytics tables,
+so cached results are reused until new data is published, not for a fixed
+time. They also read the tables that version names rather than the
+analytics views, which the transform repoints one at a time, so every
+loader sees the same version.
+"""
+
+import functools
+import json
 
 import pandas as pd
 import streamlit as st
 from google.cloud import bigquery
 
-from utils.bq_client import DATASET, PROJECT, get_client
+from utils.warehouse import run_query, table
+
+# Seconds between checks for a newly published data version
+DATA_VERSION_TTL = 60
+# Cached results kept per loader, across data versions
+CACHE_ENTRIES = 256
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL)
+def load_data_version() -> tuple[int, dict]:
+    """Newest data version published by the transform and the table behind
+    each analytics view at that version (0 and no tables before the first)."""
+    df = run_query(f"SELECT version, tables FROM {table('data_versions')} ORDER BY version DESC LIMIT 1")
+    if df.empty:
+        return 0, {}
+    return int(df["version"].iloc[0]), json.loads(df["tables"].iloc[0])
+
+
+def analytics_table(tables: dict, name: str) -> str:
+    """Reference to the table behind analytics view ``name`` in ``tables``
+    (the view itself before the first data version)."""
+    return table(tables.get(name, name))
 
 
-@st.cache_data(ttl=3600)
-def load_series(series_id: str, start_date: str = "2000-01-01") -> pd.DataFrame:
+def cached_per_version(loader):
+    """Cache ``loader``'s results like ``st.cache_data``, keyed on the
+    current data version as well as its arguments. ``loader`` is passed
+    that version's tables (see ``load_data_version``) first."""
+    def cached(data_version: int, _tables: dict, *args, **kwargs):
+        return loader(_tables, *args, **kwargs)
+
+    # Streamlit keys a function's cache on its qualified name and source,
+    # which would otherwise be the same for every loader.
+    cached.__qualname__ = f"{loader.__qualname__}_per_version"
+    cached = st.cache_data(max_entries=CACHE_ENTRIES)(cached)
+
+    @functools.wraps(loader)
+    def load(*args, **kwargs):
+        return cached(*load_data_version(), *args, **kwargs)
+
+    return load
+
+
+@cached_per_version
+def load_series(tables: dict, series_id: str, start_date: str = "2000-01-01") -> pd.DataFrame:
     """Load analytics data for a single series."""
-    client = get_client()
     query = f"""
         SELECT
             observation_date, value,
             mom_change, mom_pct_change,
             yoy_change, yoy_pct_change,
             ma_3m, ma_12m, z_score_5y
-        FROM `{PROJECT}.{DATASET}.analytics_monthly`
+        FROM {analytics_table(tables, 'analytics_monthly')}
         WHERE series_id = @series_id
           AND observation_date >= @start_date
         ORDER BY observation_date
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("series_id", "STRING", series_id),
-            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
-        ]
-    )
-    return client.query(query, job_config=job_config).to_dataframe()
-
-
-@st.cache_data(ttl=3600)
-def load_latest_values() -> pd.DataFrame:
-    """Load the most recent value for every series (for the overview scorecard)."""
-    client = get_client()
+    params = [
+        bigquery.ScalarQueryParameter("series_id", "STRING", series_id),
+        bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
+    ]
+    return run_query(query, params)
+
+
+@cached_per_version
+def load_latest_values(tables: dict) -> pd.DataFrame:
+    """Load the most recent value for every series (for the overview scorecard).
+
+    Reads ``analytics_latest``, the one-row-per-series snapshot the
+    transform publishes alongside ``analytics_monthly``.
+    """
     query = f"""
-        WITH latest AS (
-            SELECT
-                series_id,
-                observation_date,
-                value,
-                mom_change,
-                mom_pct_change,
-                yoy_change,
-                yoy_pct_change,
-                z_score_5y,
-                ROW_NUMBER() OVER (PARTITION BY series_id ORDER BY observation_date DESC) AS rn
-            FROM `{PROJECT}.{DATASET}.analytics_monthly`
-        )
-        SELECT * EXCEPT(rn)
-        FROM latest
-        WHERE rn = 1
+        SELECT
+            series_id, observation_date, value,
+            mom_change, mom_pct_change,
+            yoy_change, yoy_pct_change,
+            z_score_5y, prev_observation_date, prev_value
+        FROM {analytics_table(tables, 'analytics_latest')}
         ORDER BY series_id
     """
-    return client.query(query).to_dataframe()
+    return run_query(query)
 
 
-@st.cache_data(ttl=3600)
-def load_multiple_series(series_ids: list[str], start_date: str = "2000-01-01") -> pd.DataFrame:
+@cached_per_version
+def load_multiple_series(tables: dict, series_ids: list[str], start_date: str = "2000-01-01") -> pd.DataFrame:
     """Load analytics data for multiple series."""
-    client = get_client()
     query = f"""
         SELECT
             series_id, observation_date, value,
             mom_change, mom_pct_change,
             yoy_change, yoy_pct_change,
             ma_3m, ma_12m, z_score_5y
-        FROM `{PROJECT}.{DATASET}.analytics_monthly`
+        FROM {analytics_table(tables, 'analytics_monthly')}
         WHERE series_id IN UNNEST(@series_ids)
           AND observation_date >= @start_date
         ORDER BY series_id, observation_date
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
-            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
-        ]
-    )
-    return client.query(query, job_config=job_config).to_dataframe()
-
-
-@st.cache_data(ttl=3600)
-def load_raw_series(series_id: str, start_date: str = "2000-01-01") -> pd.DataFrame:
-    """Load raw observations for a series (used for weekly data like ICSA)."""
-    client = get_client()
+    params = [
+        bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+        bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
+    ]
+    return run_query(query, params)
+
+
+@cached_per_version
+def load_weekly_series(tables: dict, series_id: str, start_date: str = "2000-01-01") -> pd.DataFrame:
+    """Load weekly analytics for a weekly series such as ICSA."""
     query = f"""
-        SELECT observation_date, value
-        FROM `{PROJECT}.{DATASET}.raw_fred_observations`
+        SELECT
+            observation_date, value,
+            wow_change, wow_pct_change,
+            yoy_change, yoy_pct_change,
+            ma_4w, iso_year, week_of_year
+        FROM {analytics_table(tables, 'analytics_weekly')}
         WHERE series_id = @series_id
           AND observation_date >= @start_date
         ORDER BY observation_date
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("series_id", "STRING", series_id),
-            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
-        ]
-    )
-    return client.query(query, job_config=job_config).to_dataframe()
+    params = [
+        bigquery.ScalarQueryParameter("series_id", "STRING", series_id),
+        bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
+    ]
+    return run_query(query, params)
@@ -0,0 +1,51 @@
+"""Run dashboard queries against BigQuery or a local DuckDB file.
+
+Queries are written in BigQuery SQL with BigQuery query parameters. With
+``WAREHOUSE_BACKEND=duckdb`` they are rewritten for DuckDB (named
+parameters, ``IN UNNEST``) and run read-only against ``DUCKDB_PATH``, on a
+connection opened for that one query.
+"""
+
+import os
+import re
+
+import pandas as pd
+from google.cloud import bigquery
+
+from utils.bq_client import DATASET, PROJECT, get_client
+
+BACKEND = os.environ.get("WAREHOUSE_BACKEND", "bigquery")
+DUCKDB_PATH = os.environ.get("DUCKDB_PATH", "labor_market.duckdb")
+
+_IN_UNNEST = re.compile(r"IN UNNEST\(@(\w+)\)")
+_PARAM = re.compile(r"@(\w+)")
+
+
+def table(name: str) -> str:
+    """Reference to a dataset table for use inside SQL."""
+    if BACKEND == "duckdb":
+        return f"{DATASET}.{name}"
+    return f"`{PROJECT}.{DATASET}.{name}`"
+
+
+def run_query(query: str, params: list | None = None) -> pd.DataFrame:
+    """Run ``query`` with BigQuery query parameters and return a DataFrame."""
+    params = params or []
+    if BACKEND != "duckdb":
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return get_client().query(query, job_config=job_config).to_dataframe()
+
+    values = {
+        p.name: p.values if isinstance(p, bigquery.ArrayQueryParameter) else p.value
+        for p in params
+    }
+    query = _PARAM.sub(r"$\1", _IN_UNNEST.sub(r"IN (SELECT UNNEST(@\1))", query))
+    # A connection holds the file lock for as long as it is open, so keep it
+    # to one query; a cached connection would lock ingest and transform out.
+    import duckdb
+
+    con = duckdb.connect(DUCKDB_PATH, read_only=True)
+    try:
+        return con.execute(query, values).df()
+    finally:
+        con.close()
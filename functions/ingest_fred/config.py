@@ -1,5 +1,7 @@
 """FRED series configuration for labor market data ingestion."""
 
+import os
+
 FRED_SERIES = [
     {
         "series_id": "PAYEMS",
@@ -144,5 +146,12 @@ FRED_SERIES = [
     },
 ]
 
-FRED_BASE_URL = "https://api.stlouisfed.org/fred/series/observations"
+# Overridable to point ingest at an offline stand-in (scripts/fake_fred.py)
+FRED_API_ROOT = os.environ.get("FRED_API_ROOT", "https://api.stlouisfed.org/fred")
+FRED_BASE_URL = f"{FRED_API_ROOT}/series/observations"
+FRED_SERIES_URL = f"{FRED_API_ROOT}/series"
 DEFAULT_OBSERVATION_START = "2000-01-01"
+
+# FRED allows 120 requests per minute per API key.
+FRED_REQUESTS_PER_MINUTE = 120
+FRED_RATE_LIMIT_BURST = 5
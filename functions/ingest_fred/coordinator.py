@@ -0,0 +1,194 @@
+"""Coordinator mode: fan an ingest request out to parallel shard invocations.
+
+The series list is split into shards, each shard is ingested by its own
+invocation, and the shard responses are merged back into the usual
+``results``/``errors`` shape. Shards are dispatched as authenticated HTTP
+calls to this same function (``INGEST_SHARD_DISPATCH=http``), or run in a
+local process pool (``INGEST_SHARD_DISPATCH=process``) as a stand-in for
+separate instances. A DuckDB file accepts one writer process at a time, so
+the process pool needs the BigQuery backend (or ``DUCKDB_PATH=:memory:``
+to exercise only the fan-out and merge).
+"""
+
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+
+from fred_client import parse_retry_after
+from workers import https_url, id_token_headers
+
+SHARD_DISPATCH = os.environ.get("INGEST_SHARD_DISPATCH", "http")  # or "process"
+# Shard invocations must finish inside the coordinator's own timeout
+SHARD_TIMEOUT = float(os.environ.get("INGEST_SHARD_TIMEOUT_SECONDS", "280"))
+# Cloud Run answers 429 (no instance free) or 503 before a shard starts, so
+# those are safe to retry; anything else may have ingested rows already.
+SHARD_RETRY_STATUS_CODES = frozenset({429, 503})
+SHARD_RETRIES = int(os.environ.get("INGEST_SHARD_RETRIES", "4"))
+SHARD_BACKOFF_SECONDS = float(os.environ.get("INGEST_SHARD_BACKOFF_SECONDS", "2"))
+SHARD_BACKOFF_MAX_SECONDS = 30.0
+
+# Relative cost of one series' history, by FRED frequency
+FREQUENCY_WEIGHT = {"monthly": 1.0, "weekly": 4.3, "daily": 30.0}
+
+
+def plan_shards(series_list: list[dict], shards: int) -> list[list[str]]:
+    """Split series into at most ``shards`` groups of similar total cost.
+
+    Series are assigned heaviest first to the currently lightest shard, so
+    weekly and daily series are spread out before monthly ones fill in.
+    """
+    shards = max(1, min(shards, len(series_list)))
+    groups = [[] for _ in range(shards)]
+    loads = [0.0] * shards
+    ordered = sorted(
+        series_list,
+        key=lambda s: FREQUENCY_WEIGHT.get(s.get("frequency"), 1.0),
+        reverse=True,
+    )
+    for series in ordered:
+        i = loads.index(min(loads))
+        groups[i].append(series["series_id"])
+        loads[i] += FREQUENCY_WEIGHT.get(series.get("frequency"), 1.0)
+    return [group for group in groups if group]
+
+
+def _shard_backoff(attempt: int, retry_after: float | None) -> float:
+    if retry_after is not None:
+        return min(retry_after, SHARD_BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(SHARD_BACKOFF_MAX_SECONDS, SHARD_BACKOFF_SECONDS * 2 ** attempt))
+
+
+def _post_shard(worker_url: str, body: dict) -> tuple[dict, int]:
+    """POST one shard, retrying 429/503 with full-jitter exponential backoff.
+
+    ``Retry-After`` is honoured, and all attempts share SHARD_TIMEOUT.
+    """
+    url = https_url(worker_url)
+    headers = id_token_headers(url)
+    deadline = time.monotonic() + SHARD_TIMEOUT
+    for attempt in range(SHARD_RETRIES + 1):
+        resp = requests.post(url, json=body, timeout=max(1.0, deadline - time.monotonic()), headers=headers)
+        if resp.status_code in SHARD_RETRY_STATUS_CODES and attempt < SHARD_RETRIES:
+            delay = _shard_backoff(attempt, parse_retry_after(resp.headers.get("Retry-After")))
+            if time.monotonic() + delay < deadline:
+                time.sleep(delay)
+                continue
+        if resp.status_code not in (200, 207):
+            raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        return resp.json(), resp.status_code
+    raise RuntimeError("unreachable")  # loop always returns or raises
+
+
+def _merge(
+    shard_ids: list[list[str]],
+    outcomes: list,
+    started: float,
+    backfill_id: str | None,
+) -> tuple[dict, int]:
+    results = {}
+    errors = {}
+    shard_stats = []
+    fred_stats = {}
+    volumes = {}
+    retry_queue = {}
+    changed = set()
+    complete = True
+    for i, (series_ids, outcome) in enumerate(zip(shard_ids, outcomes)):
+        if isinstance(outcome, Exception):
+            for sid in series_ids:
+                errors[sid] = f"shard {i}: {outcome}"
+                results[sid] = {"status": "error", "error": errors[sid]}
+            shard_stats.append({"shard": i, "series": series_ids, "error": str(outcome)})
+            complete = False
+            continue
+
+        response, status_code = outcome
+        results.update(response["results"])
+        errors.update(response["errors"])
+        shard_stats.append({
+            "shard": i,
+            "series": series_ids,
+            "status_code": status_code,
+            "wall_seconds": response["metrics"]["wall_seconds"],
+        })
+        for name, value in response["fred_client"].items():
+            fred_stats[name] = fred_stats.get(name, 0) + value
+        for name, value in response["metrics"].items():
+            if isinstance(value, int):
+                volumes[name] = volumes.get(name, 0) + value
+        if "backfill" in response:
+            complete = complete and response["backfill"]["complete"]
+        retry_queue.update(response.get("retry_queue", {}))
+        changed.update(response.get("changed_series", []))
+
+    merged = {
+        "results": results,
+        "errors": errors,
+        "metrics": {"wall_seconds": round(time.monotonic() - started, 3), "shards": shard_stats, **volumes},
+        "fred_client": fred_stats,
+        "changed_series": sorted(changed),
+    }
+    if backfill_id is not None:
+        merged["backfill"] = {"backfill_id": backfill_id, "complete": complete}
+    else:
+        merged["retry_queue"] = retry_queue
+    return merged, 200 if not errors else 207
+
+
+def run_sharded(
+    request_json: dict,
+    series_list: list[dict],
+    shards: int,
+    requests_per_minute: float,
+    worker_url: str,
+    run_ingest,
+) -> tuple[dict, int]:
+    """Ingest ``series_list`` in parallel shards; returns ``(response, status_code)``.
+
+    Each shard receives the original request with its own ``series`` list,
+    ``shards`` reset to 1, ``publish`` false (the coordinator publishes one
+    completion event for all shards) and an equal slice of the FRED rate
+    limit, since the limit applies to the API key across all shards.
+    Backfill requests must carry the ``backfill_id`` all shards checkpoint
+    under.
+    ``run_ingest`` is called directly in process mode and otherwise unused.
+    """
+    started = time.monotonic()
+    shard_ids = plan_shards(series_list, shards)
+    bodies = [
+        {
+            **request_json,
+            "series": series_ids,
+            "shards": 1,
+            "publish": False,
+            "requests_per_minute": requests_per_minute / len(shard_ids),
+        }
+        for series_ids in shard_ids
+    ]
+
+    if SHARD_DISPATCH == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=len(bodies), mp_context=multiprocessing.get_context("spawn"),
+        )
+        submit = lambda body: executor.submit(run_ingest, body)  # noqa: E731
+    else:
+        executor = ThreadPoolExecutor(max_workers=len(bodies))
+        submit = lambda body: executor.submit(_post_shard, worker_url, body)  # noqa: E731
+
+    with executor:
+        futures = [submit(body) for body in bodies]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    response, status_code = _merge(shard_ids, outcomes, started, request_json.get("backfill_id"))
+    response["results"] = {
+        s["series_id"]: response["results"][s["series_id"]] for s in series_list
+    }
+    return response, status_code
@@ -0,0 +1,76 @@
+"""Client-side change detection against per-month fingerprints of stored rows."""
+
+import hashlib
+
+
+def fingerprint(rows) -> str:
+    """MD5 over ``date=value`` pairs, matching ``stored_fingerprints`` in warehouse.py.
+
+    ``rows`` are ``(observation_date, value, ...)`` tuples in date order.
+    Values use ``%.10g`` so the Python and BigQuery renderings agree; any
+    formatting mismatch only causes a month to be re-merged, never skipped.
+    """
+    payload = ";".join(f"{row[0]}={row[1]:.10g}" for row in rows)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+class DeltaFilter:
+    """Pass through only the observations that differ from stored data.
+
+    Observations are fed in ascending date order and buffered one calendar
+    month at a time. ``stored`` maps ``YYYY-MM`` to the stored month's
+    ``(fingerprint, last_date)``. When a month closes, the fetched rows up to
+    ``last_date`` are fingerprinted: if they match, only the rows after
+    ``last_date`` (appended observations) are emitted; otherwise the whole
+    month is emitted as revised. Months with no stored data are inserts.
+    """
+
+    def __init__(self, stored: dict[str, tuple[str, str]], stage_unchanged: bool = False):
+        self.stored = stored
+        self.stage_unchanged = stage_unchanged
+        self.inserted = 0
+        self.revised = 0
+        self.unchanged = 0
+        self._month = None
+        self._rows = []
+
+    def add(self, observation_date: str, value: float, realtime_start, realtime_end) -> list[tuple]:
+        """Buffer one observation; returns rows to stage from a closed month."""
+        month = observation_date[:7]
+        out = []
+        if month != self._month:
+            out = self._close()
+            self._month = month
+        self._rows.append((observation_date, value, realtime_start, realtime_end))
+        return out
+
+    def flush(self) -> list[tuple]:
+        """Close the last buffered month; returns rows to stage."""
+        out = self._close()
+        self._month = None
+        return out
+
+    def counts(self) -> dict:
+        return {
+            "rows_inserted": self.inserted,
+            "rows_revised": self.revised,
+            "rows_unchanged": self.unchanged,
+        }
+
+    def _close(self) -> list[tuple]:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return []
+        stored = self.stored.get(self._month)
+        if stored is None:
+            self.inserted += len(rows)
+            return rows
+
+        stored_fingerprint, last_date = stored
+        known = [row for row in rows if row[0] <= last_date]
+        self.inserted += len(rows) - len(known)
+        if fingerprint(known) == stored_fingerprint:
+            self.unchanged += len(known)
+            return rows if self.stage_unchanged else rows[len(known):]
+        self.revised += len(known)
+        return rows
@@ -0,0 +1,98 @@
+"""Ingest completion events.
+
+After a run merges new or revised rows, ingest publishes an event naming the
+series that changed, and the transform runs straight away for just those
+series (``transform_on_ingest`` in functions/transform/main.py) rather than
+waiting for its schedule. ``INGEST_EVENTS=pubsub`` publishes to the Pub/Sub
+topic INGEST_EVENTS_TOPIC; ``local`` (the default) delivers the event to
+handlers subscribed on the in-process ``local_bus``, for local runs and
+offline checks; ``none`` disables events. Runs that change nothing publish
+nothing, and a sharded run publishes once, from the coordinator, for the
+series all of its shards changed.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from logs import log_event
+
+EVENTS_BACKEND = os.environ.get("INGEST_EVENTS", "local")  # or "pubsub", "none"
+EVENTS_TOPIC = os.environ.get("INGEST_EVENTS_TOPIC", "ingest-completed")
+
+
+class LocalEventBus:
+    """Synchronous in-process publish/subscribe.
+
+    Handlers run in the publishing thread, in subscription order, and their
+    exceptions propagate to the publisher.
+    """
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, handler) -> None:
+        with self._lock:
+            self._handlers[topic].append(handler)
+
+    def unsubscribe(self, topic: str, handler) -> None:
+        with self._lock:
+            self._handlers[topic].remove(handler)
+
+    def publish(self, topic: str, message: dict) -> None:
+        with self._lock:
+            handlers = list(self._handlers[topic])
+        for handler in handlers:
+            handler(message)
+
+
+local_bus = LocalEventBus()
+
+
+class PubSubPublisher:
+    def __init__(self, project: str):
+        from google.cloud import pubsub_v1
+
+        self.project = project
+        self.client = pubsub_v1.PublisherClient()
+
+    def publish(self, topic: str, message: dict) -> None:
+        topic_path = self.client.topic_path(self.project, topic)
+        self.client.publish(topic_path, json.dumps(message).encode()).result()
+
+
+_pubsub = None
+
+
+def get_publisher(project: str):
+    """Return the publisher selected by ``INGEST_EVENTS``, or None."""
+    global _pubsub
+    if EVENTS_BACKEND == "pubsub":
+        if _pubsub is None:
+            _pubsub = PubSubPublisher(project)
+        return _pubsub
+    if EVENTS_BACKEND == "local":
+        return local_bus
+    return None
+
+
+def changed_series(results: dict) -> list[str]:
+    """Series of a run's per-series results that had rows merged."""
+    return sorted(sid for sid, result in results.items() if result.get("rows_loaded", 0) > 0)
+
+
+def publish_ingest_completed(project: str, mode: str, results: dict, ingested_at: datetime) -> list[str]:
+    """Publish the completion event of a run; returns the changed series."""
+    series = changed_series(results)
+    publisher = get_publisher(project)
+    if series and publisher is not None:
+        publisher.publish(EVENTS_TOPIC, {
+            "mode": mode,
+            "series": series,
+            "ingested_at": ingested_at.isoformat(),
+        })
+        log_event("ingest_completed_event", mode=mode, topic=EVENTS_TOPIC, series=series)
+    return series
@@ -0,0 +1,248 @@
+"""Pooled HTTP client for the FRED API with rate limiting and retries."""
+
+import codecs
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import FRED_BASE_URL, FRED_SERIES_URL
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+STREAM_CHUNK_BYTES = 64 * 1024
+
+_JSON = json.JSONDecoder()
+_ARRAY_SEPARATORS = " \t\r\n,"
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by all workers of an ingest run."""
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Convert a Retry-After header (seconds or HTTP date) to seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def iter_json_array(chunks, key: str):
+    """Yield the items of the ``key`` array from a streamed JSON object.
+
+    Only the current item and the unread tail of the last chunk are held in
+    memory, so arbitrarily long observation histories parse in bounded
+    space. Assumes ``key`` names the first array-valued member with that
+    name, which holds for FRED responses.
+    """
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    marker = f'"{key}"'
+    buf = ""
+    while True:
+        start = buf.find(marker)
+        bracket = buf.find("[", start + len(marker)) if start >= 0 else -1
+        if bracket >= 0:
+            buf = buf[bracket + 1:]
+            break
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        # Keep enough of the tail that a marker split across chunks is found
+        buf = (buf[start:] if start >= 0 else buf[-len(marker):]) + decoder.decode(chunk)
+
+    pos = 0
+    while True:
+        while pos < len(buf) and buf[pos] in _ARRAY_SEPARATORS:
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            item, pos = _JSON.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise
+            buf = buf[pos:] + decoder.decode(chunk)
+            pos = 0
+            continue
+        yield item
+
+
+def _timed_chunks(chunks, metrics):
+    chunks = iter(chunks)
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        metrics.add_time("fetch", time.perf_counter() - t0)
+        if chunk is None:
+            return
+        metrics.incr("bytes_decoded", len(chunk))
+        yield chunk
+
+
+class FredClient:
+    """Keep-alive FRED session that retries transient failures.
+
+    One instance is shared by every worker in a run: the underlying urllib3
+    pool reuses TLS connections across series, every request passes through
+    the shared rate limiter, and 429/5xx responses or connection errors are
+    retried with full-jitter exponential backoff (honouring ``Retry-After``).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        rate_limiter: RateLimiter | None = None,
+        pool_size: int = 10,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        timeout: float = 30,
+    ):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retry_seconds = 0.0
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _sleep_before_retry(self, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.retry_seconds += delay
+        time.sleep(delay)
+
+    def get(self, url: str, params: dict, stream: bool = False) -> requests.Response:
+        """GET ``url`` with retries; raises on the final failed attempt.
+
+        Only the request and status line are retried; with ``stream=True``
+        errors while reading the body propagate to the caller.
+        """
+        params = {**params, "api_key": self.api_key, "file_type": "json"}
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(self._backoff(attempt, None))
+                continue
+
+            if resp.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                resp.close()
+                self._sleep_before_retry(self._backoff(attempt, retry_after))
+                continue
+
+            resp.raise_for_status()
+            return resp
+        raise RuntimeError("unreachable")  # loop always returns or raises
+
+    def iter_observations(
+        self,
+        series_id: str,
+        observation_start: str,
+        observation_end: str | None = None,
+        metrics=None,
+    ):
+        """Stream observations for a single series, one dict at a time.
+
+        With ``metrics`` (a ``metrics.Metrics``), time spent waiting on the
+        request and body reads is added to the ``fetch`` stage and the
+        body size after gzip decoding to ``bytes_decoded``.
+        """
+        params = {
+            "series_id": series_id,
+            "observation_start": observation_start,
+            "sort_order": "asc",
+        }
+        if observation_end:
+            params["observation_end"] = observation_end
+        t0 = time.perf_counter()
+        resp = self.get(FRED_BASE_URL, params, stream=True)
+        with resp:
+            chunks = resp.iter_content(STREAM_CHUNK_BYTES)
+            if metrics is not None:
+                metrics.add_time("fetch", time.perf_counter() - t0)
+                chunks = _timed_chunks(chunks, metrics)
+            yield from iter_json_array(chunks, "observations")
+
+    def fetch_last_updated(self, series_id: str) -> str:
+        """Return FRED's ``last_updated`` stamp for a series (metadata only)."""
+        resp = self.get(FRED_SERIES_URL, {"series_id": series_id})
+        return resp.json()["seriess"][0]["last_updated"]
+
+    def stats(self) -> dict:
+        """Connection-reuse and retry counters for this client."""
+        opened = 0
+        sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        return {
+            "requests": sent,
+            "connections_opened": opened,
+            "connections_reused": max(0, sent - opened),
+            "retries": self.retries,
+            "retry_seconds": round(self.retry_seconds, 3),
+        }
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,94 @@
+"""Asynchronous ingest jobs: progress tracking and worker dispatch.
+
+A request with ``"async": true`` is recorded in the ``ingest_jobs`` table
+and acknowledged with its job ID straight away. The work then runs in a
+worker, which is either a Cloud Tasks HTTP task that invokes the function
+again with ``{"job_id": ...}`` (``INGEST_JOB_DISPATCH=tasks``, the default
+on Cloud Run) or a background thread in the same instance
+(``INGEST_JOB_DISPATCH=thread``, the default for local runs). Cloud Tasks workers re-enqueue an
+unfinished backfill, so a job is not bounded by one request's timeout.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from workers import https_url
+
+# On Cloud Run (K_SERVICE set) an instance's CPU is throttled once it has
+# responded, which stalls a background thread, so "thread" is only the
+# default for local runs.
+JOB_DISPATCH = os.environ.get("INGEST_JOB_DISPATCH", "tasks" if os.environ.get("K_SERVICE") else "thread")
+TASKS_QUEUE = os.environ.get("INGEST_TASKS_QUEUE", "")  # projects/.../locations/.../queues/...
+TASKS_SERVICE_ACCOUNT = os.environ.get("INGEST_TASKS_SERVICE_ACCOUNT", "")
+# Minimum seconds between progress writes, to keep job-table DML infrequent
+PROGRESS_INTERVAL = float(os.environ.get("INGEST_JOB_PROGRESS_SECONDS", "15"))
+
+
+def new_job_id() -> str:
+    return f"ingest_{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+
+
+class JobProgress:
+    """Per-series progress for one job, written to the warehouse at most
+    every ``interval`` seconds.
+
+    Instances are callable as the ``progress(series_id, state)`` hook taken
+    by ``main.run_ingest``.
+    """
+
+    def __init__(self, warehouse, job_id: str, series: dict | None = None, interval: float = PROGRESS_INTERVAL):
+        self.warehouse = warehouse
+        self.job_id = job_id
+        self.series = dict(series or {})
+        self.interval = interval
+        self._written = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, series_id: str, state: dict) -> None:
+        with self._lock:
+            self.series[series_id] = {**self.series.get(series_id, {}), **state}
+            due = time.monotonic() - self._written >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self, status: str = "running") -> None:
+        with self._lock:
+            snapshot = dict(self.series)
+            self._written = time.monotonic()
+        self.warehouse.update_job(self.job_id, status, progress=snapshot)
+
+
+def dispatch(job_id: str, worker_url: str, run_job) -> None:
+    """Start the worker for ``job_id``.
+
+    ``run_job(job_id)`` is called in a background thread in thread mode;
+    in tasks mode a Cloud Tasks task POSTs the job ID to ``worker_url``,
+    authenticated with an OIDC token.
+    """
+    if JOB_DISPATCH != "tasks":
+        threading.Thread(target=run_job, args=(job_id,), name=job_id).start()
+        return
+
+    from google.cloud import tasks_v2
+
+    worker_url = https_url(worker_url)
+    client = tasks_v2.CloudTasksClient()
+    client.create_task(
+        parent=TASKS_QUEUE,
+        task=tasks_v2.Task(
+            http_request=tasks_v2.HttpRequest(
+                http_method=tasks_v2.HttpMethod.POST,
+                url=worker_url,
+                headers={"Content-Type": "application/json"},
+                body=json.dumps({"job_id": job_id}).encode(),
+                oidc_token=tasks_v2.OidcToken(
+                    service_account_email=TASKS_SERVICE_ACCOUNT,
+                    audience=worker_url,
+                ),
+            ),
+        ),
+    )
@@ -0,0 +1,18 @@
+"""Structured logging shared by the ingest and transform functions.
+
+Each function deploys from its own directory, so each has a copy of this
+module; tests/test_config.py checks the copies are identical.
+"""
+
+import json
+import sys
+
+
+def log_event(event: str, severity: str = "INFO", **fields) -> None:
+    """Write one structured log line.
+
+    Cloud Functions parses JSON lines on stdout into ``jsonPayload`` fields,
+    so records can be filtered and charted by ``event`` in Cloud Logging.
+    """
+    record = {"severity": severity, "message": event, "event": event, **fields}
+    print(json.dumps(record, default=str), file=sys.stdout, flush=True)
@@ -1,18 +1,52 @@
-"""Cloud Function: Ingest labor market data from FRED API into BigQuery."""
+"""Cloud Function: Ingest labor market data from FRED API into BigQuery.
 
+Set ``WAREHOUSE_BACKEND=duckdb`` to write to a local DuckDB file instead
+(see warehouse.py).
+"""
+
+import hashlib
 import json
+import logging
 import os
-from datetime import datetime, timezone
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 
 import functions_framework
-import requests
-from google.cloud import bigquery
 
-from config import DEFAULT_OBSERVATION_START, FRED_BASE_URL, FRED_SERIES
+from config import (
+    DEFAULT_OBSERVATION_START,
+    FRED_RATE_LIMIT_BURST,
+    FRED_REQUESTS_PER_MINUTE,
+    FRED_SERIES,
+)
+from coordinator import run_sharded
+from delta import DeltaFilter
+from events import changed_series, publish_ingest_completed
+from fred_client import FredClient, RateLimiter
+from jobs import JOB_DISPATCH, JobProgress, dispatch, new_job_id
+from logs import log_event
+from metrics import Metrics
+from retries import update_retry_queue
+from staging import ObservationColumns, StagingFile
+from warehouse import get_warehouse
 
 PROJECT = os.environ.get("GCP_PROJECT", "jobs-dashboard")
 DATASET = os.environ.get("BQ_DATASET", "labor_market")
-TABLE = "raw_fred_observations"
+MAX_WORKERS = int(os.environ.get("INGEST_MAX_WORKERS", "4"))
+BATCH_LOAD = os.environ.get("INGEST_BATCH_LOAD", "true").lower() == "true"
+STAGING_FORMAT = os.environ.get("INGEST_STAGING_FORMAT", "parquet")  # or "json"
+CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "5000"))
+# Parallel shard invocations per request unless the request sets "shards"
+INGEST_SHARDS = int(os.environ.get("INGEST_SHARDS", "1"))
+BACKFILL_WINDOW_YEARS = int(os.environ.get("BACKFILL_WINDOW_YEARS", "5"))
+BACKFILL_WAVE_TASKS = int(os.environ.get("BACKFILL_WAVE_TASKS", "40"))
+# Stop starting new backfill waves after this long, leaving headroom before
+# the 300s function timeout so the current wave can load and checkpoint.
+BACKFILL_TIME_BUDGET = float(os.environ.get("BACKFILL_TIME_BUDGET_SECONDS", "200"))
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_fred_api_key() -> str:
@@ -22,136 +56,589 @@ def get_fred_api_key() -> str:
     return key
 
 
-def get_last_observation_date(client: bigquery.Client, series_id: str) -> str | None:
-    """Return the most recent observation_date for a series, or None."""
-    query = f"""
-        SELECT MAX(observation_date) AS last_date
-        FROM `{PROJECT}.{DATASET}.{TABLE}`
-        WHERE series_id = @series_id
+def stream_series_rows(
+    fred: FredClient,
+    series_id: str,
+    observation_start: str,
+    staged: StagingFile,
+    observation_end: str | None = None,
+    stored: dict[str, tuple[str, str]] | None = None,
+    stage_unchanged: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+    metrics: Metrics | None = None,
+) -> dict:
+    """Stream one series from FRED into ``staged`` in fixed-size chunks.
+
+    Observations are passed through a ``DeltaFilter`` against the series'
+    ``stored`` month fingerprints, so only inserted or revised rows are
+    staged unless ``stage_unchanged`` is set. Returns ``rows_loaded`` (rows
+    staged) plus the filter's inserted/revised/unchanged counts.
+
+    ``metrics`` receives fetch, parse and stage timings along with
+    ``rows_parsed`` and ``rows_missing``. Parse time is the streaming loop
+    minus the time spent waiting on FRED or writing to ``staged``.
+    """
+    metrics = metrics if metrics is not None else Metrics()
+    delta = DeltaFilter(stored or {}, stage_unchanged=stage_unchanged)
+    count = 0
+    parsed = 0
+    missing = 0
+    chunk = ObservationColumns()
+
+    def stage(rows: list[tuple]) -> None:
+        nonlocal chunk, count
+        for obs_date, value, realtime_start, realtime_end in rows:
+            chunk.append(series_id, obs_date, value, realtime_start, realtime_end)
+        if len(chunk) >= chunk_rows:
+            with metrics.stage("stage"):
+                staged.write(chunk)
+            count += len(chunk)
+            chunk = ObservationColumns()
+
+    waited = metrics.timings["fetch"] + metrics.timings["stage"]
+    t0 = time.perf_counter()
+    for obs in fred.iter_observations(series_id, observation_start, observation_end, metrics):
+        parsed += 1
+        val = obs.get("value", ".")
+        if val == ".":
+            missing += 1
+            continue  # FRED uses "." for missing values
+        stage(delta.add(obs["date"], float(val), obs.get("realtime_start"), obs.get("realtime_end")))
+    stage(delta.flush())
+    with metrics.stage("stage"):
+        staged.write(chunk)
+    count += len(chunk)
+    waited = metrics.timings["fetch"] + metrics.timings["stage"] - waited
+    metrics.add_time("parse", time.perf_counter() - t0 - waited)
+    metrics.incr("rows_parsed", parsed)
+    metrics.incr("rows_missing", missing)
+    return {"rows_loaded": count, **delta.counts()}
+
+
+def stream_series_update(
+    fred: FredClient,
+    series_id: str,
+    observation_start: str,
+    staged: StagingFile,
+    known_last_updated: str | None = None,
+    stored: dict[str, tuple[str, str]] | None = None,
+    stage_unchanged: bool = False,
+    metrics: Metrics | None = None,
+) -> tuple[dict | None, str]:
+    """Stream a series into ``staged`` unless FRED reports no update.
+
+    Returns ``(counts, last_updated)``. ``counts`` is None when FRED's
+    last_updated stamp still equals ``known_last_updated``, in which case
+    the observations download is skipped.
     """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("series_id", "STRING", series_id),
-        ]
+    metrics = metrics if metrics is not None else Metrics()
+    with metrics.stage("fetch"):
+        last_updated = fred.fetch_last_updated(series_id)
+    if known_last_updated is not None and last_updated == known_last_updated:
+        return None, last_updated
+    counts = stream_series_rows(
+        fred, series_id, observation_start, staged, stored=stored, stage_unchanged=stage_unchanged,
+        metrics=metrics,
     )
-    rows = list(client.query(query, job_config=job_config).result())
-    if rows and rows[0].last_date:
-        return rows[0].last_date.isoformat()
-    return None
-
-
-def fetch_fred_series(api_key: str, series_id: str, observation_start: str) -> list[dict]:
-    """Fetch observations from FRED API for a single series."""
-    params = {
-        "series_id": series_id,
-        "api_key": api_key,
-        "file_type": "json",
-        "observation_start": observation_start,
-        "sort_order": "asc",
+    return counts, last_updated
+
+
+def ingest_series(
+    warehouse,
+    fred: FredClient,
+    series_id: str,
+    observation_start: str,
+    ingested_at: datetime,
+    known_last_updated: str | None = None,
+    stored: dict[str, tuple[str, str]] | None = None,
+    stage_unchanged: bool = False,
+    metrics: Metrics | None = None,
+) -> tuple[dict | None, str]:
+    """Fetch and upsert one series; returns ``(counts, last_updated)``.
+
+    ``counts`` is None when the series is unchanged since the last run.
+    """
+    staged = StagingFile(ingested_at, STAGING_FORMAT)
+    try:
+        counts, last_updated = stream_series_update(
+            fred, series_id, observation_start, staged, known_last_updated, stored, stage_unchanged,
+            metrics,
+        )
+        if counts is not None:
+            warehouse.upsert_observations(staged, [series_id])
+        return counts, last_updated
+    finally:
+        staged.close()
+
+
+def month_start(iso_date: str) -> str:
+    return iso_date[:8] + "01"
+
+
+def plan_backfill_windows(observation_start: str, end: date, window_years: int) -> list[tuple[str, str]]:
+    """Split ``observation_start``..``end`` into consecutive inclusive date windows."""
+    windows = []
+    start = date.fromisoformat(observation_start)
+    while start <= end:
+        try:
+            next_start = start.replace(year=start.year + window_years)
+        except ValueError:  # Feb 29 -> Feb 28
+            next_start = start.replace(year=start.year + window_years, day=28)
+        windows.append((start.isoformat(), min(next_start - timedelta(days=1), end).isoformat()))
+        start = next_start
+    return windows
+
+
+def default_backfill_id(observation_start: str, series_ids: list[str], window_years: int) -> str:
+    """Stable id for retries of the same backfill request on the same day."""
+    digest = hashlib.sha1(",".join(sorted(series_ids)).encode()).hexdigest()[:8]
+    return f"{date.today().isoformat()}_{observation_start}_{window_years}y_{digest}"
+
+
+def run_backfill(
+    warehouse,
+    fred: FredClient,
+    series_ids: list[str],
+    observation_start: str,
+    backfill_id: str,
+    ingested_at: datetime,
+    max_workers: int,
+    window_years: int = BACKFILL_WINDOW_YEARS,
+    deadline: float | None = None,
+    stage_unchanged: bool = False,
+    progress=None,
+) -> dict:
+    """Backfill ``series_ids`` window by window, resuming from checkpoints.
+
+    Pending ``(series, window)`` tasks are fetched in parallel in waves of
+    BACKFILL_WAVE_TASKS; each wave is upserted with one staging load and one
+    MERGE and then checkpointed. No new wave starts after ``deadline``
+    (a ``time.monotonic()`` value), so a caller can re-issue the same
+    request to continue where this one stopped. Months whose stored
+    fingerprint matches FRED are not re-merged (see ``DeltaFilter``).
+    Each series result carries its summed fetch/parse/stage ``metrics``.
+    ``progress(series_id, state)`` is called for each series after every wave.
+    """
+    windows = plan_backfill_windows(observation_start, ingested_at.date(), window_years)
+    done = warehouse.completed_windows(backfill_id)
+    stored = warehouse.stored_fingerprints(series_ids, observation_start)
+    pending = [
+        (sid, start, end)
+        for start, end in windows
+        for sid in series_ids
+        if (sid, start) not in done
+    ]
+
+    totals = {
+        sid: {"rows_loaded": 0, "rows_inserted": 0, "rows_revised": 0, "rows_unchanged": 0}
+        for sid in series_ids
     }
-    resp = requests.get(FRED_BASE_URL, params=params, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("observations", [])
-
-
-def load_to_bigquery(client: bigquery.Client, rows: list[dict]) -> int:
-    """Load rows into BigQuery using a MERGE (upsert) via a temp table."""
-    if not rows:
-        return 0
-
-    table_ref = f"{PROJECT}.{DATASET}.{TABLE}"
-    temp_table = f"{PROJECT}.{DATASET}._temp_ingest_{int(datetime.now(timezone.utc).timestamp())}"
-
-    # Load into a temporary table first
-    job_config = bigquery.LoadJobConfig(
-        schema=[
-            bigquery.SchemaField("series_id", "STRING"),
-            bigquery.SchemaField("observation_date", "DATE"),
-            bigquery.SchemaField("value", "FLOAT64"),
-            bigquery.SchemaField("realtime_start", "DATE"),
-            bigquery.SchemaField("realtime_end", "DATE"),
-            bigquery.SchemaField("ingested_at", "TIMESTAMP"),
-        ],
-        write_disposition="WRITE_TRUNCATE",
-    )
-    load_job = client.load_table_from_json(rows, temp_table, job_config=job_config)
-    load_job.result()
-
-    # MERGE from temp into target
-    merge_sql = f"""
-        MERGE `{table_ref}` AS target
-        USING `{temp_table}` AS source
-        ON target.series_id = source.series_id
-           AND target.observation_date = source.observation_date
-        WHEN MATCHED THEN
-            UPDATE SET
-                value = source.value,
-                realtime_start = source.realtime_start,
-                realtime_end = source.realtime_end,
-                ingested_at = source.ingested_at
-        WHEN NOT MATCHED THEN
-            INSERT (series_id, observation_date, value, realtime_start, realtime_end, ingested_at)
-            VALUES (source.series_id, source.observation_date, source.value,
-                    source.realtime_start, source.realtime_end, source.ingested_at)
+    series_metrics = {sid: Metrics() for sid in series_ids}
+    errors = {}
+    while pending:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        wave, pending = pending[:BACKFILL_WAVE_TASKS], pending[BACKFILL_WAVE_TASKS:]
+
+        staged = StagingFile(ingested_at, STAGING_FORMAT)
+        completed = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(wave)))) as pool:
+            futures = [
+                (task, task_metrics, pool.submit(
+                    stream_series_rows, fred, task[0], task[1], staged, task[2],
+                    stored[task[0]], stage_unchanged, metrics=task_metrics,
+                ))
+                for task, task_metrics in ((task, Metrics()) for task in wave)
+            ]
+            for (sid, start, end), task_metrics, future in futures:
+                try:
+                    completed.append((sid, start, end, future.result()))
+                except Exception as e:
+                    errors[sid] = f"{start}..{end}: {e}"
+                series_metrics[sid].merge(task_metrics)
+
+        # Rows a failed window staged for a series that also has a completed
+        # window in this wave are merged too; they are genuine FRED values,
+        # and the failed window stays un-checkpointed so it is fetched again.
+        try:
+            warehouse.upsert_observations(staged, sorted({task[0] for task in completed}))
+            warehouse.record_completed_windows(
+                backfill_id,
+                [(sid, start, end, counts["rows_loaded"]) for sid, start, end, counts in completed],
+            )
+        except Exception as e:
+            for sid, start, end, _ in completed:
+                errors[sid] = f"{start}..{end}: {e}"
+            completed = []
+        finally:
+            staged.close()
+
+        for sid, start, _, counts in completed:
+            done.add((sid, start))
+            for key, value in counts.items():
+                totals[sid][key] += value
+        if progress is not None:
+            for sid in sorted({task[0] for task in wave}):
+                progress(sid, {
+                    "status": "error" if sid in errors else "running",
+                    "windows_done": sum(1 for start, _ in windows if (sid, start) in done),
+                    "windows_total": len(windows),
+                })
+
+    windows_total = len(windows)
+    results = {}
+    for sid in series_ids:
+        windows_done = sum(1 for start, _ in windows if (sid, start) in done)
+        results[sid] = {
+            "status": "ok" if windows_done == windows_total else ("error" if sid in errors else "partial"),
+            **totals[sid],
+            "windows_done": windows_done,
+            "windows_total": windows_total,
+            "metrics": series_metrics[sid].as_dict(),
+        }
+        if sid in errors:
+            results[sid]["error"] = errors[sid]
+    return {
+        "results": results,
+        "errors": errors,
+        "backfill": {
+            "backfill_id": backfill_id,
+            "complete": all(r["windows_done"] == windows_total for r in results.values()),
+        },
+    }
+
+
+def report_run(mode: str, results: dict, run_metrics: Metrics, started: float) -> dict:
+    """Log one structured record per series and one for the run.
+
+    Returns the run-level metrics for the response: wall time, warehouse
+    stage timings and jobs, and volume counters summed over all series.
     """
-    client.query(merge_sql).result()
-    client.delete_table(temp_table, not_found_ok=True)
-    return len(rows)
+    volumes = {}
+    for sid, result in results.items():
+        log_event("ingest_series", mode=mode, series_id=sid, **result)
+        for name, value in result.get("metrics", {}).items():
+            if isinstance(value, int):
+                volumes[name] = volumes.get(name, 0) + value
+    run = {
+        "wall_seconds": round(time.monotonic() - started, 3),
+        **run_metrics.as_dict(),
+        **volumes,
+    }
+    log_event(
+        "ingest_run",
+        mode=mode,
+        series=len(results),
+        errors=sum(1 for r in results.values() if r["status"] == "error"),
+        **run,
+    )
+    return run
 
 
-@functions_framework.http
-def ingest(request):
-    """HTTP entry point for the FRED ingestion function."""
-    request_json = request.get_json(silent=True) or {}
+def run_ingest(request_json: dict, progress=None, worker_url: str = "") -> tuple[dict, int]:
+    """Run one ingest request; returns ``(response, status_code)``.
+
+    ``progress(series_id, state)``, if given, is called as each series
+    finishes (or, for backfills, after each wave). With ``shards`` > 1 the
+    series are split across parallel invocations of ``worker_url`` (see
+    coordinator.py) and progress is only available from each shard.
+    Incremental runs record failed series in the retry queue, and with
+    ``retry`` set ingest only the queued series that are due (see retries.py).
+    Runs that merge rows publish the changed series (see events.py). A
+    sharded run publishes one event for the changed series of all its
+    shards once they finish; shards are sent ``publish`` false.
+    """
+    started = time.monotonic()
+    report = progress or (lambda series_id, state: None)
     backfill = request_json.get("backfill", False)
+    retry = request_json.get("retry", False) and not backfill
     series_filter = request_json.get("series")  # optional list of series IDs
+    max_workers = int(request_json.get("max_workers", MAX_WORKERS))
+    batch = request_json.get("batch", BATCH_LOAD)
+    force = request_json.get("force", False)  # re-fetch and re-merge even if nothing changed
+    publish = request_json.get("publish", True)
+    shards = int(request_json.get("shards", INGEST_SHARDS))
+    requests_per_minute = float(request_json.get("requests_per_minute", FRED_REQUESTS_PER_MINUTE))
+
+    series_list = FRED_SERIES
+    if series_filter:
+        series_list = [s for s in FRED_SERIES if s["series_id"] in series_filter]
+
+    run_metrics = Metrics()
+    if retry:
+        due = set(get_warehouse(PROJECT, DATASET, run_metrics).due_retries(datetime.now(timezone.utc)))
+        series_list = [s for s in series_list if s["series_id"] in due]
+        if not series_list:
+            run = report_run("retry", {}, run_metrics, started)
+            return {
+                "results": {}, "errors": {}, "metrics": run, "fred_client": {}, "retry_queue": {},
+                "changed_series": [],
+            }, 200
+        request_json = {**request_json, "series": [s["series_id"] for s in series_list], "retry": False}
+
+    if shards > 1 and len(series_list) > 1:
+        if backfill and not request_json.get("backfill_id"):
+            request_json = {
+                **request_json,
+                "backfill_id": default_backfill_id(
+                    request_json.get("observation_start", DEFAULT_OBSERVATION_START),
+                    [s["series_id"] for s in series_list],
+                    int(request_json.get("window_years", BACKFILL_WINDOW_YEARS)),
+                ),
+            }
+        response, status_code = run_sharded(
+            request_json, series_list, shards, requests_per_minute, worker_url, run_ingest,
+        )
+        mode = "backfill" if backfill else "retry" if retry else "incremental"
+        response["changed_series"] = _publish_completed(
+            mode, response["results"], datetime.now(timezone.utc), publish,
+        )
+        return response, status_code
 
     api_key = get_fred_api_key()
-    client = bigquery.Client(project=PROJECT)
-    now = datetime.now(timezone.utc).isoformat()
+    warehouse = get_warehouse(PROJECT, DATASET, run_metrics)
+    now = datetime.now(timezone.utc)
+    fred = FredClient(
+        api_key,
+        rate_limiter=RateLimiter(requests_per_minute, burst=FRED_RATE_LIMIT_BURST),
+        pool_size=max(1, max_workers),
+    )
 
     results = {}
     errors = {}
 
-    series_list = FRED_SERIES
-    if series_filter:
-        series_list = [s for s in FRED_SERIES if s["series_id"] in series_filter]
+    series_ids = [s["series_id"] for s in series_list]
+    if backfill:
+        obs_start = request_json.get("observation_start", DEFAULT_OBSERVATION_START)
+        window_years = int(request_json.get("window_years", BACKFILL_WINDOW_YEARS))
+        backfill_id = request_json.get("backfill_id") or default_backfill_id(
+            obs_start, series_ids, window_years,
+        )
+        response = run_backfill(
+            warehouse, fred, series_ids, obs_start, backfill_id, now, max_workers,
+            window_years=window_years, deadline=started + BACKFILL_TIME_BUDGET,
+            stage_unchanged=force, progress=progress,
+        )
+        response["metrics"] = report_run("backfill", response["results"], run_metrics, started)
+        response["changed_series"] = _publish_completed("backfill", response["results"], now, publish)
+        response["fred_client"] = fred.stats()
+        fred.close()
+        return response, 200 if not response["errors"] else 207
 
-    for series_cfg in series_list:
-        sid = series_cfg["series_id"]
-        try:
-            if backfill:
-                obs_start = request_json.get("observation_start", DEFAULT_OBSERVATION_START)
+    # Resolve every watermark up front with a single grouped query. Fetches
+    # restart at the watermark's month so each month can be fingerprinted whole.
+    last_dates = warehouse.last_observation_dates(series_ids)
+    start_dates = {
+        sid: month_start(last_dates[sid]) if sid in last_dates else DEFAULT_OBSERVATION_START
+        for sid in series_ids
+    }
+    stored = warehouse.stored_fingerprints(series_ids, min(start_dates.values()))
+
+    # Series whose FRED last_updated matches the previous run are skipped.
+    known = {} if force else warehouse.series_state(series_ids)
+
+    # Each series runs in its own worker; failures stay isolated per future.
+    # In batch mode workers stream into one shared staging file, and every
+    # fetched series is then upserted with a single load and a single MERGE.
+    fetched = {}
+    updated_stamps = {}
+    series_metrics = {sid: Metrics() for sid in series_ids}
+    staged = StagingFile(now, STAGING_FORMAT)
+    workers = max(1, min(max_workers, len(series_list)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if batch:
+            futures = {
+                sid: pool.submit(
+                    stream_series_update, fred, sid, start_dates[sid], staged, known.get(sid),
+                    stored[sid], force, series_metrics[sid],
+                )
+                for sid in series_ids
+            }
+        else:
+            futures = {
+                sid: pool.submit(
+                    ingest_series, warehouse, fred, sid, start_dates[sid], now, known.get(sid),
+                    stored[sid], force, series_metrics[sid],
+                )
+                for sid in series_ids
+            }
+        for sid, future in futures.items():
+            try:
+                outcome, last_updated = future.result()
+            except Exception as e:
+                errors[sid] = str(e)
+                results[sid] = {"status": "error", "error": str(e)}
+                report(sid, results[sid])
+                continue
+            if outcome is None:
+                results[sid] = {"status": "unchanged"}
+                report(sid, results[sid])
+                continue
+            updated_stamps[sid] = last_updated
+            if batch:
+                fetched[sid] = outcome
+                report(sid, {"status": "fetched", **outcome})
             else:
-                last_date = get_last_observation_date(client, sid)
-                obs_start = last_date if last_date else DEFAULT_OBSERVATION_START
-
-            observations = fetch_fred_series(api_key, sid, obs_start)
-
-            rows = []
-            for obs in observations:
-                val = obs.get("value", ".")
-                if val == ".":
-                    continue  # FRED uses "." for missing values
-                rows.append({
-                    "series_id": sid,
-                    "observation_date": obs["date"],
-                    "value": float(val),
-                    "realtime_start": obs.get("realtime_start"),
-                    "realtime_end": obs.get("realtime_end"),
-                    "ingested_at": now,
-                })
+                results[sid] = {"status": "ok", **outcome}
+                report(sid, results[sid])
 
-            count = load_to_bigquery(client, rows)
-            results[sid] = {"status": "ok", "rows_loaded": count}
+    if fetched:
+        try:
+            warehouse.upsert_observations(staged, list(fetched))
+            for sid, counts in fetched.items():
+                results[sid] = {"status": "ok", **counts}
         except Exception as e:
-            errors[sid] = str(e)
-            results[sid] = {"status": "error", "error": str(e)}
-
-    status_code = 200 if not errors else 207
-    return (
-        json.dumps({"results": results, "errors": errors}, indent=2),
-        status_code,
-        {"Content-Type": "application/json"},
-    )
+            for sid in fetched:
+                errors[sid] = str(e)
+                results[sid] = {"status": "error", "error": str(e)}
+                updated_stamps.pop(sid, None)
+        for sid in fetched:
+            report(sid, results[sid])
+    staged.close()
+    results = {
+        sid: {**results[sid], "metrics": series_metrics[sid].as_dict()}
+        for sid in series_ids
+    }
+
+    # Data is already merged at this point, so a failed state write only
+    # costs a redundant fetch next run and must not fail this one.
+    try:
+        warehouse.save_series_state(updated_stamps)
+    except Exception:
+        logger.exception("Failed to record FRED last_updated state")
+    try:
+        retry_queue = update_retry_queue(warehouse, results, now)
+    except Exception:
+        logger.exception("Failed to update the ingest retry queue")
+        retry_queue = {}
+    mode = "retry" if retry else "incremental"
+    run = report_run(mode, results, run_metrics, started)
+    fred_stats = fred.stats()
+    fred.close()
+
+    response = {
+        "results": results,
+        "errors": errors,
+        "metrics": run,
+        "fred_client": fred_stats,
+        "retry_queue": retry_queue,
+        "changed_series": _publish_completed(mode, results, now, publish),
+    }
+    return response, 200 if not errors else 207
+
+
+def _publish_completed(mode: str, results: dict, now: datetime, publish: bool = True) -> list[str]:
+    """Announce the run's changed series (see events.py) unless ``publish``
+    is false, and return them.
+
+    The data is already merged, so a failed publish is logged rather than
+    failing the run; the transform's scheduled sweep still picks the series up.
+    """
+    if not publish:
+        return changed_series(results)
+    try:
+        return publish_ingest_completed(PROJECT, mode, results, now)
+    except Exception:
+        logger.exception("Failed to publish the ingest completion event")
+        return []
+
+
+def _windows_done(series_states: dict) -> int:
+    return sum(state.get("windows_done", 0) for state in series_states.values())
+
+
+def _record_results(progress, results: dict) -> None:
+    """Copy a pass's per-series results into the job's progress.
+
+    Sharded passes report no progress as they run, so without this the
+    next pass would compare its windows against a stale count.
+    """
+    for sid, result in results.items():
+        progress.series[sid] = {k: v for k, v in result.items() if k != "metrics"}
+
+
+def run_job(job_id: str, worker_url: str = "") -> dict:
+    """Worker for an asynchronous job: run its request and record the outcome.
+
+    A backfill that stops at its time budget is continued by another worker
+    invocation at ``worker_url`` (tasks mode) or another pass in this thread
+    (thread mode), reusing the job's backfill_id so checkpoints carry over.
+    It gives up once a pass completes no new windows.
+    """
+    warehouse = get_warehouse(PROJECT, DATASET)
+    job = warehouse.get_job(job_id)
+    if job is None:
+        raise KeyError(f"Unknown ingest job {job_id}")
+    request_json = job["request"]
+    progress = JobProgress(warehouse, job_id, job["progress"])
+    progress.flush("running")
+    try:
+        while True:
+            windows_before = _windows_done(progress.series)
+            response, _ = run_ingest(request_json, progress=progress, worker_url=worker_url)
+            _record_results(progress, response["results"])
+            if (
+                not request_json.get("backfill")
+                or response["backfill"]["complete"]
+                or _windows_done(response["results"]) <= windows_before
+            ):
+                break
+            if JOB_DISPATCH == "tasks":
+                progress.flush("running")
+                dispatch(job_id, worker_url, run_job)
+                return {"job_id": job_id, "status": "running"}
+    except Exception as e:
+        logger.exception("Ingest job %s failed", job_id)
+        progress.flush("failed")
+        warehouse.update_job(job_id, "failed", result={"error": str(e)})
+        return {"job_id": job_id, "status": "failed"}
+
+    complete = not request_json.get("backfill") or response["backfill"]["complete"]
+    status = "succeeded" if complete and not response["errors"] else "partial"
+    progress.flush(status)
+    warehouse.update_job(job_id, status, result=response)
+    log_event("ingest_job", job_id=job_id, status=status)
+    return {"job_id": job_id, "status": status}
+
+
+def submit_job(request_json: dict, worker_url: str) -> dict:
+    """Record an asynchronous job and dispatch its worker."""
+    warehouse = get_warehouse(PROJECT, DATASET)
+    job_id = new_job_id()
+    body = {k: v for k, v in request_json.items() if k != "async"}
+    if body.get("backfill") and not body.get("backfill_id"):
+        body["backfill_id"] = job_id
+    warehouse.create_job(job_id, body)
+    dispatch(job_id, worker_url, run_job)
+    return {"job_id": job_id, "status": "queued", "status_url": f"{worker_url}?job_id={job_id}"}
+
+
+@functions_framework.http
+def ingest(request):
+    """HTTP entry point for the FRED ingestion function.
+
+    ``GET ?job_id=...`` returns an asynchronous job's status and progress.
+    A POST with ``"async": true`` queues the request as a job and returns
+    its ID at once; ``{"job_id": ...}`` is the job worker's own invocation.
+    Any other POST runs the ingest synchronously.
+    """
+    headers = {"Content-Type": "application/json"}
+    if request.method == "GET":
+        job_id = request.args.get("job_id")
+        job = get_warehouse(PROJECT, DATASET).get_job(job_id) if job_id else None
+        if job is None:
+            return json.dumps({"error": f"Unknown job_id {job_id!r}"}), 404, headers
+        job["series_done"] = sum(
+            1 for state in job["progress"].values()
+            if state.get("status") not in ("running", "fetched")
+        )
+        return json.dumps(job, indent=2), 200, headers
+
+    request_json = request.get_json(silent=True) or {}
+    if request_json.get("async"):
+        return json.dumps(submit_job(request_json, request.base_url), indent=2), 202, headers
+    if request_json.get("job_id"):
+        return json.dumps(run_job(request_json["job_id"], request.base_url)), 200, headers
+
+    response, status_code = run_ingest(request_json, worker_url=request.base_url)
+    return json.dumps(response, indent=2), status_code, headers
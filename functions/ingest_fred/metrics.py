@@ -0,0 +1,68 @@
+"""Stage timings and volume counters for ingest runs."""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Thread-safe accumulator for one run or one series.
+
+    ``timings`` are seconds per stage (watermark, fetch, parse, stage, load,
+    merge, cleanup, ...), ``counters`` are volumes such as bytes downloaded
+    or rows parsed, and ``jobs`` holds one record per BigQuery job.
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block and add it to stage ``name``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name] += seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def record_job(self, stage: str, job, seconds: float) -> None:
+        """Record a finished BigQuery query or load job."""
+        record = {
+            "stage": stage,
+            "job_id": job.job_id,
+            "bytes_processed": getattr(job, "total_bytes_processed", None),
+            "seconds": round(seconds, 3),
+        }
+        with self._lock:
+            self.jobs.append(record)
+
+    def merge(self, other: "Metrics") -> None:
+        """Add another accumulator's timings, counters and jobs to this one."""
+        with self._lock:
+            for name, seconds in other.timings.items():
+                self.timings[name] += seconds
+            for name, n in other.counters.items():
+                self.counters[name] += n
+            self.jobs.extend(other.jobs)
+
+    def as_dict(self) -> dict:
+        out = {
+            "timings": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            **self.counters,
+        }
+        if self.jobs:
+            out["bigquery_jobs"] = list(self.jobs)
+        return out
+
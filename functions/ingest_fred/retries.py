@@ -0,0 +1,61 @@
+"""Durable per-series retry queue for failed incremental ingests.
+
+A series that fails is recorded in the ``ingest_retry_queue`` table with
+its attempt count, last error and the time its next attempt is due, backing
+off exponentially. A request with ``"retry": true`` ingests only the series
+that are due, so a single failure no longer reruns the whole batch. After
+RETRY_MAX_ATTEMPTS failures a series is moved to ``dead_letter``, logged at
+ERROR and left for an operator; any later successful ingest of the series
+(scheduled or manual) clears its entry.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from logs import log_event
+
+RETRY_MAX_ATTEMPTS = int(os.environ.get("INGEST_RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BACKOFF_SECONDS = float(os.environ.get("INGEST_RETRY_BACKOFF_SECONDS", "900"))
+RETRY_MAX_BACKOFF_SECONDS = float(os.environ.get("INGEST_RETRY_MAX_BACKOFF_SECONDS", "21600"))
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before the next attempt after ``attempts`` failures."""
+    return timedelta(seconds=min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), RETRY_MAX_BACKOFF_SECONDS))
+
+
+def update_retry_queue(warehouse, results: dict, now: datetime) -> dict:
+    """Record failed series and clear recovered ones; returns the new entries.
+
+    ``results`` is the per-series result dict of an incremental run. Only
+    series with an ``error`` status are (re)queued; every other status
+    clears an existing entry.
+    """
+    queue = warehouse.retry_entries(list(results))
+    failed = {}
+    for sid, result in results.items():
+        if result["status"] != "error":
+            continue
+        attempts = queue.get(sid, {}).get("attempts", 0) + 1
+        dead = attempts >= RETRY_MAX_ATTEMPTS
+        failed[sid] = {
+            "status": "dead_letter" if dead else "pending",
+            "attempts": attempts,
+            "last_error": result.get("error", ""),
+            "next_attempt_at": None if dead else now + backoff(attempts),
+        }
+        if dead:
+            log_event(
+                "ingest_dead_letter", severity="ERROR", series_id=sid, attempts=attempts,
+                error=failed[sid]["last_error"],
+            )
+    recovered = [sid for sid in queue if sid not in failed and sid in results]
+    warehouse.save_retries(failed)
+    warehouse.clear_retries(recovered)
+    return {
+        sid: {
+            **entry,
+            "next_attempt_at": entry["next_attempt_at"].isoformat() if entry["next_attempt_at"] else None,
+        }
+        for sid, entry in failed.items()
+    }
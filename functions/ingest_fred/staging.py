@@ -0,0 +1,181 @@
+"""Columnar buffers for staging raw FRED observations into BigQuery."""
+
+import json
+import tempfile
+import threading
+from array import array
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+RAW_SCHEMA = [
+    bigquery.SchemaField("series_id", "STRING"),
+    bigquery.SchemaField("observation_date", "DATE"),
+    bigquery.SchemaField("value", "FLOAT64"),
+    bigquery.SchemaField("realtime_start", "DATE"),
+    bigquery.SchemaField("realtime_end", "DATE"),
+    bigquery.SchemaField("ingested_at", "TIMESTAMP"),
+]
+
+ARROW_SCHEMA = pa.schema([
+    ("series_id", pa.string()),
+    ("observation_date", pa.date32()),
+    ("value", pa.float64()),
+    ("realtime_start", pa.date32()),
+    ("realtime_end", pa.date32()),
+    ("ingested_at", pa.timestamp("us", tz="UTC")),
+])
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NULL_DAY = -(2 ** 31)  # sentinel for a missing realtime date
+
+
+def to_epoch_day(iso_date: str | None) -> int:
+    """Convert an ISO date string to days since 1970-01-01 (Arrow date32)."""
+    if not iso_date:
+        return _NULL_DAY
+    return date.fromisoformat(iso_date).toordinal() - _EPOCH_ORDINAL
+
+
+def _date32(days: array) -> pa.Array:
+    return pa.Array.from_buffers(pa.date32(), len(days), [None, pa.py_buffer(days)])
+
+
+def _nullable_date32(days: array) -> pa.Array:
+    values = pa.Array.from_buffers(pa.int32(), len(days), [None, pa.py_buffer(days)])
+    return pc.if_else(pc.equal(values, _NULL_DAY), None, values).cast(pa.date32())
+
+
+class ObservationColumns:
+    """Typed, column-oriented buffer of raw observation rows.
+
+    Dates are held as int32 day numbers and values as float64 in compact
+    ``array`` buffers; the series id is run-length encoded because rows
+    arrive one series at a time. ``ingested_at`` is shared by every row of
+    an ingest run, so it is supplied when the buffer is serialized.
+    """
+
+    def __init__(self):
+        self.series_runs: list[list] = []  # [[series_id, row_count], ...]
+        self.observation_date = array("i")
+        self.value = array("d")
+        self.realtime_start = array("i")
+        self.realtime_end = array("i")
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def append(
+        self,
+        series_id: str,
+        observation_date: str,
+        value: float,
+        realtime_start: str | None,
+        realtime_end: str | None,
+    ) -> None:
+        if self.series_runs and self.series_runs[-1][0] == series_id:
+            self.series_runs[-1][1] += 1
+        else:
+            self.series_runs.append([series_id, 1])
+        self.observation_date.append(to_epoch_day(observation_date))
+        self.value.append(value)
+        self.realtime_start.append(to_epoch_day(realtime_start))
+        self.realtime_end.append(to_epoch_day(realtime_end))
+
+    def to_arrow(self, ingested_at: datetime) -> pa.Table:
+        """Build an Arrow table matching ``RAW_SCHEMA``."""
+        series_id = pa.concat_arrays(
+            [pa.repeat(sid, n) for sid, n in self.series_runs] or [pa.array([], pa.string())]
+        )
+        return pa.table(schema=ARROW_SCHEMA, data={
+            "series_id": series_id,
+            "observation_date": _date32(self.observation_date),
+            "value": pa.array(self.value, type=pa.float64()),
+            "realtime_start": _nullable_date32(self.realtime_start),
+            "realtime_end": _nullable_date32(self.realtime_end),
+            "ingested_at": pa.repeat(pa.scalar(ingested_at, type=pa.timestamp("us", tz="UTC")), len(self)),
+        })
+
+    def to_json_rows(self, ingested_at: datetime) -> list[dict]:
+        """Expand the buffer into row dicts for ``load_table_from_json``."""
+        stamp = ingested_at.isoformat()
+        rows = []
+        i = 0
+        for series_id, count in self.series_runs:
+            for j in range(i, i + count):
+                rows.append({
+                    "series_id": series_id,
+                    "observation_date": _iso(self.observation_date[j]),
+                    "value": self.value[j],
+                    "realtime_start": _iso(self.realtime_start[j]),
+                    "realtime_end": _iso(self.realtime_end[j]),
+                    "ingested_at": stamp,
+                })
+            i += count
+        return rows
+
+
+class StagingFile:
+    """Append-only load payload spooled to a temporary file.
+
+    Chunks are serialized as they arrive (Parquet row groups or NDJSON
+    lines), so parsed rows only live in memory one chunk at a time. Writes
+    are serialized with a lock so concurrent workers can share one file.
+    """
+
+    def __init__(self, ingested_at: datetime, fmt: str = "parquet", spool_bytes: int = 16 * 2 ** 20):
+        self.ingested_at = ingested_at
+        self.format = fmt
+        self.rows = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self._writer = None
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(self._file, ARROW_SCHEMA, compression="snappy")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def write(self, chunk: ObservationColumns) -> None:
+        if not len(chunk):
+            return
+        if self._writer is not None:
+            table = chunk.to_arrow(self.ingested_at)
+            with self._lock:
+                self._writer.write_table(table)
+                self.rows += len(chunk)
+        else:
+            payload = "".join(json.dumps(row) + "\n" for row in chunk.to_json_rows(self.ingested_at))
+            with self._lock:
+                self._file.write(payload.encode())
+                self.rows += len(chunk)
+
+    def finish(self):
+        """Close the writer and return the payload file, rewound for reading."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._file.seek(0)
+        return self._file
+
+    def read_rows(self) -> list[dict]:
+        """Finish the payload and read it back as row dicts (for small payloads)."""
+        payload = self.finish()
+        if self.format == "parquet":
+            return pq.read_table(payload).to_pylist()
+        return [json.loads(line) for line in payload.read().splitlines()]
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._file.close()
+
+
+def _iso(day: int) -> str | None:
+    if day == _NULL_DAY:
+        return None
+    return date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
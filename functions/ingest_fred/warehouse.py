@@ -0,0 +1,761 @@
+"""Storage backends for ingest: BigQuery, or an embedded DuckDB file.
+
+``WAREHOUSE_BACKEND=duckdb`` runs ingest against a local DuckDB database at
+``DUCKDB_PATH`` with the same tables and upsert semantics, so the pipeline
+can be run and profiled offline.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+from google.cloud import bigquery
+
+from metrics import Metrics
+from staging import RAW_SCHEMA, StagingFile
+
+BACKEND = os.environ.get("WAREHOUSE_BACKEND", "bigquery")
+DUCKDB_PATH = os.environ.get("DUCKDB_PATH", "labor_market.duckdb")
+
+TABLE = "raw_fred_observations"
+STATE_TABLE = "ingest_series_state"
+CHECKPOINT_TABLE = "backfill_checkpoints"
+JOBS_TABLE = "ingest_jobs"
+RETRY_TABLE = "ingest_retry_queue"
+
+# Payloads up to this many rows are upserted with one parameterized MERGE
+# instead of a staging load job, MERGE and temp-table delete.
+SMALL_DELTA_ROWS = int(os.environ.get("INGEST_SMALL_DELTA_ROWS", "500"))
+
+# raw_fred_observations holds exactly one row per (series_id, observation_date):
+# every write is an upsert on that key, and duplicate keys within one staged
+# payload are collapsed here first (a MERGE would insert both). Readers can
+# therefore use the table as the current-values layer without deduplicating.
+DEDUP_STAGED = """
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY series_id, observation_date ORDER BY realtime_start DESC
+    ) = 1
+"""
+
+# ingested_at is stamped by the MERGE itself, not taken from the staged rows
+# (which carry the run's start time): the transform's watermark is the
+# newest ingested_at, so stamps must follow commit order as closely as
+# possible. A run or shard that started earlier but commits later would
+# otherwise land behind a watermark already taken.
+MERGE_OBSERVATIONS = """
+    ON target.series_id = source.series_id
+       AND target.observation_date = source.observation_date
+    WHEN MATCHED THEN
+        UPDATE SET
+            value = source.value,
+            realtime_start = source.realtime_start,
+            realtime_end = source.realtime_end,
+            ingested_at = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN
+        INSERT (series_id, observation_date, value, realtime_start, realtime_end, ingested_at)
+        VALUES (source.series_id, source.observation_date, source.value,
+                source.realtime_start, source.realtime_end, CURRENT_TIMESTAMP())
+"""
+
+
+def _retry_entry(status, attempts, last_error, first_failed_at, next_attempt_at) -> dict:
+    return {
+        "status": status,
+        "attempts": attempts,
+        "last_error": last_error,
+        "first_failed_at": first_failed_at,
+        "next_attempt_at": next_attempt_at,
+    }
+
+
+def _job_record(job_id, status, request, progress, result, created_at, updated_at) -> dict:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "request": json.loads(request) if request else None,
+        "progress": json.loads(progress) if progress else {},
+        "result": json.loads(result) if result else None,
+        "created_at": created_at.isoformat(),
+        "updated_at": updated_at.isoformat(),
+    }
+
+
+class BigQueryWarehouse:
+    """Ingest tables in a BigQuery dataset.
+
+    Every job is timed under a stage name and recorded, with its job ID and
+    bytes processed, in ``metrics``.
+    """
+
+    def __init__(
+        self,
+        project: str,
+        dataset: str,
+        metrics: Metrics | None = None,
+        client: bigquery.Client | None = None,
+    ):
+        self.project = project
+        self.dataset = dataset
+        self.client = client or bigquery.Client(project=project)
+        self.metrics = metrics or Metrics()
+
+    def _table(self, name: str) -> str:
+        return f"{self.project}.{self.dataset}.{name}"
+
+    def _query(self, stage: str, query: str, job_config: bigquery.QueryJobConfig | None = None):
+        t0 = time.perf_counter()
+        job = self.client.query(query, job_config=job_config)
+        rows = job.result()
+        elapsed = time.perf_counter() - t0
+        self.metrics.add_time(stage, elapsed)
+        self.metrics.record_job(stage, job, elapsed)
+        return rows
+
+    def last_observation_dates(self, series_ids: list[str]) -> dict[str, str]:
+        """Return the most recent observation_date for each series in one query.
+
+        Series with no stored observations are absent from the result.
+        """
+        query = f"""
+            SELECT series_id, MAX(observation_date) AS last_date
+            FROM `{self._table(TABLE)}`
+            WHERE series_id IN UNNEST(@series_ids)
+            GROUP BY series_id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        return {
+            row.series_id: row.last_date.isoformat()
+            for row in self._query("watermark", query, job_config)
+            if row.last_date
+        }
+
+    def series_state(self, series_ids: list[str]) -> dict[str, str]:
+        """Return the FRED last_updated stamp recorded by the previous run, per series."""
+        query = f"""
+            SELECT series_id, fred_last_updated
+            FROM `{self._table(STATE_TABLE)}`
+            WHERE series_id IN UNNEST(@series_ids)
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        return {
+            row.series_id: row.fred_last_updated
+            for row in self._query("watermark", query, job_config)
+        }
+
+    def save_series_state(self, last_updated: dict[str, str]) -> None:
+        """Upsert FRED last_updated stamps for successfully loaded series."""
+        if not last_updated:
+            return
+        query = f"""
+            MERGE `{self._table(STATE_TABLE)}` AS target
+            USING UNNEST(@states) AS source
+            ON target.series_id = source.series_id
+            WHEN MATCHED THEN
+                UPDATE SET
+                    fred_last_updated = source.fred_last_updated,
+                    updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN
+                INSERT (series_id, fred_last_updated, updated_at)
+                VALUES (source.series_id, source.fred_last_updated, CURRENT_TIMESTAMP())
+        """
+        states = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("series_id", "STRING", sid),
+                bigquery.ScalarQueryParameter("fred_last_updated", "STRING", stamp),
+            )
+            for sid, stamp in last_updated.items()
+        ]
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("states", "STRUCT", states)]
+        )
+        self._query("state", query, job_config)
+
+    def stored_fingerprints(
+        self,
+        series_ids: list[str],
+        since: str,
+    ) -> dict[str, dict[str, tuple[str, str]]]:
+        """Per-series, per-month ``(fingerprint, last_date)`` of stored rows.
+
+        The fingerprint is computed exactly like ``delta.fingerprint`` so
+        months can be compared client-side without reading the rows.
+        """
+        query = f"""
+            SELECT
+                series_id,
+                FORMAT_DATE('%Y-%m', observation_date) AS month,
+                TO_HEX(MD5(STRING_AGG(
+                    CONCAT(CAST(observation_date AS STRING), '=', FORMAT('%.10g', value)),
+                    ';' ORDER BY observation_date
+                ))) AS fingerprint,
+                MAX(observation_date) AS last_date
+            FROM `{self._table(TABLE)}`
+            WHERE series_id IN UNNEST(@series_ids)
+              AND observation_date >= @since
+              AND value IS NOT NULL
+            GROUP BY series_id, month
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+                bigquery.ScalarQueryParameter("since", "DATE", since),
+            ]
+        )
+        stored = {sid: {} for sid in series_ids}
+        for row in self._query("watermark", query, job_config):
+            stored[row.series_id][row.month] = (row.fingerprint, row.last_date.isoformat())
+        return stored
+
+    def upsert_observations(self, staged: StagingFile, series_ids: list[str]) -> None:
+        """Upsert staged rows using a MERGE via a temp table.
+
+        Only rows for ``series_ids`` are merged, so partial chunks left in
+        the payload by a series that failed mid-stream never reach the raw
+        table. Payloads of at most SMALL_DELTA_ROWS rows (a weekly ICSA
+        release, say) skip the temp table; see ``_merge_small_delta``.
+        """
+        if not len(staged) or not series_ids:
+            return
+        if len(staged) <= SMALL_DELTA_ROWS:
+            self._merge_small_delta(staged, series_ids)
+            return
+
+        # Unique suffix so concurrent workers never share a temp table
+        ts = int(datetime.now(timezone.utc).timestamp())
+        temp_table = self._table(f"_temp_ingest_{ts}_{uuid.uuid4().hex[:8]}")
+
+        # Load into a temporary table first
+        job_config = bigquery.LoadJobConfig(
+            schema=RAW_SCHEMA,
+            write_disposition="WRITE_TRUNCATE",
+            source_format=(
+                bigquery.SourceFormat.PARQUET if staged.format == "parquet"
+                else bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+            ),
+        )
+        t0 = time.perf_counter()
+        load_job = self.client.load_table_from_file(staged.finish(), temp_table, job_config=job_config)
+        load_job.result()
+        elapsed = time.perf_counter() - t0
+        self.metrics.add_time("load", elapsed)
+        self.metrics.record_job("load", load_job, elapsed)
+
+        # MERGE from temp into target
+        merge_sql = f"""
+            MERGE `{self._table(TABLE)}` AS target
+            USING (
+                SELECT * FROM `{temp_table}`
+                WHERE series_id IN UNNEST(@series_ids)
+                {DEDUP_STAGED}
+            ) AS source
+            {MERGE_OBSERVATIONS}
+        """
+        merge_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        self._query("merge", merge_sql, merge_config)
+        with self.metrics.stage("cleanup"):
+            self.client.delete_table(temp_table, not_found_ok=True)
+
+    def _merge_small_delta(self, staged: StagingFile, series_ids: list[str]) -> None:
+        """Upsert a small payload with a single MERGE over an array parameter.
+
+        One DML job replaces the load job, MERGE and delete. It is keyed on
+        ``(series_id, observation_date)`` like the bulk path, so a retried
+        write is idempotent; streaming inserts are not, and would leave the
+        rows in the streaming buffer where later MERGEs cannot update them.
+        """
+        with self.metrics.stage("load"):
+            rows = staged.read_rows()
+        params = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("series_id", "STRING", row["series_id"]),
+                bigquery.ScalarQueryParameter("observation_date", "DATE", row["observation_date"]),
+                bigquery.ScalarQueryParameter("value", "FLOAT64", row["value"]),
+                bigquery.ScalarQueryParameter("realtime_start", "DATE", row["realtime_start"]),
+                bigquery.ScalarQueryParameter("realtime_end", "DATE", row["realtime_end"]),
+                bigquery.ScalarQueryParameter("ingested_at", "TIMESTAMP", row["ingested_at"]),
+            )
+            for row in rows
+        ]
+        query = f"""
+            MERGE `{self._table(TABLE)}` AS target
+            USING (
+                SELECT * FROM UNNEST(@rows)
+                WHERE series_id IN UNNEST(@series_ids)
+                {DEDUP_STAGED}
+            ) AS source
+            {MERGE_OBSERVATIONS}
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("rows", "STRUCT", params),
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        self._query("merge", query, job_config)
+        self.metrics.incr("small_delta_writes")
+
+    def completed_windows(self, backfill_id: str) -> set[tuple[str, str]]:
+        """Return ``(series_id, window_start)`` pairs already checkpointed for a backfill."""
+        query = f"""
+            SELECT series_id, window_start
+            FROM `{self._table(CHECKPOINT_TABLE)}`
+            WHERE backfill_id = @backfill_id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("backfill_id", "STRING", backfill_id),
+            ]
+        )
+        return {
+            (row.series_id, row.window_start.isoformat())
+            for row in self._query("watermark", query, job_config)
+        }
+
+    def record_completed_windows(
+        self,
+        backfill_id: str,
+        windows: list[tuple[str, str, str, int]],
+    ) -> None:
+        """Checkpoint ``(series_id, window_start, window_end, rows_loaded)`` tuples."""
+        if not windows:
+            return
+        query = f"""
+            INSERT INTO `{self._table(CHECKPOINT_TABLE)}`
+                (backfill_id, series_id, window_start, window_end, rows_loaded, completed_at)
+            SELECT @backfill_id, w.series_id, w.window_start, w.window_end, w.rows_loaded,
+                   CURRENT_TIMESTAMP()
+            FROM UNNEST(@windows) AS w
+        """
+        params = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("series_id", "STRING", sid),
+                bigquery.ScalarQueryParameter("window_start", "DATE", start),
+                bigquery.ScalarQueryParameter("window_end", "DATE", end),
+                bigquery.ScalarQueryParameter("rows_loaded", "INT64", rows),
+            )
+            for sid, start, end, rows in windows
+        ]
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("backfill_id", "STRING", backfill_id),
+                bigquery.ArrayQueryParameter("windows", "STRUCT", params),
+            ]
+        )
+        self._query("checkpoint", query, job_config)
+
+    def create_job(self, job_id: str, request: dict) -> None:
+        """Record a queued asynchronous ingest job."""
+        query = f"""
+            INSERT INTO `{self._table(JOBS_TABLE)}`
+                (job_id, status, request, created_at, updated_at)
+            VALUES (@job_id, 'queued', @request, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP())
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("job_id", "STRING", job_id),
+                bigquery.ScalarQueryParameter("request", "STRING", json.dumps(request)),
+            ]
+        )
+        self._query("jobs", query, job_config)
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        progress: dict | None = None,
+        result: dict | None = None,
+    ) -> None:
+        """Set a job's status; ``progress`` and ``result`` are kept unless given."""
+        query = f"""
+            UPDATE `{self._table(JOBS_TABLE)}`
+            SET status = @status,
+                progress = COALESCE(@progress, progress),
+                result = COALESCE(@result, result),
+                updated_at = CURRENT_TIMESTAMP()
+            WHERE job_id = @job_id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("job_id", "STRING", job_id),
+                bigquery.ScalarQueryParameter("status", "STRING", status),
+                bigquery.ScalarQueryParameter(
+                    "progress", "STRING", json.dumps(progress) if progress is not None else None,
+                ),
+                bigquery.ScalarQueryParameter(
+                    "result", "STRING", json.dumps(result) if result is not None else None,
+                ),
+            ]
+        )
+        self._query("jobs", query, job_config)
+
+    def get_job(self, job_id: str) -> dict | None:
+        """Return a job's status, request, progress and result, or None."""
+        query = f"""
+            SELECT job_id, status, request, progress, result, created_at, updated_at
+            FROM `{self._table(JOBS_TABLE)}`
+            WHERE job_id = @job_id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("job_id", "STRING", job_id),
+            ]
+        )
+        for row in self._query("jobs", query, job_config):
+            return _job_record(*row.values())
+        return None
+
+    def retry_entries(self, series_ids: list[str]) -> dict[str, dict]:
+        """Return the retry-queue entry of each queued series in ``series_ids``."""
+        query = f"""
+            SELECT series_id, status, attempts, last_error, first_failed_at, next_attempt_at
+            FROM `{self._table(RETRY_TABLE)}`
+            WHERE series_id IN UNNEST(@series_ids)
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        return {
+            row.series_id: _retry_entry(
+                row.status, row.attempts, row.last_error, row.first_failed_at, row.next_attempt_at,
+            )
+            for row in self._query("retry", query, job_config)
+        }
+
+    def due_retries(self, now: datetime) -> list[str]:
+        """Return pending series whose next attempt is due at ``now``."""
+        query = f"""
+            SELECT series_id
+            FROM `{self._table(RETRY_TABLE)}`
+            WHERE status = 'pending' AND next_attempt_at <= @now
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("now", "TIMESTAMP", now)]
+        )
+        return [row.series_id for row in self._query("retry", query, job_config)]
+
+    def save_retries(self, entries: dict[str, dict]) -> None:
+        """Upsert retry-queue entries, keeping each series' first_failed_at."""
+        if not entries:
+            return
+        query = f"""
+            MERGE `{self._table(RETRY_TABLE)}` AS target
+            USING UNNEST(@entries) AS source
+            ON target.series_id = source.series_id
+            WHEN MATCHED THEN
+                UPDATE SET
+                    status = source.status,
+                    attempts = source.attempts,
+                    last_error = source.last_error,
+                    next_attempt_at = source.next_attempt_at,
+                    updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN
+                INSERT (series_id, status, attempts, last_error, first_failed_at, next_attempt_at, updated_at)
+                VALUES (source.series_id, source.status, source.attempts, source.last_error,
+                        CURRENT_TIMESTAMP(), source.next_attempt_at, CURRENT_TIMESTAMP())
+        """
+        params = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("series_id", "STRING", sid),
+                bigquery.ScalarQueryParameter("status", "STRING", entry["status"]),
+                bigquery.ScalarQueryParameter("attempts", "INT64", entry["attempts"]),
+                bigquery.ScalarQueryParameter("last_error", "STRING", entry["last_error"]),
+                bigquery.ScalarQueryParameter("next_attempt_at", "TIMESTAMP", entry["next_attempt_at"]),
+            )
+            for sid, entry in entries.items()
+        ]
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("entries", "STRUCT", params)]
+        )
+        self._query("retry", query, job_config)
+
+    def clear_retries(self, series_ids: list[str]) -> None:
+        """Remove recovered series from the retry queue."""
+        if not series_ids:
+            return
+        query = f"""
+            DELETE FROM `{self._table(RETRY_TABLE)}`
+            WHERE series_id IN UNNEST(@series_ids)
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("series_ids", "STRING", series_ids),
+            ]
+        )
+        self._query("retry", query, job_config)
+
+
+DUCKDB_SCHEMA = """
+CREATE SCHEMA IF NOT EXISTS {dataset};
+CREATE TABLE IF NOT EXISTS {dataset}.raw_fred_observations (
+    series_id        VARCHAR     NOT NULL,
+    observation_date DATE        NOT NULL,
+    value            DOUBLE,
+    realtime_start   DATE,
+    realtime_end     DATE,
+    ingested_at      TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (series_id, observation_date)
+);
+CREATE TABLE IF NOT EXISTS {dataset}.ingest_series_state (
+    series_id         VARCHAR     PRIMARY KEY,
+    fred_last_updated VARCHAR,
+    updated_at        TIMESTAMPTZ NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {dataset}.backfill_checkpoints (
+    backfill_id  VARCHAR     NOT NULL,
+    series_id    VARCHAR     NOT NULL,
+    window_start DATE        NOT NULL,
+    window_end   DATE        NOT NULL,
+    rows_loaded  BIGINT,
+    completed_at TIMESTAMPTZ NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {dataset}.ingest_jobs (
+    job_id     VARCHAR     PRIMARY KEY,
+    status     VARCHAR     NOT NULL,
+    request    VARCHAR,
+    progress   VARCHAR,
+    result     VARCHAR,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {dataset}.ingest_retry_queue (
+    series_id       VARCHAR     PRIMARY KEY,
+    status          VARCHAR     NOT NULL,
+    attempts        BIGINT      NOT NULL,
+    last_error      VARCHAR,
+    first_failed_at TIMESTAMPTZ NOT NULL,
+    next_attempt_at TIMESTAMPTZ,
+    updated_at      TIMESTAMPTZ NOT NULL
+);
+"""
+
+
+class DuckDBWarehouse:
+    """Ingest tables in an embedded DuckDB database file.
+
+    The dataset maps to a DuckDB schema. The MERGE becomes an
+    ``INSERT ... ON CONFLICT DO UPDATE`` keyed on the raw table's
+    ``(series_id, observation_date)`` primary key. Calls are serialized
+    because a DuckDB connection is not safe to share between threads.
+    Stage timings are recorded in ``metrics``; there are no job records.
+    """
+
+    def __init__(self, path: str, dataset: str, metrics: Metrics | None = None):
+        import duckdb
+
+        self.dataset = dataset
+        self.metrics = metrics or Metrics()
+        self.con = duckdb.connect(path)
+        self.con.execute(DUCKDB_SCHEMA.format(dataset=dataset))
+        self._lock = threading.Lock()
+
+    def _query(self, stage: str, sql: str, params: dict | None = None) -> list[tuple]:
+        with self._lock, self.metrics.stage(stage):
+            return self.con.execute(sql, params or {}).fetchall()
+
+    def last_observation_dates(self, series_ids: list[str]) -> dict[str, str]:
+        rows = self._query("watermark", f"""
+            SELECT series_id, MAX(observation_date)
+            FROM {self.dataset}.{TABLE}
+            WHERE list_contains($series_ids, series_id)
+            GROUP BY series_id
+        """, {"series_ids": series_ids})
+        return {sid: last.isoformat() for sid, last in rows if last}
+
+    def series_state(self, series_ids: list[str]) -> dict[str, str]:
+        rows = self._query("watermark", f"""
+            SELECT series_id, fred_last_updated
+            FROM {self.dataset}.{STATE_TABLE}
+            WHERE list_contains($series_ids, series_id)
+        """, {"series_ids": series_ids})
+        return dict(rows)
+
+    def save_series_state(self, last_updated: dict[str, str]) -> None:
+        if not last_updated:
+            return
+        with self._lock, self.metrics.stage("state"):
+            self.con.executemany(f"""
+                INSERT INTO {self.dataset}.{STATE_TABLE} VALUES (?, ?, now())
+                ON CONFLICT (series_id) DO UPDATE SET
+                    fred_last_updated = excluded.fred_last_updated,
+                    updated_at = excluded.updated_at
+            """, list(last_updated.items()))
+
+    def stored_fingerprints(
+        self,
+        series_ids: list[str],
+        since: str,
+    ) -> dict[str, dict[str, tuple[str, str]]]:
+        rows = self._query("watermark", f"""
+            SELECT
+                series_id,
+                strftime(observation_date, '%Y-%m') AS month,
+                md5(string_agg(
+                    CAST(observation_date AS VARCHAR) || '=' || printf('%.10g', value),
+                    ';' ORDER BY observation_date
+                )),
+                MAX(observation_date)
+            FROM {self.dataset}.{TABLE}
+            WHERE list_contains($series_ids, series_id)
+              AND observation_date >= $since
+              AND value IS NOT NULL
+            GROUP BY series_id, month
+        """, {"series_ids": series_ids, "since": date.fromisoformat(since)})
+        stored = {sid: {} for sid in series_ids}
+        for sid, month, fingerprint, last_date in rows:
+            stored[sid][month] = (fingerprint, last_date.isoformat())
+        return stored
+
+    def upsert_observations(self, staged: StagingFile, series_ids: list[str]) -> None:
+        if not len(staged) or not series_ids:
+            return
+        if staged.format != "parquet":
+            raise ValueError("DuckDB backend requires INGEST_STAGING_FORMAT=parquet")
+        import pyarrow.parquet as pq
+
+        with self.metrics.stage("load"):
+            rows = pq.read_table(staged.finish())
+        with self._lock, self.metrics.stage("merge"):
+            self.con.register("staged_rows", rows)
+            try:
+                self.con.execute(f"""
+                    INSERT INTO {self.dataset}.{TABLE}
+                    SELECT series_id, observation_date, value, realtime_start, realtime_end, now()
+                    FROM staged_rows
+                    WHERE list_contains($series_ids, series_id)
+                    {DEDUP_STAGED}
+                    ON CONFLICT (series_id, observation_date) DO UPDATE SET
+                        value = excluded.value,
+                        realtime_start = excluded.realtime_start,
+                        realtime_end = excluded.realtime_end,
+                        ingested_at = excluded.ingested_at
+                """, {"series_ids": series_ids})
+            finally:
+                self.con.unregister("staged_rows")
+
+    def completed_windows(self, backfill_id: str) -> set[tuple[str, str]]:
+        rows = self._query("watermark", f"""
+            SELECT series_id, window_start
+            FROM {self.dataset}.{CHECKPOINT_TABLE}
+            WHERE backfill_id = $backfill_id
+        """, {"backfill_id": backfill_id})
+        return {(sid, start.isoformat()) for sid, start in rows}
+
+    def record_completed_windows(
+        self,
+        backfill_id: str,
+        windows: list[tuple[str, str, str, int]],
+    ) -> None:
+        if not windows:
+            return
+        with self._lock, self.metrics.stage("checkpoint"):
+            self.con.executemany(
+                f"INSERT INTO {self.dataset}.{CHECKPOINT_TABLE} VALUES (?, ?, ?, ?, ?, now())",
+                [
+                    (backfill_id, sid, date.fromisoformat(start), date.fromisoformat(end), rows)
+                    for sid, start, end, rows in windows
+                ],
+            )
+
+    def create_job(self, job_id: str, request: dict) -> None:
+        self._query("jobs", f"""
+            INSERT INTO {self.dataset}.{JOBS_TABLE} (job_id, status, request, created_at, updated_at)
+            VALUES ($job_id, 'queued', $request, now(), now())
+        """, {"job_id": job_id, "request": json.dumps(request)})
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        progress: dict | None = None,
+        result: dict | None = None,
+    ) -> None:
+        self._query("jobs", f"""
+            UPDATE {self.dataset}.{JOBS_TABLE}
+            SET status = $status,
+                progress = COALESCE($progress, progress),
+                result = COALESCE($result, result),
+                updated_at = now()
+            WHERE job_id = $job_id
+        """, {
+            "job_id": job_id,
+            "status": status,
+            "progress": json.dumps(progress) if progress is not None else None,
+            "result": json.dumps(result) if result is not None else None,
+        })
+
+    def get_job(self, job_id: str) -> dict | None:
+        rows = self._query("jobs", f"""
+            SELECT job_id, status, request, progress, result, created_at, updated_at
+            FROM {self.dataset}.{JOBS_TABLE}
+            WHERE job_id = $job_id
+        """, {"job_id": job_id})
+        return _job_record(*rows[0]) if rows else None
+
+    def retry_entries(self, series_ids: list[str]) -> dict[str, dict]:
+        rows = self._query("retry", f"""
+            SELECT series_id, status, attempts, last_error, first_failed_at, next_attempt_at
+            FROM {self.dataset}.{RETRY_TABLE}
+            WHERE list_contains($series_ids, series_id)
+        """, {"series_ids": series_ids})
+        return {row[0]: _retry_entry(*row[1:]) for row in rows}
+
+    def due_retries(self, now: datetime) -> list[str]:
+        rows = self._query("retry", f"""
+            SELECT series_id
+            FROM {self.dataset}.{RETRY_TABLE}
+            WHERE status = 'pending' AND next_attempt_at <= $now
+        """, {"now": now})
+        return [sid for (sid,) in rows]
+
+    def save_retries(self, entries: dict[str, dict]) -> None:
+        if not entries:
+            return
+        with self._lock, self.metrics.stage("retry"):
+            self.con.executemany(f"""
+                INSERT INTO {self.dataset}.{RETRY_TABLE} VALUES (?, ?, ?, ?, now(), ?, now())
+                ON CONFLICT (series_id) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = excluded.attempts,
+                    last_error = excluded.last_error,
+                    next_attempt_at = excluded.next_attempt_at,
+                    updated_at = excluded.updated_at
+            """, [
+                (sid, e["status"], e["attempts"], e["last_error"], e["next_attempt_at"])
+                for sid, e in entries.items()
+            ])
+
+    def clear_retries(self, series_ids: list[str]) -> None:
+        if not series_ids:
+            return
+        self._query("retry", f"""
+            DELETE FROM {self.dataset}.{RETRY_TABLE}
+            WHERE list_contains($series_ids, series_id)
+        """, {"series_ids": series_ids})
+
+
+def get_warehouse(project: str, dataset: str, metrics: Metrics | None = None):
+    """Return the backend selected by ``WAREHOUSE_BACKEND``."""
+    if BACKEND == "duckdb":
+        return DuckDBWarehouse(DUCKDB_PATH, dataset, metrics)
+    return BigQueryWarehouse(project, dataset, metrics)
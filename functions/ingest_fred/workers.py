@@ -0,0 +1,25 @@
+"""Authenticated calls back into this function.
+
+Async job workers (Cloud Tasks, see jobs.py) and shard invocations (see
+coordinator.py) both POST to the URL the triggering request arrived on,
+authenticated as the function's service account.
+"""
+
+
+def https_url(worker_url: str) -> str:
+    """``worker_url`` with an https scheme.
+
+    Cloud Run terminates TLS in front of the function, so the request's own
+    URL may say http; ID tokens and OIDC-authenticated tasks are minted for
+    the https URL and must be sent to it.
+    """
+    return worker_url.replace("http://", "https://", 1)
+
+
+def id_token_headers(audience: str) -> dict:
+    """Authorization header carrying an ID token for ``audience``."""
+    import google.auth.transport.requests
+    import google.oauth2.id_token
+
+    token = google.oauth2.id_token.fetch_id_token(google.auth.transport.requests.Request(), audience)
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,26 @@
+"""Analytics window sizes by FRED series frequency."""
+
+# Series whose frequency in functions/ingest_fred/config.py is not monthly
+# (the two functions deploy from separate directories). Any other series is
+# treated as monthly. tests/test_config.py fails if the two disagree.
+SERIES_FREQUENCY = {
+    "ICSA": "weekly",
+}
+
+# Observations per year by frequency, for converting metric windows given
+# in months (see registry.py) to rows, so that every column covers the same
+# span of time whatever the series' frequency.
+PERIODS_PER_YEAR = {
+    "monthly": 12,
+    "weekly": 52,
+}
+DEFAULT_FREQUENCY = "monthly"
+
+
+def frequency_of(series_id: str) -> str:
+    return SERIES_FREQUENCY.get(series_id, DEFAULT_FREQUENCY)
+
+
+def series_with_frequency(frequency: str) -> list[str]:
+    """Configured series of a non-default ``frequency``."""
+    return sorted(sid for sid, f in SERIES_FREQUENCY.items() if f == frequency)
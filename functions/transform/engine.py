@@ -0,0 +1,249 @@
+"""Vectorized Python evaluator for the metric registry.
+
+Computes the same columns as ``registry.select_sql`` from contiguous arrays
+of observations sorted by series and date, so the analytics can be run and
+profiled offline and applied to ad-hoc series. Every rolling mean and
+standard deviation is a difference of cumulative sums clipped at the series
+boundary, so the cost is O(rows) however many series the arrays hold. Sums
+are taken over values standardized in short blocks (see ``RollingStats``)
+so that they keep the precision of each window's own scale. Rolling minima
+and maxima combine two overlapping power-of-two blocks (``RollingExtreme``).
+
+SQL semantics are followed exactly: NULL values (NaN here) are skipped by
+the window aggregates, ``STDDEV`` is the sample standard deviation and NULL
+below two values, ``SAFE_DIVIDE`` by zero is NULL, and ``ROUND`` rounds
+halves away from zero.
+"""
+
+import numpy as np
+
+from config import DEFAULT_FREQUENCY
+from registry import window_rows
+
+
+def segment_starts(series_ids: np.ndarray) -> np.ndarray:
+    """First row of each row's series, for rows sorted by series."""
+    n = len(series_ids)
+    starts = np.concatenate([[0], np.flatnonzero(series_ids[1:] != series_ids[:-1]) + 1])
+    return np.repeat(starts, np.diff(np.append(starts, n)))
+
+
+def lag(values: np.ndarray, seg_start: np.ndarray, k: int) -> np.ndarray:
+    """``LAG(value, k)`` within each series; NaN before the series has k rows."""
+    out = np.full(len(values), np.nan)
+    if len(values) > k:
+        out[k:] = values[:-k]
+        out[np.arange(len(values)) - k < seg_start] = np.nan
+    return out
+
+
+def prefix_sums(x: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(x)])
+
+
+class RollingStats:
+    """Trailing-window mean and sample standard deviation, per series.
+
+    Each series is cut into blocks of ``block`` rows, and values are
+    standardized by their block's mean and standard deviation before the
+    prefix sums are taken (with the squared terms centred on their block
+    mean too). Running totals therefore return to about zero at every block
+    boundary instead of growing along the array, so a window's sums are
+    accurate to its own local scale even when it is tiny next to the rest
+    of the series. A window of at most ``block`` rows spans at most two
+    blocks, whose parts are recombined about the current block's mean.
+    NaN values are skipped.
+    """
+
+    def __init__(self, values: np.ndarray, seg_start: np.ndarray, block: int):
+        self.block = block
+        self.seg_start = seg_start
+        rows = np.arange(len(values))
+        self.block_start = seg_start + (rows - seg_start) // block * block
+        starts = np.flatnonzero(np.diff(self.block_start, prepend=-1))
+        self.block_id = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid.astype(np.float64), starts)
+
+        def block_mean(x: np.ndarray) -> np.ndarray:
+            sums = np.add.reduceat(np.where(valid, x, 0.0), starts)
+            return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        self.anchor = block_mean(values)
+        dev = np.where(valid, values - self.anchor[self.block_id], 0.0)
+        scale = np.sqrt(block_mean(dev * dev))
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.z = dev / self.scale[self.block_id]
+        self.square_mean = block_mean(self.z * self.z)
+        self._count = prefix_sums(valid.astype(np.float64))
+        self._sum = prefix_sums(self.z)
+        self._squares = prefix_sums(np.where(valid, self.z * self.z - self.square_mean[self.block_id], 0.0))
+
+    def _part(self, lo: np.ndarray, hi: np.ndarray, block: np.ndarray, anchor: np.ndarray):
+        """Count, sum and sum of squares of ``value - anchor`` over rows ``lo..hi - 1`` of ``block``."""
+        count = self._count[hi] - self._count[lo]
+        s1 = self._sum[hi] - self._sum[lo]
+        s2 = self._squares[hi] - self._squares[lo] + self.square_mean[block] * count
+        scale = self.scale[block]
+        shift = self.anchor[block] - anchor
+        return (
+            count,
+            scale * s1 + count * shift,
+            scale * scale * s2 + 2 * scale * shift * s1 + count * shift * shift,
+        )
+
+    def _moments(self, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Count, sum and sum of squares of ``value - anchor`` over each trailing window."""
+        if window > self.block:
+            raise ValueError(f"window {window} exceeds block size {self.block}")
+        rows = np.arange(len(self.seg_start))
+        lo = np.maximum(rows - window + 1, self.seg_start)
+        anchor = self.anchor[self.block_id]
+        count, total, squares = self._part(np.maximum(lo, self.block_start), rows + 1, self.block_id, anchor)
+        # Windows reaching back into the previous block of the same series
+        spill = np.flatnonzero(lo < self.block_start)
+        c, t, q = self._part(lo[spill], self.block_start[spill], self.block_id[spill] - 1, anchor[spill])
+        count[spill] += c
+        total[spill] += t
+        squares[spill] += q
+        return count, total, squares
+
+    def mean(self, window: int) -> np.ndarray:
+        """``AVG(value)`` over the trailing ``window`` rows."""
+        count, total, _ = self._moments(window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, self.anchor[self.block_id] + total / count, np.nan)
+
+    def std(self, window: int) -> np.ndarray:
+        """``STDDEV(value)`` over the trailing ``window`` rows."""
+        count, total, squares = self._moments(window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.maximum((squares - total * (total / count)) / (count - 1), 0.0)
+            return np.where(count > 1, np.sqrt(var), np.nan)
+
+    def z_score(self, window: int) -> np.ndarray:
+        """``SAFE_DIVIDE(value - AVG(value), STDDEV(value))`` over the trailing window."""
+        count, total, squares = self._moments(window)
+        deviation = self.z * self.scale[self.block_id]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            local_mean = total / count
+            var = np.maximum((squares - total * local_mean) / (count - 1), 0.0)
+            return np.where(count > 1, safe_divide(deviation - local_mean, np.sqrt(var)), np.nan)
+
+
+def safe_divide(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(b == 0, np.nan, a / b)
+
+
+def round_half_away(x: np.ndarray, digits: int) -> np.ndarray:
+    scale = 10.0 ** digits
+    return np.sign(x) * np.floor(np.abs(x) * scale + 0.5) / scale
+
+
+class RollingExtreme:
+    """Trailing-window ``MIN``/``MAX`` per series, skipping NaN.
+
+    ``levels[k][i]`` holds the extreme of rows ``i .. i + 2**k - 1``; a
+    window is covered by two such (overlapping) blocks, so each query is
+    O(1) after O(rows log window) preparation.
+    """
+
+    def __init__(self, values: np.ndarray, seg_start: np.ndarray, window: int, reduce):
+        self.reduce = reduce
+        self.seg_start = seg_start
+        self.levels = [values]
+        span = 1
+        while span * 2 <= window:
+            previous = self.levels[-1]
+            level = previous.copy()
+            level[:-span] = reduce(previous[:-span], previous[span:])
+            self.levels.append(level)
+            span *= 2
+
+    def __call__(self, window: int) -> np.ndarray:
+        rows = np.arange(len(self.seg_start))
+        lo = np.maximum(rows - window + 1, self.seg_start)
+        k = np.floor(np.log2(rows - lo + 1)).astype(int)
+        levels = np.stack(self.levels)
+        with np.errstate(invalid="ignore"):
+            return self.reduce(levels[k, lo], levels[k, rows - (1 << k) + 1])
+
+
+def date_part(dates: np.ndarray, part: str) -> np.ndarray:
+    """``EXTRACT(part FROM date)`` for ISOYEAR, ISOWEEK, YEAR and MONTH."""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if part in ("ISOYEAR", "ISOWEEK"):
+        # The ISO year of a day is that of the Thursday of its week
+        weekday = (days - np.datetime64("1970-01-05")).astype(np.int64) % 7
+        thursday = days - weekday + 3
+        year = thursday.astype("datetime64[Y]")
+        if part == "ISOYEAR":
+            return year.astype(np.int64) + 1970.0
+        return ((thursday - year.astype("datetime64[D]")).astype(np.int64) // 7 + 1).astype(np.float64)
+    if part == "YEAR":
+        return days.astype("datetime64[Y]").astype(np.int64) + 1970.0
+    if part == "MONTH":
+        return days.astype("datetime64[M]").astype(np.int64) % 12 + 1.0
+    raise ValueError(f"Unsupported date part {part!r}")
+
+
+def evaluate(
+    metrics: list[dict],
+    series_ids: np.ndarray,
+    values: np.ndarray,
+    frequency: str = DEFAULT_FREQUENCY,
+    observation_dates: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """Columns of ``metrics`` for observations sorted by series and date.
+
+    ``series_ids`` and ``values`` are parallel arrays of series of one
+    ``frequency``; NaN marks a NULL value. ``observation_dates`` is only
+    needed by ``date_part`` metrics. Returns one float64 array per metric,
+    NaN for NULL.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {m["name"]: np.zeros(0) for m in metrics}
+    seg_start = segment_starts(np.asarray(series_ids))
+    stats, extremes = {}, {}
+
+    def rolling(n: int) -> RollingStats:
+        # One instance per window size: blocks as long as the window keep
+        # the sums at the window's own scale
+        if n not in stats:
+            stats[n] = RollingStats(values, seg_start, block=n)
+        return stats[n]
+
+    def extreme(kind: str, n: int) -> np.ndarray:
+        if (kind, n) not in extremes:
+            reduce = np.fmin if kind == "min" else np.fmax
+            extremes[kind, n] = RollingExtreme(values, seg_start, n, reduce)(n)
+        return extremes[kind, n]
+
+    out = {}
+    for metric in metrics:
+        kind, n = metric["kind"], window_rows(metric, frequency)
+        if kind == "lag":
+            column = lag(values, seg_start, n)
+        elif kind == "diff":
+            column = values - lag(values, seg_start, n)
+        elif kind == "pct":
+            previous = lag(values, seg_start, n)
+            column = safe_divide(values - previous, np.abs(previous)) * 100
+        elif kind == "mean":
+            column = rolling(n).mean(n)
+        elif kind == "std":
+            column = rolling(n).std(n)
+        elif kind in ("min", "max"):
+            column = extreme(kind, n)
+        elif kind == "zscore":
+            column = np.where(np.isnan(values), np.nan, rolling(n).z_score(n))
+        elif kind == "date_part":
+            column = date_part(observation_dates, metric["part"])
+        else:
+            raise ValueError(f"Unknown metric kind {kind!r} for {metric['name']}")
+        if "round" in metric:
+            column = round_half_away(column, metric["round"])
+        out[metric["name"]] = column
+    return out
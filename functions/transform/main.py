@@ -1,90 +1,652 @@
-"""Cloud Function: Compute analytics from raw FRED observations in BigQuery."""
+"""Cloud Function: Compute analytics from raw FRED observations in BigQuery.
 
+Set ``WAREHOUSE_BACKEND=duckdb`` to run against a local DuckDB file instead
+(see warehouse.py). ``transform`` is the HTTP entry point used by the
+scheduled sweep; ``transform_on_ingest`` runs on each ingest completion
+event for the series it names.
+
+Each statement that scans raw data is dry-run first. If its estimated
+bytes exceed ``TRANSFORM_MAX_BYTES``, a full rebuild falls back to an
+incremental update (when the table already exists) and anything else is
+refused. Every run's per-table job statistics are returned and appended to
+the ``transform_runs`` table.
+
+A run writes to new tables named after its run ID and publishes them by
+recording a new data version in ``data_versions``, which names the table
+behind each analytics view, then repointing the views (see ``publish``).
+The dashboard reads the tables of the newest data version, so it switches
+to all of a run's tables at once and never sees a table being replaced.
+Runs hold a lease in ``transform_lock`` throughout, so the scheduled sweep
+and event-triggered runs never update or publish at the same time.
+"""
+
+import base64
 import json
 import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
 import functions_framework
-from google.cloud import bigquery
+
+import registry
+from config import DEFAULT_FREQUENCY, PERIODS_PER_YEAR, SERIES_FREQUENCY, series_with_frequency
+from logs import log_event
+from registry import ANALYTICS_METRICS, WEEKLY_METRICS
+from warehouse import SERIES_STATE_TABLE, get_warehouse
 
 PROJECT = os.environ.get("GCP_PROJECT", "jobs-dashboard")
 DATASET = os.environ.get("BQ_DATASET", "labor_market")
 
-TRANSFORM_SQL = f"""
-CREATE OR REPLACE TABLE `{PROJECT}.{DATASET}.analytics_monthly`
-PARTITION BY DATE_TRUNC(observation_date, MONTH)
-CLUSTER BY series_id
-AS
-WITH ordered AS (
+TABLE = "analytics_monthly"
+RAW_TABLE = "raw_fred_observations"
+COLUMNS = registry.columns(ANALYTICS_METRICS)
+WEEKLY_TABLE = "analytics_weekly"
+WEEKLY_COLUMNS = registry.columns(WEEKLY_METRICS)
+LATEST_TABLE = "analytics_latest"
+LATEST_COLUMNS = [
+    "series_id", "observation_date", "value", "mom_change", "mom_pct_change",
+    "yoy_change", "yoy_pct_change", "z_score_5y", "prev_observation_date", "prev_value",
+]
+# "incremental" recomputes only series ingested since the last run; "full"
+# rebuilds the table. Requests can override with {"full": true}.
+TRANSFORM_MODE = os.environ.get("TRANSFORM_MODE", "incremental")
+# Byte budget per statement, from its dry run (0 for none). Requests can
+# override it with {"max_bytes": n}. Over budget, a full rebuild falls back
+# to an incremental update ("fallback") or is refused ("refuse").
+TRANSFORM_MAX_BYTES = int(os.environ.get("TRANSFORM_MAX_BYTES", "0"))
+TRANSFORM_OVER_BUDGET = os.environ.get("TRANSFORM_OVER_BUDGET", "fallback")
+# Incremental runs also look for series with raw rows stamped up to this
+# long before the previous watermark that are newer than the rows already
+# processed for the series. Ingest stamps rows when its MERGE runs, so a
+# MERGE still in flight when the watermark was read can commit rows stamped
+# just below it; this must exceed the longest ingest MERGE.
+TRANSFORM_WATERMARK_LOOKBACK = int(os.environ.get("TRANSFORM_WATERMARK_LOOKBACK_SECONDS", "600"))
+# Data versions whose tables are kept after a publish; readers that looked
+# up an older version (or a view) may still be reading its tables.
+TRANSFORM_KEEP_VERSIONS = int(os.environ.get("TRANSFORM_KEEP_VERSIONS", "2"))
+# A run waits up to TRANSFORM_LOCK_WAIT seconds for another to finish. The
+# lease expires after TRANSFORM_LOCK_TTL seconds, which must exceed the
+# function timeout, so a crashed run cannot hold it for good.
+TRANSFORM_LOCK_WAIT = float(os.environ.get("TRANSFORM_LOCK_WAIT_SECONDS", "120"))
+TRANSFORM_LOCK_TTL = int(os.environ.get("TRANSFORM_LOCK_TTL_SECONDS", "900"))
+LOCK_NAME = "transform"
+LOCK_POLL_SECONDS = 5
+
+# {raw_table} is filled in with the backend's reference to
+# raw_fred_observations. Ingest upserts it on (series_id, observation_date),
+# so it holds current values only and is read without deduplication.
+FULL_SOURCE = """
+SELECT series_id, observation_date, value, TRUE AS emit
+FROM {raw_table}
+WHERE {series_filter}
+"""
+
+# Series with raw rows stamped after @watermark that are newer than the
+# newest stamp already processed for the series in table @table_name
+# (recorded in {state_table}; every row is new for a series without one),
+# with their newest stamp and the processed one.
+CHANGED_SERIES = """
+SELECT series_id, MAX(raw.ingested_at) AS ingested_at, MAX(processed.ingested_at) AS processed_at
+FROM {raw_table} AS raw
+LEFT JOIN (
+    SELECT series_id, ingested_at FROM {state_table} WHERE table_name = @table_name
+) AS processed USING (series_id)
+WHERE raw.ingested_at > @watermark
+  AND (processed.ingested_at IS NULL OR raw.ingested_at > processed.ingested_at)
+  AND {series_filter}
+GROUP BY series_id
+"""
+
+# Rows of the CHANGED_SERIES from {lookback} rows before their earliest
+# new row onward. A row is emitted if any of the {lookback} rows before it,
+# or the row itself, is new: later rows' windows do not reach a new row, so
+# their stored values still hold.
+INCREMENTAL_SOURCE = """
+WITH changed AS ({changed_series}),
+numbered AS (
+    SELECT
+        series_id,
+        raw.observation_date,
+        raw.value,
+        (changed.processed_at IS NULL OR raw.ingested_at > changed.processed_at) AS is_changed,
+        ROW_NUMBER() OVER (
+            PARTITION BY series_id ORDER BY raw.observation_date
+        ) AS rn
+    FROM {raw_table} AS raw
+    JOIN changed USING (series_id)
+),
+bounded AS (
     SELECT
         series_id,
         observation_date,
         value,
-        LAG(value) OVER (PARTITION BY series_id ORDER BY observation_date) AS prev_value,
-        LAG(value, 12) OVER (PARTITION BY series_id ORDER BY observation_date) AS value_12m_ago,
-        AVG(value) OVER (
+        rn,
+        MIN(CASE WHEN is_changed THEN rn END) OVER (PARTITION BY series_id) AS first_changed,
+        MAX(CASE WHEN is_changed THEN 1 ELSE 0 END) OVER (
             PARTITION BY series_id ORDER BY observation_date
-            ROWS BETWEEN 2 PRECEDING AND CURRENT ROW
-        ) AS ma_3m,
-        AVG(value) OVER (
-            PARTITION BY series_id ORDER BY observation_date
-            ROWS BETWEEN 11 PRECEDING AND CURRENT ROW
-        ) AS ma_12m,
-        AVG(value) OVER (
-            PARTITION BY series_id ORDER BY observation_date
-            ROWS BETWEEN 59 PRECEDING AND CURRENT ROW
-        ) AS mean_5y,
-        STDDEV(value) OVER (
-            PARTITION BY series_id ORDER BY observation_date
-            ROWS BETWEEN 59 PRECEDING AND CURRENT ROW
-        ) AS stddev_5y
-    FROM (
-        SELECT
-            series_id,
-            observation_date,
-            value,
-            ROW_NUMBER() OVER (
-                PARTITION BY series_id, observation_date
-                ORDER BY ingested_at DESC
-            ) AS rn
-        FROM `{PROJECT}.{DATASET}.raw_fred_observations`
-    )
-    WHERE rn = 1
+            ROWS BETWEEN {lookback} PRECEDING AND CURRENT ROW
+        ) = 1 AS emit
+    FROM numbered
+)
+SELECT series_id, observation_date, value, emit
+FROM bounded
+WHERE rn >= first_changed - {lookback}
+"""
+
+
+# Newest analytics_monthly row of each series selected by {series_filter},
+# with the observation before it, for the overview scorecard.
+LATEST_SQL = """
+SELECT {columns}
+FROM (
+    SELECT
+        *,
+        LAG(observation_date) OVER (PARTITION BY series_id ORDER BY observation_date) AS prev_observation_date,
+        LAG(value) OVER (PARTITION BY series_id ORDER BY observation_date) AS prev_value,
+        ROW_NUMBER() OVER (PARTITION BY series_id ORDER BY observation_date DESC) AS rn
+    FROM {analytics_table}
+    WHERE {series_filter}
 )
-SELECT
-    series_id,
-    observation_date,
-    value,
-    value - prev_value AS mom_change,
-    SAFE_DIVIDE(value - prev_value, ABS(prev_value)) * 100 AS mom_pct_change,
-    value - value_12m_ago AS yoy_change,
-    SAFE_DIVIDE(value - value_12m_ago, ABS(value_12m_ago)) * 100 AS yoy_pct_change,
-    ROUND(ma_3m, 4) AS ma_3m,
-    ROUND(ma_12m, 4) AS ma_12m,
-    SAFE_DIVIDE(value - mean_5y, stddev_5y) AS z_score_5y
-FROM ordered
+WHERE rn = 1
 """
 
 
+def series_filter(frequency: str | None = None, series: list[str] | None = None) -> str:
+    """SQL condition on ``series_id`` selecting series of ``frequency`` (all
+    if None), limited to ``series`` if given."""
+    if frequency is None:
+        condition = "TRUE"
+    elif frequency == DEFAULT_FREQUENCY:
+        ids = [sid for sid, f in SERIES_FREQUENCY.items() if f != DEFAULT_FREQUENCY]
+        condition = f"series_id NOT IN ({_sql_list(ids)})" if ids else "TRUE"
+    else:
+        ids = series_with_frequency(frequency)
+        condition = f"series_id IN ({_sql_list(ids)})" if ids else "FALSE"
+    if series is not None:
+        condition += f" AND series_id IN ({_sql_list(series)})" if series else " AND FALSE"
+    return condition
+
+
+def _sql_list(ids: list[str]) -> str:
+    return ", ".join("'" + sid.replace("'", "''") + "'" for sid in ids)
+
+
+def changed_series_sql(
+    raw_table: str, state_table: str, frequency: str | None = None, series: list[str] | None = None,
+) -> str:
+    """CHANGED_SERIES of ``frequency`` (all if None), of ``series`` only if given."""
+    return CHANGED_SERIES.format(
+        raw_table=raw_table, state_table=state_table, series_filter=series_filter(frequency, series),
+    )
+
+
+def _metrics_sql(
+    metrics: list[dict], raw_table: str, frequency: str, state_table: str | None, series: list[str] | None,
+) -> str:
+    """SELECT of ``metrics`` over the raw rows of series of ``frequency``."""
+    if state_table is None:
+        source = FULL_SOURCE.format(raw_table=raw_table, series_filter=series_filter(frequency, series))
+    else:
+        source = INCREMENTAL_SOURCE.format(
+            raw_table=raw_table,
+            changed_series=changed_series_sql(raw_table, state_table, frequency, series),
+            lookback=registry.lookback_rows(metrics, frequency),
+        )
+    return registry.select_sql(metrics, frequency, source)
+
+
+def analytics_sql(raw_table: str, state_table: str | None = None, series: list[str] | None = None) -> str:
+    """Analytics SELECT over all of ``raw_table`` or, given the per-series
+    ``state_table``, over the CHANGED_SERIES (of ``series`` only, if given).
+
+    Series are grouped by frequency, each group with its own window sizes,
+    and the groups' results are concatenated.
+    """
+    parts = [
+        _metrics_sql(ANALYTICS_METRICS, raw_table, frequency, state_table, series)
+        for frequency in PERIODS_PER_YEAR
+    ]
+    return "\nUNION ALL\n".join(f"SELECT * FROM ({part})" for part in parts)
+
+
+def weekly_sql(raw_table: str, state_table: str | None = None, series: list[str] | None = None) -> str:
+    """Weekly analytics SELECT over the weekly series of ``raw_table``."""
+    return _metrics_sql(WEEKLY_METRICS, raw_table, "weekly", state_table, series)
+
+
+def latest_sql(analytics_table: str, series: list[str] | None = None) -> str:
+    """Latest-snapshot SELECT over ``analytics_table``, for ``series`` if given."""
+    return LATEST_SQL.format(
+        columns=", ".join(LATEST_COLUMNS),
+        analytics_table=analytics_table,
+        series_filter=f"series_id IN ({_sql_list(series)})" if series is not None else "TRUE",
+    )
+
+
+# Output tables: SELECT builder, columns and the series they cover
+TABLES = {
+    TABLE: (analytics_sql, COLUMNS, None),
+    WEEKLY_TABLE: (weekly_sql, WEEKLY_COLUMNS, "weekly"),
+}
+
+
+class TransformBusy(RuntimeError):
+    """Another run held the transform lock for all of TRANSFORM_LOCK_WAIT."""
+
+
+def run_table(name: str, run_id: str) -> str:
+    """Name of the table run ``run_id`` writes view ``name``'s rows to."""
+    return f"{name}_{run_id.removeprefix('transform_')}"
+
+
+@contextmanager
+def transform_lock(warehouse, holder: str):
+    """Hold the transform lease for the enclosed block, waiting for it up
+    to TRANSFORM_LOCK_WAIT seconds; raises TransformBusy if it stays taken."""
+    deadline = time.monotonic() + TRANSFORM_LOCK_WAIT
+    with warehouse.stage("lock"):
+        while not warehouse.acquire_lock(LOCK_NAME, holder, TRANSFORM_LOCK_TTL):
+            if time.monotonic() >= deadline:
+                raise TransformBusy(f"another transform run held the lock for {TRANSFORM_LOCK_WAIT:g}s")
+            time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        with warehouse.stage("lock"):
+            warehouse.release_lock(LOCK_NAME, holder)
+
+
+def update_table(
+    warehouse,
+    name: str,
+    watermark,
+    current: str | None,
+    run_id: str,
+    full: bool = False,
+    series: list[str] | None = None,
+    budget: int = 0,
+) -> dict:
+    """Bring table ``name`` up to date with the raw table as of ``watermark``.
+
+    ``current`` is the table currently published as ``name`` (None before
+    the first publish). Changes are written to a new table for run
+    ``run_id`` which run_transform then publishes: a full run (or the
+    first run) rebuilds it, an incremental run clones ``current`` and
+    MERGEs in recomputed rows for the CHANGED_SERIES: series with raw rows
+    stamped after the previous watermark less TRANSFORM_WATERMARK_LOOKBACK
+    that are newer than the series' rows already processed. The result's
+    ``table`` is the table holding the updated rows (``current`` if nothing
+    changed), its ``watermark`` the raw table's newest ``ingested_at`` and
+    its ``series_watermarks`` the newest ``ingested_at`` of each series it
+    processed, to record once that is published.
+
+    ``series`` scopes an incremental run to those series (the changed
+    series of an ingest event). The watermark then only advances if no
+    other series has rows after it, so series changed by another ingest
+    whose event has not been handled yet are still picked up later.
+
+    A statement whose dry run exceeds ``budget`` bytes is not run: a
+    rebuild of an existing table falls back to an incremental run unless
+    TRANSFORM_OVER_BUDGET is "refuse", otherwise the table is left as is
+    (mode "refused") and its watermark is not advanced.
+    """
+    build_sql, columns, frequency = TABLES[name]
+    raw_table = warehouse.table(RAW_TABLE)
+    state_table = warehouse.table(SERIES_STATE_TABLE)
+    target = run_table(name, run_id)
+    previous = warehouse.watermark(name)
+    fallback = False
+
+    if full or previous is None or current is None:
+        sql = build_sql(raw_table)
+        options = {"partition_by": "DATE_TRUNC(observation_date, MONTH)", "cluster_by": "series_id"}
+        estimate = warehouse.create_table_as(target, sql, **options, dry_run=True)
+        if not _over_budget(estimate, budget):
+            # Read before the build, which reads these rows and maybe newer ones
+            series_watermarks = warehouse.query(
+                f"SELECT series_id, MAX(ingested_at) FROM {raw_table} "
+                f"WHERE {series_filter(frequency)} GROUP BY series_id",
+            )
+            warehouse.create_table_as(target, sql, **options)
+            return {
+                "mode": "full", "series": None, "rows_merged": warehouse.num_rows(target),
+                "estimated_bytes": estimate, "table": target, "watermark": watermark,
+                "series_watermarks": series_watermarks,
+            }
+        if previous is None or current is None or TRANSFORM_OVER_BUDGET == "refuse":
+            return _refused(name, estimate, budget, current)
+        fallback = True
+        _log_over_budget(name, "fallback", estimate, budget)
+
+    result = {"mode": "incremental", "series": [], "rows_merged": 0, "estimated_bytes": 0, "table": current}
+    if fallback:
+        result["fallback"] = True
+    # No shortcut when ``watermark`` has not moved: a late commit does not
+    # raise the newest stamp.
+    params = {"watermark": previous - timedelta(seconds=TRANSFORM_WATERMARK_LOOKBACK), "table_name": name}
+    series_watermarks = [
+        (sid, ingested_at) for sid, ingested_at, _ in sorted(warehouse.query(
+            changed_series_sql(raw_table, state_table, frequency, series), params,
+        ))
+    ]
+    changed = [sid for sid, _ in series_watermarks]
+    if changed:
+        merge = {
+            "select_sql": build_sql(raw_table, state_table, series=changed),
+            "keys": ["series_id", "observation_date"],
+            "columns": columns,
+            "params": params,
+        }
+        estimate = warehouse.merge_into(current, **merge, dry_run=True)
+        if _over_budget(estimate, budget):
+            return _refused(name, estimate, budget, current)
+        warehouse.clone_table(current, target)
+        result["estimated_bytes"] = estimate
+        result["rows_merged"] = warehouse.merge_into(target, **merge)
+        result["table"] = target
+        result["series_watermarks"] = series_watermarks
+    if series is None or not _pending_series(warehouse, frequency, previous, exclude=changed):
+        result["watermark"] = watermark
+    result["series"] = changed
+    return result
+
+
+def update_latest(warehouse, monthly: dict, current: str | None, run_id: str, budget: int = 0) -> dict:
+    """Refresh ``analytics_latest`` from the updated ``analytics_monthly``.
+
+    ``monthly`` is that table's update result: a full rebuild of it (or no
+    published snapshot) rebuilds the snapshot, otherwise a copy of the
+    ``current`` snapshot has the rows of the series it recomputed replaced.
+    Nothing is done if the update of ``analytics_monthly`` was refused.
+    """
+    unchanged = {"mode": "incremental", "series": [], "rows_merged": 0, "estimated_bytes": 0, "table": current}
+    if monthly["mode"] == "refused":
+        return unchanged
+    analytics_table = warehouse.table(monthly["table"])
+    target = run_table(LATEST_TABLE, run_id)
+    if monthly["mode"] == "full" or current is None:
+        sql = latest_sql(analytics_table)
+        estimate = warehouse.create_table_as(target, sql, cluster_by="series_id", dry_run=True)
+        if _over_budget(estimate, budget):
+            return _refused(LATEST_TABLE, estimate, budget, current)
+        warehouse.create_table_as(target, sql, cluster_by="series_id")
+        return {
+            "mode": "full", "series": None, "rows_merged": warehouse.num_rows(target),
+            "estimated_bytes": estimate, "table": target,
+        }
+    if not monthly["series"]:
+        return unchanged
+    merge = {
+        "select_sql": latest_sql(analytics_table, monthly["series"]),
+        "keys": ["series_id"],
+        "columns": LATEST_COLUMNS,
+    }
+    estimate = warehouse.merge_into(current, **merge, dry_run=True)
+    if _over_budget(estimate, budget):
+        return _refused(LATEST_TABLE, estimate, budget, current)
+    warehouse.clone_table(current, target)
+    merged = warehouse.merge_into(target, **merge)
+    return {
+        "mode": "incremental", "series": monthly["series"], "rows_merged": merged,
+        "estimated_bytes": estimate, "table": target,
+    }
+
+
+def _over_budget(estimate: int | None, budget: int) -> bool:
+    """Whether a dry run's ``estimate`` exceeds ``budget`` (never without
+    a budget or an estimate)."""
+    return bool(budget) and estimate is not None and estimate > budget
+
+
+def _refused(name: str, estimate: int, budget: int, current: str | None) -> dict:
+    _log_over_budget(name, "refused", estimate, budget)
+    return {"mode": "refused", "series": [], "rows_merged": 0, "estimated_bytes": estimate, "table": current}
+
+
+def _log_over_budget(name: str, action: str, estimate: int, budget: int) -> None:
+    log_event(
+        "transform_over_budget", severity="WARNING",
+        table=name, action=action, estimated_bytes=estimate, budget_bytes=budget,
+    )
+
+
+def _pending_series(warehouse, frequency: str | None, watermark, exclude: list[str]) -> bool:
+    """Whether a series of ``frequency`` outside ``exclude`` has raw rows after ``watermark``."""
+    condition = series_filter(frequency)
+    if exclude:
+        condition += f" AND series_id NOT IN ({_sql_list(exclude)})"
+    return bool(warehouse.query(
+        f"SELECT 1 FROM {warehouse.table(RAW_TABLE)} WHERE ingested_at > @watermark AND {condition} LIMIT 1",
+        {"watermark": watermark},
+    ))
+
+
+def _sum(values) -> int | None:
+    """Sum of the non-None ``values``, or None if there are none."""
+    values = [v for v in values if v is not None]
+    return sum(values) if values else None
+
+
+def _staged(warehouse, name: str, update) -> dict:
+    """Call ``update()`` with jobs labelled ``name`` and add its job
+    statistics to the result under ``stats``."""
+    first = len(warehouse.jobs)
+    t0 = time.perf_counter()
+    with warehouse.stage(name):
+        result = update()
+    jobs = warehouse.jobs[first:]
+    result["stats"] = {
+        "bytes_processed": _sum(j["bytes_processed"] for j in jobs),
+        "slot_ms": _sum(j["slot_ms"] for j in jobs),
+        "elapsed_seconds": round(time.perf_counter() - t0, 3),
+        "jobs": jobs,
+    }
+    return result
+
+
+def publish(warehouse, tables: dict, published: dict, run_id: str) -> int:
+    """Publish ``tables`` (view name to table) as the next data version
+    after ``published``, the newest version; returns the new version.
+
+    Recording the version switches readers that resolve tables through
+    ``data_versions`` (the dashboard) to all of the new tables at once.
+    The views are repointed after that, one statement each, so a query
+    joining two views may briefly read different versions. Every view is
+    repointed, so views left behind by a publish that failed partway catch
+    up at the next one.
+    Tables that only versions older than the newest
+    TRANSFORM_KEEP_VERSIONS refer to are then dropped.
+
+    Runs are serialized by ``transform_lock``; should one publish anyway
+    (an expired lease), the version is recorded only if no other run has
+    taken it, and nothing is repointed otherwise.
+    """
+    version = published["version"] + 1
+    if not warehouse.save_version(version, tables, run_id, datetime.now(timezone.utc)):
+        raise RuntimeError(f"data version {version} was published by another run")
+    for name, table in tables.items():
+        warehouse.create_view(name, table)
+
+    history = warehouse.versions(TRANSFORM_KEEP_VERSIONS + 1)
+    kept = {table for entry in history[:TRANSFORM_KEEP_VERSIONS] for table in entry["tables"].values()}
+    for entry in history[TRANSFORM_KEEP_VERSIONS:]:
+        for table in entry["tables"].values():
+            if table not in kept:
+                warehouse.drop_table(table)
+    return version
+
+
+def _record_runs(
+    warehouse, run_id: str, run_at: datetime, results: dict, budget: int, data_version: int,
+) -> None:
+    """Append one transform_runs row per table; failures are only logged."""
+    runs = [
+        {
+            "run_id": run_id,
+            "run_at": run_at,
+            "table_name": name,
+            "mode": result["mode"],
+            "series": None if result["series"] is None else len(result["series"]),
+            "rows_merged": result["rows_merged"],
+            "estimated_bytes": result["estimated_bytes"],
+            "bytes_processed": result["stats"]["bytes_processed"],
+            "slot_ms": result["stats"]["slot_ms"],
+            "elapsed_seconds": result["stats"]["elapsed_seconds"],
+            "budget_bytes": budget or None,
+            "jobs": json.dumps(result["stats"]["jobs"]),
+            "data_version": data_version,
+        }
+        for name, result in results.items()
+    ]
+    try:
+        warehouse.record_runs(runs)
+    except Exception as e:
+        log_event("transform_runs_write_failed", severity="WARNING", run_id=run_id, error=str(e))
+
+
+def run_transform(
+    warehouse,
+    full: bool = False,
+    series: list[str] | None = None,
+    budget: int = TRANSFORM_MAX_BYTES,
+) -> dict:
+    """Bring every table in TABLES, then ``analytics_latest``, up to date
+    with the raw table, for ``series`` only if given (see update_table),
+    within a per-statement byte ``budget`` (0 for none).
+
+    The updated tables are published together as a new data version if
+    any changed, and the tables' watermarks are recorded after that. The
+    whole run holds the transform lock (see ``transform_lock``); tables
+    written by a run that fails before publishing are dropped.
+
+    The top-level ``mode``, ``series`` and ``rows_merged`` describe
+    ``analytics_monthly``, which covers every series; ``tables`` has the
+    result and job statistics of each table, ``stats`` the run's totals
+    and ``data_version`` the version published after the run.
+    """
+    run_id = f"transform_{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+    run_at = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    first = len(warehouse.jobs)
+    with transform_lock(warehouse, run_id):
+        with warehouse.stage("watermark"):
+            [(watermark,)] = warehouse.query(f"SELECT MAX(ingested_at) FROM {warehouse.table(RAW_TABLE)}")
+        if watermark is None:
+            return {"mode": "noop", "series": [], "rows_merged": 0, "tables": {}}
+        with warehouse.stage("publish"):
+            [published] = warehouse.versions(1) or [{"version": 0, "tables": {}}]
+        current = published["tables"]
+        try:
+            results = {
+                name: _staged(warehouse, name, lambda: update_table(
+                    warehouse, name, watermark, current.get(name), run_id, full=full, series=series, budget=budget,
+                ))
+                for name in TABLES
+            }
+            results[LATEST_TABLE] = _staged(warehouse, LATEST_TABLE, lambda: update_latest(
+                warehouse, results[TABLE], current.get(LATEST_TABLE), run_id, budget=budget,
+            ))
+        except Exception:
+            _drop_run_tables(warehouse, run_id)
+            raise
+
+        tables = {name: result["table"] for name, result in results.items() if result["table"] is not None}
+        data_version = published["version"]
+        with warehouse.stage("publish"):
+            if tables != current:
+                data_version = publish(warehouse, tables, published, run_id)
+            for name, result in results.items():
+                if "watermark" in result:
+                    warehouse.save_watermark(name, result.pop("watermark"))
+                warehouse.save_series_watermarks(name, result.pop("series_watermarks", []))
+    _record_runs(warehouse, run_id, run_at, results, budget, data_version)
+    jobs = warehouse.jobs[first:]
+    return {
+        **{k: v for k, v in results[TABLE].items() if k != "stats"},
+        "run_id": run_id,
+        "data_version": data_version,
+        "refused": [name for name, result in results.items() if result["mode"] == "refused"],
+        "tables": results,
+        "stats": {
+            "budget_bytes": budget or None,
+            "estimated_bytes": _sum(result["estimated_bytes"] for result in results.values()),
+            "bytes_processed": _sum(j["bytes_processed"] for j in jobs),
+            "slot_ms": _sum(j["slot_ms"] for j in jobs),
+            "elapsed_seconds": round(time.perf_counter() - t0, 3),
+        },
+    }
+
+
+def _drop_run_tables(warehouse, run_id: str) -> None:
+    """Drop whatever tables run ``run_id`` wrote before it failed."""
+    for name in [*TABLES, LATEST_TABLE]:
+        warehouse.drop_table(run_table(name, run_id))
+
+
+def handle_ingest_completed(message: dict, warehouse=None) -> dict:
+    """Transform the series an ingest completion event names.
+
+    ``message`` is the event published by ingest (functions/ingest_fred/
+    events.py): ``{"mode": ..., "series": [...], "ingested_at": ...}``.
+    Subscribe this to the ingest's ``local_bus`` for local runs.
+    """
+    warehouse = warehouse or get_warehouse(PROJECT, DATASET)
+    result = run_transform(warehouse, series=message.get("series") or [])
+    log_event(
+        "transform_on_ingest",
+        ingest_mode=message.get("mode"),
+        ingested_at=message.get("ingested_at"),
+        **{k: v for k, v in result.items() if k != "tables"},
+    )
+    return result
+
+
+@functions_framework.cloud_event
+def transform_on_ingest(cloud_event):
+    """Pub/Sub entry point: run the transform for an ingest completion event.
+
+    Errors propagate so that Pub/Sub redelivers the event.
+    """
+    message = json.loads(base64.b64decode(cloud_event.data["message"]["data"]))
+    handle_ingest_completed(message)
+
+
 @functions_framework.http
 def transform(request):
-    """HTTP entry point for the analytics transform function."""
-    client = bigquery.Client(project=PROJECT)
+    """HTTP entry point for the analytics transform function.
 
+    POST ``{"full": true}`` forces a full rebuild, ``{"series": [...]}``
+    limits an incremental run to those series and ``{"max_bytes": n}``
+    overrides TRANSFORM_MAX_BYTES. Responds 207 if a table's update was
+    refused as over budget and 409 if another run kept the lock.
+    """
     try:
-        query_job = client.query(TRANSFORM_SQL)
-        query_job.result()
+        request_json = request.get_json(silent=True) or {}
+        full = request_json.get("full", TRANSFORM_MODE == "full")
+        budget = int(request_json.get("max_bytes", TRANSFORM_MAX_BYTES))
+        warehouse = get_warehouse(PROJECT, DATASET)
+        result = run_transform(warehouse, full=full, series=request_json.get("series"), budget=budget)
 
-        # Get row count of the output table
-        table = client.get_table(f"{PROJECT}.{DATASET}.analytics_monthly")
-        row_count = table.num_rows
+        # Get row count of the published output table
+        published_table = result["tables"].get(TABLE, {}).get("table")
+        row_count = warehouse.num_rows(published_table) if published_table else 0
 
         return (
             json.dumps({
-                "status": "ok",
-                "table": f"{PROJECT}.{DATASET}.analytics_monthly",
+                "status": "over_budget" if result.get("refused") else "ok",
+                "table": warehouse.table_id(TABLE),
                 "rows": row_count,
-            }),
-            200,
+                **result,
+            }, default=str),
+            207 if result.get("refused") else 200,
+            {"Content-Type": "application/json"},
+        )
+    except TransformBusy as e:
+        return (
+            json.dumps({"status": "busy", "error": str(e)}),
+            409,
             {"Content-Type": "application/json"},
         )
     except Exception as e:
@@ -0,0 +1,146 @@
+"""Declarative registry of the analytics columns.
+
+Each metric is a dict naming the output column, its ``kind`` and its window,
+given either in ``months`` (converted to rows for each series' frequency, so
+a 12-month window is 52 rows of a weekly series) or in ``rows``:
+
+    lag         LAG(value, n)
+    diff        value - LAG(value, n)
+    pct         SAFE_DIVIDE(value - LAG(value, n), ABS(LAG(value, n))) * 100
+    mean, std, min, max
+                AVG/STDDEV/MIN/MAX(value) over the trailing n rows
+    zscore      SAFE_DIVIDE(value - AVG(value), STDDEV(value)) over n rows
+    date_part   EXTRACT(part FROM observation_date); no window
+
+An optional ``round`` rounds the result to that many digits.
+``select_sql`` turns a metric list into one SELECT: every window frame is
+declared once in a WINDOW clause and every window aggregate is computed
+once, however many metrics use it (z_score_5y and a 5-year mean share one
+AVG over the same frame). ``engine.evaluate`` computes the same metrics in
+Python.
+"""
+
+from config import PERIODS_PER_YEAR
+
+KINDS = {"lag", "diff", "pct", "mean", "std", "min", "max", "zscore", "date_part"}
+LAG_KINDS = {"lag", "diff", "pct"}
+
+# Columns of analytics_monthly, which holds every series
+ANALYTICS_METRICS = [
+    {"name": "mom_change", "kind": "diff", "months": 1},
+    {"name": "mom_pct_change", "kind": "pct", "months": 1},
+    {"name": "yoy_change", "kind": "diff", "months": 12},
+    {"name": "yoy_pct_change", "kind": "pct", "months": 12},
+    {"name": "ma_3m", "kind": "mean", "months": 3, "round": 4},
+    {"name": "ma_12m", "kind": "mean", "months": 12, "round": 4},
+    {"name": "z_score_5y", "kind": "zscore", "months": 60},
+]
+
+# Columns of analytics_weekly, which holds weekly series only
+WEEKLY_METRICS = [
+    {"name": "wow_change", "kind": "diff", "rows": 1},
+    {"name": "wow_pct_change", "kind": "pct", "rows": 1},
+    {"name": "yoy_change", "kind": "diff", "rows": 52},
+    {"name": "yoy_pct_change", "kind": "pct", "rows": 52},
+    {"name": "ma_4w", "kind": "mean", "rows": 4, "round": 4},
+    {"name": "iso_year", "kind": "date_part", "part": "ISOYEAR"},
+    {"name": "week_of_year", "kind": "date_part", "part": "ISOWEEK"},
+]
+
+# Window aggregate behind each rolling kind; zscore uses both mean and std
+_AGGREGATES = {"mean": "AVG", "std": "STDDEV", "min": "MIN", "max": "MAX"}
+
+
+def window_rows(metric: dict, frequency: str) -> int:
+    """Rows in ``metric``'s window for a series of ``frequency``."""
+    if metric["kind"] not in KINDS:
+        raise ValueError(f"Unknown metric kind {metric['kind']!r} for {metric['name']}")
+    if "rows" in metric:
+        return metric["rows"]
+    if "months" in metric:
+        return round(metric["months"] * PERIODS_PER_YEAR[frequency] / 12)
+    return 0
+
+
+def lookback_rows(metrics: list[dict], frequency: str) -> int:
+    """Preceding rows the metrics read: a lag of n reads n rows back, a
+    rolling window of n rows includes the current row."""
+    lookback = 0
+    for metric in metrics:
+        n = window_rows(metric, frequency)
+        if metric["kind"] in LAG_KINDS:
+            lookback = max(lookback, n)
+        elif metric["kind"] != "date_part":
+            lookback = max(lookback, n - 1)
+    return lookback
+
+
+def columns(metrics: list[dict]) -> list[str]:
+    """Output columns of ``select_sql``."""
+    return ["series_id", "observation_date", "value"] + [m["name"] for m in metrics]
+
+
+def _aggregates(metric: dict) -> list[str]:
+    if metric["kind"] == "zscore":
+        return ["mean", "std"]
+    if metric["kind"] in _AGGREGATES:
+        return [metric["kind"]]
+    return []
+
+
+def _expression(metric: dict, n: int) -> str:
+    kind = metric["kind"]
+    if kind == "lag":
+        expr = f"lag_{n}"
+    elif kind == "diff":
+        expr = f"value - lag_{n}"
+    elif kind == "pct":
+        expr = f"SAFE_DIVIDE(value - lag_{n}, ABS(lag_{n})) * 100"
+    elif kind == "zscore":
+        expr = f"SAFE_DIVIDE(value - mean_{n}, std_{n})"
+    elif kind == "date_part":
+        expr = f"EXTRACT({metric['part']} FROM observation_date)"
+    else:
+        expr = f"{kind}_{n}"
+    if "round" in metric:
+        expr = f"ROUND({expr}, {metric['round']})"
+    return expr
+
+
+def select_sql(metrics: list[dict], frequency: str, source: str) -> str:
+    """One SELECT computing ``metrics`` for series of ``frequency``.
+
+    ``source`` yields series_id, observation_date, value and a boolean
+    ``emit``; windows are computed over every source row but only emitted
+    rows are output.
+    """
+    lags, frames, inner = set(), set(), {}
+    for metric in metrics:
+        n = window_rows(metric, frequency)
+        if metric["kind"] in LAG_KINDS:
+            lags.add(n)
+        for aggregate in _aggregates(metric):
+            frames.add(n)
+            inner[f"{aggregate}_{n}"] = f"{_AGGREGATES[aggregate]}(value) OVER rows_{n}"
+    for n in sorted(lags):
+        inner[f"lag_{n}"] = f"LAG(value, {n}) OVER series_window"
+
+    select = ["series_id", "observation_date", "value", "emit"]
+    select += [f"{expr} AS {alias}" for alias, expr in sorted(inner.items())]
+    windows = ["series_window AS (PARTITION BY series_id ORDER BY observation_date)"]
+    windows += [
+        f"rows_{n} AS (series_window ROWS BETWEEN {n - 1} PRECEDING AND CURRENT ROW)"
+        for n in sorted(frames)
+    ]
+    outputs = ["series_id", "observation_date", "value"]
+    outputs += [f"{_expression(m, window_rows(m, frequency))} AS {m['name']}" for m in metrics]
+    return (
+        "WITH windowed AS (\n"
+        "    SELECT\n        " + ",\n        ".join(select) + "\n"
+        f"    FROM ({source})\n"
+        "    WINDOW\n        " + ",\n        ".join(windows) + "\n"
+        ")\n"
+        "SELECT\n    " + ",\n    ".join(outputs) + "\n"
+        "FROM windowed\n"
+        "WHERE emit\n"
+    )
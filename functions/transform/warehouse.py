@@ -0,0 +1,561 @@
+"""Storage backends for the transform: BigQuery, or an embedded DuckDB file.
+
+``WAREHOUSE_BACKEND=duckdb`` runs the same analytics SQL against the local
+DuckDB database the ingest function writes to (``DUCKDB_PATH``).
+
+Both backends record every statement they run in ``jobs``, labelled with
+the current ``stage``: elapsed seconds and, on BigQuery, bytes processed
+and slot-milliseconds. ``dry_run=True`` on the statements that scan raw
+data returns the bytes they would process instead of running them (None
+on DuckDB, which cannot estimate).
+
+Analytics tables are published as views over versioned tables: see
+``create_view``, ``clone_table`` and the ``data_versions`` log. Runs are
+serialized by a lease in ``transform_lock`` (``acquire_lock``).
+"""
+
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from google.api_core.exceptions import BadRequest, NotFound
+from google.cloud import bigquery
+
+BACKEND = os.environ.get("WAREHOUSE_BACKEND", "bigquery")
+DUCKDB_PATH = os.environ.get("DUCKDB_PATH", "labor_market.duckdb")
+
+STATE_TABLE = "transform_state"
+SERIES_STATE_TABLE = "transform_series_state"
+RUNS_TABLE = "transform_runs"
+RUNS_COLUMNS = [
+    "run_id", "run_at", "table_name", "mode", "series", "rows_merged", "estimated_bytes",
+    "bytes_processed", "slot_ms", "elapsed_seconds", "budget_bytes", "jobs", "data_version",
+]
+VERSIONS_TABLE = "data_versions"
+LOCK_TABLE = "transform_lock"
+# Suffix an analytics table from before versioning is renamed with while a
+# view takes its name
+LEGACY_SUFFIX = "_unversioned"
+
+# Inserts the next data version only if neither it nor a newer one exists
+_INSERT_VERSION = """
+INSERT INTO {table} (version, published_at, run_id, tables)
+SELECT @version, @published_at, @run_id, @tables
+FROM (SELECT 1) AS one
+WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE version >= @version)
+"""
+
+# BigQuery's EXTRACT(ISOWEEK ...) is DuckDB's EXTRACT(WEEK ...)
+_ISOWEEK = re.compile(r"EXTRACT\(ISOWEEK FROM", re.IGNORECASE)
+
+
+def _query_parameter(name: str, value) -> bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter:
+    """BigQuery parameter for a Python value, typed from the value."""
+    if isinstance(value, list):
+        return bigquery.ArrayQueryParameter(name, "STRING", value)
+    if isinstance(value, datetime):
+        return bigquery.ScalarQueryParameter(name, "TIMESTAMP", value)
+    if isinstance(value, date):
+        return bigquery.ScalarQueryParameter(name, "DATE", value)
+    if isinstance(value, int):
+        return bigquery.ScalarQueryParameter(name, "INT64", value)
+    if isinstance(value, float):
+        return bigquery.ScalarQueryParameter(name, "FLOAT64", value)
+    return bigquery.ScalarQueryParameter(name, "STRING", value)
+
+
+def _series_state_sql(name: str, watermarks: list[tuple]) -> tuple[str, dict]:
+    """SELECT of one (table_name, series_id, ingested_at) row per entry of
+    ``watermarks`` for table ``name``, with its parameters."""
+    rows, params = [], {"table_name": name}
+    for i, (series_id, ingested_at) in enumerate(watermarks):
+        params[f"series_id_{i}"] = series_id
+        params[f"ingested_at_{i}"] = ingested_at
+        rows.append(f"SELECT @table_name AS table_name, @series_id_{i} AS series_id, @ingested_at_{i} AS ingested_at")
+    return "\nUNION ALL\n".join(rows), params
+
+
+def _insert_runs_sql(table: str, runs: list[dict]) -> tuple[str, dict]:
+    """INSERT of ``runs`` into the run-history ``table``, with its parameters.
+
+    Integer columns are CAST so that None parameters (typed STRING) insert
+    as NULL.
+    """
+    integers = {
+        "series", "rows_merged", "estimated_bytes", "bytes_processed", "slot_ms", "budget_bytes", "data_version",
+    }
+    rows, params = [], {}
+    for i, run in enumerate(runs):
+        values = []
+        for column in RUNS_COLUMNS:
+            params[f"{column}_{i}"] = run[column]
+            values.append(f"CAST(@{column}_{i} AS INT64)" if column in integers else f"@{column}_{i}")
+        rows.append("(" + ", ".join(values) + ")")
+    sql = f"INSERT INTO {table} ({', '.join(RUNS_COLUMNS)}) VALUES\n" + ",\n".join(rows)
+    return sql, params
+
+
+class BigQueryWarehouse:
+    def __init__(self, project: str, dataset: str):
+        self.project = project
+        self.dataset = dataset
+        self.client = bigquery.Client(project=project)
+        self.jobs = []
+        self._stage = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Label the jobs run in the enclosed block with ``name``."""
+        previous, self._stage = self._stage, name
+        try:
+            yield
+        finally:
+            self._stage = previous
+
+    def _run(self, sql: str, params: dict | None = None, dry_run: bool = False):
+        """Run ``sql`` and record its job; with ``dry_run``, return the
+        bytes it would process instead."""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[_query_parameter(k, v) for k, v in (params or {}).items()],
+            dry_run=dry_run,
+            use_query_cache=not dry_run,
+        )
+        t0 = time.perf_counter()
+        job = self.client.query(sql, job_config=job_config)
+        if dry_run:
+            return job.total_bytes_processed
+        rows = job.result()
+        self.jobs.append({
+            "stage": self._stage,
+            "job_id": job.job_id,
+            "bytes_processed": job.total_bytes_processed,
+            "slot_ms": job.slot_millis,
+            "seconds": round(time.perf_counter() - t0, 3),
+        })
+        return job, rows
+
+    def table_id(self, name: str) -> str:
+        return f"{self.project}.{self.dataset}.{name}"
+
+    def table(self, name: str) -> str:
+        """Table reference for use inside SQL."""
+        return f"`{self.table_id(name)}`"
+
+    def create_table_as(
+        self,
+        name: str,
+        select_sql: str,
+        partition_by: str | None = None,
+        cluster_by: str | None = None,
+        dry_run: bool = False,
+    ) -> int | None:
+        """Replace table ``name`` with the result of ``select_sql``."""
+        ddl = f"CREATE OR REPLACE TABLE {self.table(name)}\n"
+        if partition_by:
+            ddl += f"PARTITION BY {partition_by}\n"
+        if cluster_by:
+            ddl += f"CLUSTER BY {cluster_by}\n"
+        if dry_run:
+            return self._run(f"{ddl}AS\n{select_sql}", dry_run=True)
+        self._run(f"{ddl}AS\n{select_sql}")
+
+    def num_rows(self, name: str) -> int:
+        return self.client.get_table(self.table_id(name)).num_rows
+
+    def query(self, sql: str, params: dict | None = None) -> list[tuple]:
+        """Run ``sql`` with ``@name`` parameters taken from ``params``."""
+        _, rows = self._run(sql, params)
+        return [tuple(row.values()) for row in rows]
+
+    def merge_into(
+        self,
+        name: str,
+        select_sql: str,
+        keys: list[str],
+        columns: list[str],
+        params: dict | None = None,
+        dry_run: bool = False,
+    ) -> int | None:
+        """Upsert the rows of ``select_sql`` into ``name`` on ``keys``; returns
+        rows merged, or with ``dry_run`` the bytes the MERGE would process."""
+        on = " AND ".join(f"target.{k} = source.{k}" for k in keys)
+        updates = ",\n                ".join(f"{c} = source.{c}" for c in columns if c not in keys)
+        sql = f"""
+            MERGE {self.table(name)} AS target
+            USING ({select_sql}) AS source
+            ON {on}
+            WHEN MATCHED THEN UPDATE SET
+                {updates}
+            WHEN NOT MATCHED THEN INSERT ROW
+        """
+        if dry_run:
+            return self._run(sql, params, dry_run=True)
+        job, _ = self._run(sql, params)
+        return job.num_dml_affected_rows or 0
+
+    def watermark(self, name: str) -> datetime | None:
+        """Newest raw ``ingested_at`` already reflected in table ``name``."""
+        rows = self.query(
+            f"SELECT watermark FROM {self.table(STATE_TABLE)} WHERE table_name = @table_name",
+            {"table_name": name},
+        )
+        return rows[0][0] if rows else None
+
+    def save_watermark(self, name: str, watermark: datetime) -> None:
+        self.query(f"""
+            MERGE {self.table(STATE_TABLE)} AS target
+            USING (SELECT @table_name AS table_name, @watermark AS watermark) AS source
+            ON target.table_name = source.table_name
+            WHEN MATCHED THEN
+                UPDATE SET watermark = source.watermark, updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN
+                INSERT (table_name, watermark, updated_at)
+                VALUES (source.table_name, source.watermark, CURRENT_TIMESTAMP())
+        """, {"table_name": name, "watermark": watermark})
+
+    def save_series_watermarks(self, name: str, watermarks: list[tuple]) -> None:
+        """Record the newest raw ``ingested_at`` reflected in table ``name``
+        for each series, from (series_id, ingested_at) pairs."""
+        if not watermarks:
+            return
+        source, params = _series_state_sql(name, watermarks)
+        self.query(f"""
+            MERGE {self.table(SERIES_STATE_TABLE)} AS target
+            USING ({source}) AS source
+            ON target.table_name = source.table_name AND target.series_id = source.series_id
+            WHEN MATCHED THEN
+                UPDATE SET ingested_at = source.ingested_at, updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN
+                INSERT (table_name, series_id, ingested_at, updated_at)
+                VALUES (source.table_name, source.series_id, source.ingested_at, CURRENT_TIMESTAMP())
+        """, params)
+
+    def record_runs(self, runs: list[dict]) -> None:
+        """Append rows to the run-history table."""
+        self.query(*_insert_runs_sql(self.table(RUNS_TABLE), runs))
+
+    def clone_table(self, source: str, name: str) -> None:
+        """Replace table ``name`` with a copy of ``source``; a table clone
+        stores only the changes later made to either table."""
+        self._run(f"CREATE OR REPLACE TABLE {self.table(name)} CLONE {self.table(source)}")
+
+    def drop_table(self, name: str) -> None:
+        self._run(f"DROP TABLE IF EXISTS {self.table(name)}")
+
+    def create_view(self, name: str, source: str) -> None:
+        """Point view ``name`` at table ``source``.
+
+        Replacing a view is atomic: each query reads either the old or the
+        new table. A table named ``name`` (from before the analytics tables
+        were versioned) is renamed out of the way and dropped once the view
+        replaces it; queries of ``name`` between the two statements fail.
+        """
+        try:
+            existing = self.client.get_table(self.table_id(name))
+        except NotFound:
+            existing = None
+        legacy = existing is not None and existing.table_type != "VIEW"
+        if legacy:
+            self._run(f"ALTER TABLE {self.table(name)} RENAME TO {name}{LEGACY_SUFFIX}")
+        self._run(f"CREATE OR REPLACE VIEW {self.table(name)} AS SELECT * FROM {self.table(source)}")
+        if legacy:
+            self.drop_table(f"{name}{LEGACY_SUFFIX}")
+
+    def versions(self, limit: int) -> list[dict]:
+        """The newest ``limit`` published data versions, newest first."""
+        rows = self.query(
+            f"SELECT version, tables FROM {self.table(VERSIONS_TABLE)} ORDER BY version DESC LIMIT @limit",
+            {"limit": limit},
+        )
+        return [{"version": version, "tables": json.loads(tables)} for version, tables in rows]
+
+    def save_version(self, version: int, tables: dict, run_id: str, published_at: datetime) -> bool:
+        """Record data ``version``; False if it (or a newer one) already exists."""
+        job, _ = self._run(_INSERT_VERSION.format(table=self.table(VERSIONS_TABLE)), {
+            "version": version, "published_at": published_at, "run_id": run_id, "tables": json.dumps(tables),
+        })
+        return bool(job.num_dml_affected_rows)
+
+    def acquire_lock(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        """Take (or renew) lease ``name`` for ``holder`` unless another
+        holder's lease is unexpired; returns whether ``holder`` has it.
+
+        A concurrent acquire that BigQuery refuses to serialize counts as
+        not acquired.
+        """
+        try:
+            job, _ = self._run(f"""
+                MERGE {self.table(LOCK_TABLE)} AS target
+                USING (SELECT @name AS name) AS source
+                ON target.name = source.name
+                WHEN MATCHED AND (target.expires_at < CURRENT_TIMESTAMP() OR target.holder = @holder) THEN
+                    UPDATE SET
+                        holder = @holder,
+                        acquired_at = CURRENT_TIMESTAMP(),
+                        expires_at = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @ttl_seconds SECOND)
+                WHEN NOT MATCHED THEN
+                    INSERT (name, holder, acquired_at, expires_at)
+                    VALUES (@name, @holder, CURRENT_TIMESTAMP(),
+                            TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @ttl_seconds SECOND))
+            """, {"name": name, "holder": holder, "ttl_seconds": ttl_seconds})
+        except BadRequest as e:
+            if "concurrent update" in str(e):
+                return False
+            raise
+        return bool(job.num_dml_affected_rows)
+
+    def release_lock(self, name: str, holder: str) -> None:
+        self.query(
+            f"DELETE FROM {self.table(LOCK_TABLE)} WHERE name = @name AND holder = @holder",
+            {"name": name, "holder": holder},
+        )
+
+
+class DuckDBWarehouse:
+    """Transform tables in a DuckDB schema named after the dataset.
+
+    BigQuery-only functions used by the analytics SQL are defined as macros,
+    ``@name`` query parameters are rewritten to DuckDB's ``$name``, ISO week
+    extraction is renamed and partitioning/clustering hints are ignored.
+    Jobs record elapsed seconds only.
+    """
+
+    def __init__(self, path: str, dataset: str):
+        import duckdb
+
+        self.dataset = dataset
+        self.jobs = []
+        self._stage = None
+        self.con = duckdb.connect(path)
+        self.con.execute(f"CREATE SCHEMA IF NOT EXISTS {dataset}")
+        self.con.execute(
+            "CREATE OR REPLACE TEMP MACRO safe_divide(a, b) AS "
+            "CASE WHEN b = 0 THEN NULL ELSE a / b END"
+        )
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dataset}.{STATE_TABLE} (
+                table_name VARCHAR     PRIMARY KEY,
+                watermark  TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ NOT NULL
+            )
+        """)
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dataset}.{SERIES_STATE_TABLE} (
+                table_name  VARCHAR     NOT NULL,
+                series_id   VARCHAR     NOT NULL,
+                ingested_at TIMESTAMPTZ NOT NULL,
+                updated_at  TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (table_name, series_id)
+            )
+        """)
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dataset}.{RUNS_TABLE} (
+                run_id          VARCHAR     NOT NULL,
+                run_at          TIMESTAMPTZ NOT NULL,
+                table_name      VARCHAR     NOT NULL,
+                mode            VARCHAR     NOT NULL,
+                series          BIGINT,
+                rows_merged     BIGINT,
+                estimated_bytes BIGINT,
+                bytes_processed BIGINT,
+                slot_ms         BIGINT,
+                elapsed_seconds DOUBLE,
+                budget_bytes    BIGINT,
+                jobs            VARCHAR,
+                data_version    BIGINT
+            )
+        """)
+        self.con.execute(f"ALTER TABLE {dataset}.{RUNS_TABLE} ADD COLUMN IF NOT EXISTS data_version BIGINT")
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dataset}.{VERSIONS_TABLE} (
+                version      BIGINT      PRIMARY KEY,
+                published_at TIMESTAMPTZ NOT NULL,
+                run_id       VARCHAR,
+                tables       VARCHAR     NOT NULL
+            )
+        """)
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dataset}.{LOCK_TABLE} (
+                name        VARCHAR     PRIMARY KEY,
+                holder      VARCHAR     NOT NULL,
+                acquired_at TIMESTAMPTZ NOT NULL,
+                expires_at  TIMESTAMPTZ NOT NULL
+            )
+        """)
+
+    @contextmanager
+    def stage(self, name: str):
+        previous, self._stage = self._stage, name
+        try:
+            yield
+        finally:
+            self._stage = previous
+
+    def _record(self, t0: float) -> None:
+        self.jobs.append({
+            "stage": self._stage,
+            "job_id": None,
+            "bytes_processed": None,
+            "slot_ms": None,
+            "seconds": round(time.perf_counter() - t0, 3),
+        })
+
+    def table_id(self, name: str) -> str:
+        return f"{self.dataset}.{name}"
+
+    def table(self, name: str) -> str:
+        return self.table_id(name)
+
+    def create_table_as(
+        self,
+        name: str,
+        select_sql: str,
+        partition_by: str | None = None,
+        cluster_by: str | None = None,
+        dry_run: bool = False,
+    ) -> int | None:
+        if dry_run:
+            return None
+        t0 = time.perf_counter()
+        self.con.execute(f"CREATE OR REPLACE TABLE {self.table(name)} AS\n{_duckdb_sql(select_sql)}")
+        self._record(t0)
+
+    def num_rows(self, name: str) -> int:
+        return self.con.execute(f"SELECT COUNT(*) FROM {self.table(name)}").fetchone()[0]
+
+    def query(self, sql: str, params: dict | None = None) -> list[tuple]:
+        t0 = time.perf_counter()
+        rows = self.con.execute(_duckdb_sql(sql), params or {}).fetchall()
+        self._record(t0)
+        return rows
+
+    def merge_into(
+        self,
+        name: str,
+        select_sql: str,
+        keys: list[str],
+        columns: list[str],
+        params: dict | None = None,
+        dry_run: bool = False,
+    ) -> int | None:
+        # Delete-and-insert in one transaction; the table has no key
+        # constraint for ON CONFLICT since it is built with CREATE TABLE AS.
+        if dry_run:
+            return None
+        on = " AND ".join(f"target.{k} = source.{k}" for k in keys)
+        t0 = time.perf_counter()
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            self.con.execute(
+                _duckdb_sql(f"CREATE OR REPLACE TEMP TABLE merge_source AS {select_sql}"), params or {}
+            )
+            self.con.execute(f"""
+                DELETE FROM {self.table(name)} AS target
+                WHERE EXISTS (SELECT 1 FROM merge_source AS source WHERE {on})
+            """)
+            merged = self.con.execute(f"""
+                INSERT INTO {self.table(name)} ({", ".join(columns)})
+                SELECT {", ".join(columns)} FROM merge_source
+            """).fetchone()[0]
+            self.con.execute("DROP TABLE merge_source")
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        self._record(t0)
+        return merged
+
+    def watermark(self, name: str) -> datetime | None:
+        rows = self.query(
+            f"SELECT watermark FROM {self.table(STATE_TABLE)} WHERE table_name = @table_name",
+            {"table_name": name},
+        )
+        return rows[0][0] if rows else None
+
+    def save_watermark(self, name: str, watermark: datetime) -> None:
+        self.query(f"""
+            INSERT INTO {self.table(STATE_TABLE)} VALUES (@table_name, @watermark, now())
+            ON CONFLICT (table_name) DO UPDATE SET
+                watermark = excluded.watermark,
+                updated_at = excluded.updated_at
+        """, {"table_name": name, "watermark": watermark})
+
+    def save_series_watermarks(self, name: str, watermarks: list[tuple]) -> None:
+        if not watermarks:
+            return
+        source, params = _series_state_sql(name, watermarks)
+        self.query(f"""
+            INSERT INTO {self.table(SERIES_STATE_TABLE)}
+            SELECT table_name, series_id, ingested_at, now() FROM ({source})
+            ON CONFLICT (table_name, series_id) DO UPDATE SET
+                ingested_at = excluded.ingested_at,
+                updated_at = excluded.updated_at
+        """, params)
+
+    def record_runs(self, runs: list[dict]) -> None:
+        self.query(*_insert_runs_sql(self.table(RUNS_TABLE), runs))
+
+    def clone_table(self, source: str, name: str) -> None:
+        self.query(f"CREATE OR REPLACE TABLE {self.table(name)} AS SELECT * FROM {self.table(source)}")
+
+    def drop_table(self, name: str) -> None:
+        self.query(f"DROP TABLE IF EXISTS {self.table(name)}")
+
+    def create_view(self, name: str, source: str) -> None:
+        existing = self.con.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_schema = $dataset AND table_name = $name",
+            {"dataset": self.dataset, "name": name},
+        ).fetchall()
+        legacy = bool(existing) and existing[0][0] != "VIEW"
+        if legacy:
+            self.query(f"ALTER TABLE {self.table(name)} RENAME TO {name}{LEGACY_SUFFIX}")
+        self.query(f"CREATE OR REPLACE VIEW {self.table(name)} AS SELECT * FROM {self.table(source)}")
+        if legacy:
+            self.drop_table(f"{name}{LEGACY_SUFFIX}")
+
+    def versions(self, limit: int) -> list[dict]:
+        rows = self.query(
+            f"SELECT version, tables FROM {self.table(VERSIONS_TABLE)} ORDER BY version DESC LIMIT @limit",
+            {"limit": limit},
+        )
+        return [{"version": version, "tables": json.loads(tables)} for version, tables in rows]
+
+    def save_version(self, version: int, tables: dict, run_id: str, published_at: datetime) -> bool:
+        [(inserted,)] = self.query(_INSERT_VERSION.format(table=self.table(VERSIONS_TABLE)), {
+            "version": version, "published_at": published_at, "run_id": run_id, "tables": json.dumps(tables),
+        })
+        return bool(inserted)
+
+    def acquire_lock(self, name: str, holder: str, ttl_seconds: int) -> bool:
+        rows = self.query(f"""
+            INSERT INTO {self.table(LOCK_TABLE)}
+            VALUES (@name, @holder, now(), now() + to_seconds(@ttl_seconds))
+            ON CONFLICT (name) DO UPDATE SET
+                holder = excluded.holder,
+                acquired_at = excluded.acquired_at,
+                expires_at = excluded.expires_at
+            WHERE {LOCK_TABLE}.expires_at < now() OR {LOCK_TABLE}.holder = excluded.holder
+            RETURNING holder
+        """, {"name": name, "holder": holder, "ttl_seconds": ttl_seconds})
+        return bool(rows)
+
+    def release_lock(self, name: str, holder: str) -> None:
+        self.query(
+            f"DELETE FROM {self.table(LOCK_TABLE)} WHERE name = @name AND holder = @holder",
+            {"name": name, "holder": holder},
+        )
+
+
+def _duckdb_sql(sql: str) -> str:
+    """Rewrite BigQuery SQL for DuckDB."""
+    return _ISOWEEK.sub("EXTRACT(WEEK FROM", re.sub(r"@(\w+)", r"$\1", sql))
+
+
+def get_warehouse(project: str, dataset: str):
+    """Return the backend selected by ``WAREHOUSE_BACKEND``."""
+    if BACKEND == "duckdb":
+        return DuckDBWarehouse(DUCKDB_PATH, dataset)
+    return BigQueryWarehouse(project, dataset)
@@ -9,14 +9,36 @@ INGEST_URL=$(gcloud functions describe ingest-fred \
   --gen2 --region="${REGION}" --project="${PROJECT_ID}" \
   --format='value(serviceConfig.uri)')
 
-echo "==> Triggering full backfill via ${INGEST_URL}"
-curl -s -X POST "${INGEST_URL}" \
+# The backfill runs as an asynchronous ingest job: the function returns a
+# job ID at once and Cloud Tasks workers process checkpointed date windows,
+# re-enqueueing themselves until every window is loaded.
+POLL_SECONDS="${POLL_SECONDS:-30}"
+BODY='{"async": true, "backfill": true, "observation_start": "2000-01-01"}'
+if [ -n "${BACKFILL_ID:-}" ]; then
+  BODY="{\"async\": true, \"backfill\": true, \"observation_start\": \"2000-01-01\", \"backfill_id\": \"${BACKFILL_ID}\"}"
+fi
+
+echo "==> Submitting full backfill job via ${INGEST_URL}"
+JOB_ID=$(curl -s -X POST "${INGEST_URL}" \
   -H "Authorization: bearer $(gcloud auth print-identity-token)" \
   -H "Content-Type: application/json" \
-  -d '{"backfill": true, "observation_start": "2000-01-01"}' | jq .
+  -d "${BODY}" | jq -r .job_id)
+echo "==> Job ${JOB_ID}"
+
+while true; do
+  sleep "${POLL_SECONDS}"
+  STATUS=$(curl -s "${INGEST_URL}?job_id=${JOB_ID}" \
+    -H "Authorization: bearer $(gcloud auth print-identity-token)")
+  STATE=$(echo "${STATUS}" | jq -r .status)
+  echo "    ${STATE}: $(echo "${STATUS}" | jq -r '[.progress[] | .windows_done // 0] | add // 0') windows done"
+  case "${STATE}" in
+    queued|running) ;;
+    *) echo "${STATUS}" | jq '{status, result: (.result | {errors, backfill})}'; break ;;
+  esac
+done
 
 echo ""
-echo "==> Backfill request sent. Check Cloud Logging for progress."
+echo "==> Backfill finished. Check Cloud Logging for details."
 
 TRANSFORM_URL=$(gcloud functions describe transform-analytics \
   --gen2 --region="${REGION}" --project="${PROJECT_ID}" \
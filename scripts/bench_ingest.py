@@ -0,0 +1,156 @@
+"""Benchmark the ingest function end to end against offline fakes.
+
+Runs ``main.ingest`` against the fake FRED server (in a child process) and
+the in-process fake BigQuery client, and reports wall time, peak Python
+memory and rows/sec for a full backfill followed by three incremental runs:
+the first after the backfill (watermarks only), one with nothing new at FRED
+(skipped by last_updated) and one after a simulated release.
+
+Every scenario sequence runs twice against fresh fakes: once untraced
+for wall time and rows/sec, and once under tracemalloc for peak memory,
+since tracing roughly doubles the runtime. Fake BigQuery work is included
+in the wall time but costs far less than real load and MERGE jobs.
+
+    python scripts/bench_ingest.py --monthly 19 --weekly 1 --years 25 --latency 0.02
+    python scripts/bench_ingest.py --error-rate 0.02 --burst-every 40 --burst-len 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "ingest_fred"))
+
+import fake_fred  # noqa: E402
+from fake_bigquery import FakeBigQueryClient  # noqa: E402
+
+import fred_client  # noqa: E402
+import main  # noqa: E402
+from warehouse import BigQueryWarehouse  # noqa: E402
+
+
+class Request:
+    method = "POST"
+    args = {}
+    base_url = "http://localhost:8080/"
+
+    def __init__(self, body: dict):
+        self.body = body
+
+    def get_json(self, silent: bool = True) -> dict:
+        return self.body
+
+
+def call_ingest(body: dict) -> dict:
+    # Structured per-series log lines would swamp the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        payload, status, _ = main.ingest(Request(body))
+    response = json.loads(payload)
+    response["status_code"] = status
+    return response
+
+
+def measure(name: str, bodies: list[dict], until=None, trace: bool = False) -> dict:
+    """Call ingest with each body in turn (repeating the last while ``until`` is false)."""
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    responses = []
+    for body in bodies:
+        responses.append(call_ingest(body))
+    while until is not None and not until(responses[-1]):
+        responses.append(call_ingest(bodies[-1]))
+    elapsed = time.perf_counter() - t0
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    parsed = sum(r["metrics"].get("rows_parsed", 0) for r in responses)
+    loaded = sum(s.get("rows_loaded", 0) for r in responses for s in r["results"].values())
+    return {
+        "scenario": name,
+        "calls": len(responses),
+        "seconds": elapsed,
+        "peak_mb": peak / 1e6,
+        "rows_parsed": parsed,
+        "rows_loaded": loaded,
+        "rows_per_sec": parsed / elapsed if elapsed else 0.0,
+        "requests": sum(r["fred_client"]["requests"] for r in responses),
+        "retries": sum(r["fred_client"]["retries"] for r in responses),
+        "errors": sum(len(r["errors"]) for r in responses),
+    }
+
+
+def run_scenarios(args: argparse.Namespace, options: dict, trace: bool) -> list[dict]:
+    """Run every scenario in order against a fresh fake FRED and BigQuery."""
+    process, base_url = fake_fred.start_server(**options)
+    fred_client.FRED_BASE_URL = f"{base_url}/fred/series/observations"
+    fred_client.FRED_SERIES_URL = f"{base_url}/fred/series"
+    bq = FakeBigQueryClient()
+    main.get_warehouse = lambda project, dataset, metrics=None: BigQueryWarehouse(
+        project, dataset, metrics, client=bq,
+    )
+
+    common = {"max_workers": args.workers}
+    backfill = {
+        **common,
+        "backfill": True,
+        "backfill_id": "bench",
+        "observation_start": main.DEFAULT_OBSERVATION_START,
+        "window_years": args.window_years,
+    }
+    try:
+        results = [
+            measure("backfill", [backfill], until=lambda r: r["backfill"]["complete"], trace=trace),
+            measure("incremental, first", [common], trace=trace),
+            measure("incremental, no change", [common], trace=trace),
+        ]
+        urllib.request.urlopen(urllib.request.Request(f"{base_url}/_advance", method="POST")).read()
+        results.append(measure("incremental, new release", [common], trace=trace))
+    finally:
+        process.terminate()
+    return results
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    fake_fred.add_server_arguments(parser)
+    parser.add_argument("--workers", type=int, default=main.MAX_WORKERS)
+    parser.add_argument("--window-years", type=int, default=main.BACKFILL_WINDOW_YEARS)
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="FRED requests/minute for the client (0 = unlimited)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    options = fake_fred.server_options(args)
+    main.FRED_SERIES = [{"series_id": sid, "frequency": f} for sid, f in options["series"].items()]
+    main.DEFAULT_OBSERVATION_START = f"{time.localtime().tm_year - args.years}-01-01"
+    main.FRED_REQUESTS_PER_MINUTE = args.rate_limit or 1e9
+    os.environ.setdefault("FRED_API_KEY", "offline")
+
+    results = run_scenarios(args, options, trace=False)
+    for result, traced in zip(results, run_scenarios(args, options, trace=True)):
+        result["peak_mb"] = traced["peak_mb"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    series = len(options["series"])
+    print(f"{series} series, {args.years} years, workers={args.workers}, latency={args.latency}s, "
+          f"error_rate={args.error_rate}, 429 bursts={args.burst_len}/{args.burst_every or '-'}")
+    for r in results:
+        print(f"  {r['scenario']:26s} {r['seconds']:7.3f}s  peak={r['peak_mb']:6.1f} MB  "
+              f"{r['rows_per_sec']:10,.0f} rows/s  parsed={r['rows_parsed']:,}  loaded={r['rows_loaded']:,}  "
+              f"requests={r['requests']}  retries={r['retries']}  errors={r['errors']}")
+
+
+if __name__ == "__main__":
+    main_()
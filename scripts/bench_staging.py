@@ -0,0 +1,115 @@
+"""Benchmark JSON vs Parquet staging for a synthetic FRED backfill.
+
+Builds the rows a full backfill from 2000 would produce (monthly, weekly and
+daily series) and measures, for each staging path, the time and peak Python
+memory needed to go from parsed FRED observations to the load-job payload.
+
+    python scripts/bench_staging.py --monthly 19 --weekly 1 --daily 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "ingest_fred"))
+
+from staging import ObservationColumns, StagingFile  # noqa: E402
+
+START = date(2000, 1, 1)
+STEP_DAYS = {"monthly": 30, "weekly": 7, "daily": 1}
+
+
+def synthetic_observations(frequency: str, end: date) -> list[dict]:
+    """FRED-shaped observation dicts from START to ``end``."""
+    observations = []
+    d = START
+    step = timedelta(days=STEP_DAYS[frequency])
+    i = 0
+    while d <= end:
+        observations.append({
+            "realtime_start": end.isoformat(),
+            "realtime_end": end.isoformat(),
+            "date": d.isoformat(),
+            "value": "." if i % 97 == 0 else f"{1000 + i * 0.25:.2f}",
+        })
+        d += step
+        i += 1
+    return observations
+
+
+def stage_json(payloads: dict[str, list[dict]], ingested_at: datetime) -> int:
+    """Original path: list of row dicts serialized as newline-delimited JSON."""
+    stamp = ingested_at.isoformat()
+    rows = []
+    for sid, observations in payloads.items():
+        for obs in observations:
+            if obs["value"] == ".":
+                continue
+            rows.append({
+                "series_id": sid,
+                "observation_date": obs["date"],
+                "value": float(obs["value"]),
+                "realtime_start": obs["realtime_start"],
+                "realtime_end": obs["realtime_end"],
+                "ingested_at": stamp,
+            })
+    # Mirrors google.cloud.bigquery.Client.load_table_from_json
+    return len("\n".join(json.dumps(row) for row in rows).encode())
+
+
+def stage_parquet(payloads: dict[str, list[dict]], ingested_at: datetime) -> int:
+    """Columnar path: typed arrays serialized as Parquet row groups."""
+    staged = StagingFile(ingested_at, "parquet")
+    for sid, observations in payloads.items():
+        chunk = ObservationColumns()
+        for obs in observations:
+            if obs["value"] == ".":
+                continue
+            chunk.append(sid, obs["date"], float(obs["value"]), obs["realtime_start"], obs["realtime_end"])
+        staged.write(chunk)
+    size = len(staged.finish().read())
+    staged.close()
+    return size
+
+
+def measure(fn, payloads, ingested_at) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn(payloads, ingested_at)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": elapsed, "peak_mb": peak / 1e6, "payload_mb": size / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--monthly", type=int, default=19)
+    parser.add_argument("--weekly", type=int, default=1)
+    parser.add_argument("--daily", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    end = date.today()
+    payloads = {}
+    for frequency in ("monthly", "weekly", "daily"):
+        for i in range(getattr(args, frequency)):
+            payloads[f"{frequency.upper()}{i:03d}"] = synthetic_observations(frequency, end)
+    total = sum(len(obs) for obs in payloads.values())
+    print(f"Synthetic backfill: {len(payloads)} series, {total:,} observations")
+
+    ingested_at = datetime.now(timezone.utc)
+    for name, fn in (("json", stage_json), ("parquet", stage_parquet)):
+        runs = [measure(fn, payloads, ingested_at) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["seconds"])
+        print(f"  {name:8s} {best['seconds']:.3f}s  "
+              f"peak={best['peak_mb']:.1f} MB  payload={best['payload_mb']:.2f} MB  "
+              f"({total / best['seconds']:,.0f} obs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark the vectorized transform engine on synthetic series.
+
+Times ``engine.evaluate`` of the analytics_monthly metrics over thousands of synthetic monthly series and,
+for reference, the analytics SQL on the same rows in an in-memory DuckDB
+database (fetched as a DataFrame). Each is the best of ``--repeat`` runs.
+
+    python scripts/bench_transform.py --series 5000 --periods 300
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "transform"))
+
+import engine  # noqa: E402
+from main import RAW_TABLE, analytics_sql  # noqa: E402
+from registry import ANALYTICS_METRICS  # noqa: E402
+from warehouse import DuckDBWarehouse  # noqa: E402
+
+
+def synthetic_raw(n_series: int, periods: int, seed: int = 0) -> pa.Table:
+    """Monthly random-walk series from 2000-01-01, sorted by series and date.
+
+    Lengths vary from half to all of ``periods`` so series end at different
+    dates, and levels span several orders of magnitude like FRED's do.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(max(1, periods // 2), periods + 1, size=n_series)
+    levels = 10.0 ** rng.uniform(0, 5, size=n_series)
+    series_ids = np.repeat([f"S{i:05d}" for i in range(n_series)], lengths)
+    offsets = np.concatenate([np.arange(n) for n in lengths])
+    steps = rng.normal(0, 0.01, size=len(offsets))
+    values = np.repeat(levels, lengths) * np.exp(np.cumsum(steps))
+    first = date(2000, 1, 1)
+    dates = np.array(
+        [date(first.year + m // 12, m % 12 + 1, 1) for m in range(periods)], dtype="datetime64[D]",
+    )[offsets]
+    return pa.table({
+        "series_id": series_ids,
+        "observation_date": pa.array(dates, pa.date32()),
+        "value": values,
+        "ingested_at": pa.array(np.full(len(values), np.datetime64("2024-01-01T00:00:00", "us")),
+                                pa.timestamp("us", tz="UTC")),
+    })
+
+
+def duckdb_with_raw(raw: pa.Table) -> DuckDBWarehouse:
+    """In-memory DuckDB warehouse whose raw table holds ``raw``."""
+    warehouse = DuckDBWarehouse(":memory:", "bench")
+    warehouse.con.register("raw_rows", raw)
+    warehouse.con.execute(f"CREATE TABLE {warehouse.table(RAW_TABLE)} AS SELECT * FROM raw_rows")
+    warehouse.con.unregister("raw_rows")
+    return warehouse
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=5000)
+    parser.add_argument("--periods", type=int, default=300, help="maximum months per series")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-sql", action="store_true", help="time the engine only")
+    args = parser.parse_args()
+
+    raw = synthetic_raw(args.series, args.periods)
+    rows = len(raw)
+    series_ids = raw["series_id"].to_numpy()
+    values = raw["value"].to_numpy()
+    print(f"{args.series:,} series, {rows:,} rows")
+
+    seconds = best_of(args.repeat, lambda: engine.evaluate(ANALYTICS_METRICS, series_ids, values))
+    print(f"  engine.evaluate       {seconds:7.3f}s  {rows / seconds:14,.0f} rows/s")
+
+    if not args.skip_sql:
+        warehouse = duckdb_with_raw(raw)
+        sql = analytics_sql(warehouse.table(RAW_TABLE))
+        seconds = best_of(args.repeat, lambda: warehouse.con.execute(sql).df())
+        print(f"  analytics SQL/DuckDB  {seconds:7.3f}s  {rows / seconds:14,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
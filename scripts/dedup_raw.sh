@@ -0,0 +1,65 @@
+#!/usr/bin/env bash
+# One-time cleanup of raw_fred_observations before its primary key is declared.
+#
+# The table is declared with PRIMARY KEY (series_id, observation_date) NOT
+# ENFORCED, and BigQuery's optimizer assumes such keys hold, so duplicate
+# rows left from before ingest collapsed staged duplicates would give wrong
+# joins and aggregates. This keeps the most recently ingested row of each
+# key and checks that none are duplicated; run it before `terraform apply`
+# adds the constraint. It is safe to rerun.
+set -euo pipefail
+
+PROJECT_ID="${GCP_PROJECT_ID:-jobs-dashboard}"
+DATASET="${BQ_DATASET:-labor_market}"
+TABLE="\`${PROJECT_ID}.${DATASET}.raw_fred_observations\`"
+
+duplicate_keys() {
+  bq query --project_id="${PROJECT_ID}" --use_legacy_sql=false --format=csv --quiet "
+    SELECT COUNT(*) FROM (
+      SELECT series_id, observation_date
+      FROM ${TABLE}
+      GROUP BY series_id, observation_date
+      HAVING COUNT(*) > 1
+    )" | tail -n 1
+}
+
+DUPLICATES=$(duplicate_keys)
+echo "==> ${DUPLICATES} duplicated (series_id, observation_date) keys"
+if [ "${DUPLICATES}" -eq 0 ]; then
+  echo "    The key holds, nothing to do."
+  exit 0
+fi
+
+# Rewrites only the duplicated keys, in place, so the table's partitioning,
+# clustering and Terraform-managed settings are kept.
+echo "==> Keeping the newest row of each duplicated key"
+bq query --project_id="${PROJECT_ID}" --use_legacy_sql=false --quiet "
+  BEGIN TRANSACTION;
+  CREATE TEMP TABLE kept AS
+  SELECT raw.*
+  FROM ${TABLE} AS raw
+  JOIN (
+    SELECT series_id, observation_date
+    FROM ${TABLE}
+    GROUP BY series_id, observation_date
+    HAVING COUNT(*) > 1
+  ) USING (series_id, observation_date)
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY series_id, observation_date
+    ORDER BY ingested_at DESC, realtime_start DESC
+  ) = 1;
+  DELETE FROM ${TABLE} AS raw
+  WHERE EXISTS (
+    SELECT 1 FROM kept
+    WHERE kept.series_id = raw.series_id AND kept.observation_date = raw.observation_date
+  );
+  INSERT INTO ${TABLE} SELECT * FROM kept;
+  COMMIT TRANSACTION;
+"
+
+DUPLICATES=$(duplicate_keys)
+if [ "${DUPLICATES}" -ne 0 ]; then
+  echo "!!  ${DUPLICATES} keys are still duplicated; do not declare the primary key." >&2
+  exit 1
+fi
+echo "==> The key holds."
@@ -0,0 +1,212 @@
+"""In-process fake of the BigQuery client calls made by the ingest function.
+
+Covers exactly what ``warehouse.BigQueryWarehouse`` issues: the watermark,
+state, fingerprint, checkpoint and retry-queue queries, the staging load job, the MERGE
+into ``raw_fred_observations`` (from a temp table or, for small deltas, an
+array parameter) and the temp-table delete. Statements are
+recognised by their shape, not parsed, so this fake has to follow any change
+to those queries. Tables live in plain dicts keyed like their MERGE keys.
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "ingest_fred"))
+
+from delta import fingerprint  # noqa: E402
+
+
+class FakeJob:
+    def __init__(self, rows=(), bytes_processed: int = 0):
+        self.job_id = f"fake_{uuid.uuid4().hex[:12]}"
+        self.total_bytes_processed = bytes_processed
+        self._rows = list(rows)
+
+    def result(self):
+        return self._rows
+
+
+def _params(job_config) -> dict:
+    values = {}
+    for param in getattr(job_config, "query_parameters", None) or []:
+        if hasattr(param, "values"):  # ArrayQueryParameter
+            values[param.name] = [
+                getattr(v, "struct_values", v) for v in param.values
+            ]
+        else:
+            values[param.name] = param.value
+    return values
+
+
+def _day(value) -> str:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+class FakeBigQueryClient:
+    """Dict-backed stand-in for ``google.cloud.bigquery.Client``.
+
+    ``raw`` maps ``(series_id, observation_date)`` to
+    ``(value, realtime_start, realtime_end, ingested_at)``; ``state`` maps
+    series_id to FRED last_updated; ``checkpoints`` lists checkpoint rows;
+    ``retries`` maps series_id to its retry-queue entry.
+    """
+
+    ROW_BYTES = 40  # rough scan size per raw row, for bytes_processed
+
+    def __init__(self, project: str | None = None):
+        self.project = project
+        self.raw = {}
+        self.state = {}
+        self.checkpoints = []
+        self.retries = {}
+        self.temp_tables = {}
+        self.jobs = 0
+        self._lock = threading.Lock()
+
+    def _series_rows(self, series_ids, since: str | None = None):
+        wanted = set(series_ids)
+        for (sid, day), row in self.raw.items():
+            if sid in wanted and (since is None or day >= since):
+                yield sid, day, row
+
+    def query(self, sql: str, job_config=None) -> FakeJob:
+        params = _params(job_config)
+        with self._lock:
+            self.jobs += 1
+            if "MERGE" in sql and "_temp_ingest_" in sql:
+                return self._merge_observations(sql, params)
+            if "MERGE" in sql and "UNNEST(@rows)" in sql:
+                return self._merge_rows(params)
+            if "MERGE" in sql and "ingest_series_state" in sql:
+                for state in params["states"]:
+                    self.state[state["series_id"]] = state["fred_last_updated"]
+                return FakeJob()
+            if "ingest_retry_queue" in sql:
+                return self._retry_queue(sql, params)
+            if "INSERT INTO" in sql and "backfill_checkpoints" in sql:
+                for w in params["windows"]:
+                    self.checkpoints.append((params["backfill_id"], w["series_id"], _day(w["window_start"])))
+                return FakeJob()
+            if "backfill_checkpoints" in sql:
+                rows = [
+                    SimpleNamespace(series_id=sid, window_start=date.fromisoformat(start))
+                    for backfill_id, sid, start in self.checkpoints
+                    if backfill_id == params["backfill_id"]
+                ]
+                return FakeJob(rows, len(self.checkpoints) * self.ROW_BYTES)
+            if "ingest_series_state" in sql:
+                rows = [
+                    SimpleNamespace(series_id=sid, fred_last_updated=self.state[sid])
+                    for sid in params["series_ids"] if sid in self.state
+                ]
+                return FakeJob(rows, len(self.state) * self.ROW_BYTES)
+            if "AS fingerprint" in sql:
+                return self._fingerprints(params)
+            if "MAX(observation_date) AS last_date" in sql:
+                last = {}
+                for sid, day, _ in self._series_rows(params["series_ids"]):
+                    last[sid] = max(last.get(sid, day), day)
+                rows = [SimpleNamespace(series_id=sid, last_date=date.fromisoformat(d)) for sid, d in last.items()]
+                return FakeJob(rows, len(self.raw) * self.ROW_BYTES)
+        raise NotImplementedError(f"FakeBigQueryClient does not recognise query:\n{sql}")
+
+    def _retry_queue(self, sql: str, params: dict) -> FakeJob:
+        if "MERGE" in sql:
+            for entry in params["entries"]:
+                previous = self.retries.get(entry["series_id"], {})
+                self.retries[entry["series_id"]] = {
+                    **entry, "first_failed_at": previous.get("first_failed_at", datetime.now(timezone.utc)),
+                }
+            return FakeJob()
+        if "DELETE" in sql:
+            for sid in params["series_ids"]:
+                self.retries.pop(sid, None)
+            return FakeJob()
+        if "next_attempt_at <= @now" in sql:
+            rows = [
+                SimpleNamespace(series_id=sid)
+                for sid, entry in self.retries.items()
+                if entry["status"] == "pending" and entry["next_attempt_at"] <= params["now"]
+            ]
+        else:
+            rows = [
+                SimpleNamespace(**self.retries[sid])
+                for sid in params["series_ids"] if sid in self.retries
+            ]
+        return FakeJob(rows, len(self.retries) * self.ROW_BYTES)
+
+    def _fingerprints(self, params: dict) -> FakeJob:
+        months = {}
+        for sid, day, row in self._series_rows(params["series_ids"], _day(params["since"])):
+            if row[0] is not None:
+                months.setdefault((sid, day[:7]), []).append((day, row[0]))
+        rows = []
+        for (sid, month), observations in months.items():
+            observations.sort()
+            rows.append(SimpleNamespace(
+                series_id=sid,
+                month=month,
+                fingerprint=fingerprint(observations),
+                last_date=date.fromisoformat(observations[-1][0]),
+            ))
+        return FakeJob(rows, len(self.raw) * self.ROW_BYTES)
+
+    def _merge_observations(self, sql: str, params: dict) -> FakeJob:
+        temp = next(name for name in self.temp_tables if name in sql)
+        wanted = set(params["series_ids"])
+        merged = 0
+        ingested_at = datetime.now(timezone.utc)  # stamped by the MERGE
+        for sid, day, value, realtime_start, realtime_end, _ in self.temp_tables[temp]:
+            if sid in wanted:
+                self.raw[(sid, day)] = (value, realtime_start, realtime_end, ingested_at)
+                merged += 1
+        return FakeJob(bytes_processed=(len(self.raw) + merged) * self.ROW_BYTES)
+
+    def _merge_rows(self, params: dict) -> FakeJob:
+        wanted = set(params["series_ids"])
+        merged = 0
+        ingested_at = datetime.now(timezone.utc)
+        for row in params["rows"]:
+            if row["series_id"] in wanted:
+                self.raw[(row["series_id"], _day(row["observation_date"]))] = (
+                    row["value"], _day(row["realtime_start"]), _day(row["realtime_end"]), ingested_at,
+                )
+                merged += 1
+        return FakeJob(bytes_processed=(len(self.raw) + merged) * self.ROW_BYTES)
+
+    def load_table_from_file(self, file_obj, destination: str, job_config=None) -> FakeJob:
+        data = file_obj.read()
+        if data[:4] == b"PAR1":
+            columns = pq.read_table(io.BytesIO(data)).to_pydict()
+            rows = list(zip(
+                columns["series_id"],
+                [d.isoformat() for d in columns["observation_date"]],
+                columns["value"],
+                [_day(d) for d in columns["realtime_start"]],
+                [_day(d) for d in columns["realtime_end"]],
+                columns["ingested_at"],
+            ))
+        else:
+            rows = [
+                tuple(row[k] for k in (
+                    "series_id", "observation_date", "value", "realtime_start", "realtime_end", "ingested_at",
+                ))
+                for row in map(json.loads, data.splitlines())
+            ]
+        with self._lock:
+            self.jobs += 1
+            self.temp_tables[destination] = rows
+        return FakeJob(bytes_processed=len(data))
+
+    def delete_table(self, table: str, not_found_ok: bool = False) -> None:
+        with self._lock:
+            if self.temp_tables.pop(table, None) is None and not not_found_ok:
+                raise KeyError(table)
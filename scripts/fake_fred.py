@@ -0,0 +1,224 @@
+"""Offline stand-in for the FRED series and observations endpoints.
+
+Serves deterministic synthetic histories so ingest can be exercised and
+benchmarked without an API key or network access. Latency, transient 5xx
+errors and bursts of 429s can be injected to exercise the client's retry
+path. ``POST /_advance`` appends one new observation to every series and
+bumps its ``last_updated`` stamp, simulating a FRED release.
+
+    python scripts/fake_fred.py --port 8089 --monthly 19 --weekly 1 --latency 0.05
+
+then run ingest with ``FRED_API_ROOT=http://127.0.0.1:8089/fred`` (see bench_ingest.py).
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STEP_DAYS = {"daily": 1, "weekly": 7}
+
+
+def synthetic_series(series_id: str, frequency: str, start: date, periods: int) -> list[tuple[str, str]]:
+    """``(date, value)`` pairs for a series; about 1% of values are FRED's "." gaps."""
+    seed = int(hashlib.md5(series_id.encode()).hexdigest()[:8], 16)
+    level = 50 + seed % 1000
+    observations = []
+    d = start
+    for i in range(periods):
+        value = "." if (seed + i) % 101 == 0 else f"{level + 0.25 * i + (seed + 7 * i) % 13 * 0.1:.2f}"
+        observations.append((d.isoformat(), value))
+        if frequency == "monthly":
+            d = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+        else:
+            d += timedelta(days=STEP_DAYS[frequency])
+    return observations
+
+
+class FakeFred:
+    """Synthetic FRED data plus fault injection; see ``make_handler``."""
+
+    def __init__(
+        self,
+        series: dict[str, str],
+        years: int = 25,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        burst_every: int = 0,
+        burst_len: int = 0,
+        seed: int = 0,
+    ):
+        start = date(date.today().year - years, 1, 1)
+        periods = {"monthly": 12, "weekly": 52, "daily": 365}
+        self.series = {
+            sid: synthetic_series(sid, frequency, start, periods[frequency] * years)
+            for sid, frequency in series.items()
+        }
+        self.frequency = series
+        self.version = 0
+        self.latency = latency
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_len = burst_len
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.injected = 0
+        self._lock = threading.Lock()
+
+    def advance(self) -> None:
+        with self._lock:
+            self.version += 1
+            for sid, observations in self.series.items():
+                last = date.fromisoformat(observations[-1][0])
+                extra = synthetic_series(sid, self.frequency[sid], last, 2)[1]
+                observations.append(extra)
+
+    def fault(self) -> int | None:
+        """Status code to inject for the next request, if any."""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            if self.burst_every and n % self.burst_every < self.burst_len:
+                self.injected += 1
+                return 429
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.injected += 1
+                return 503
+        return None
+
+    def last_updated(self, series_id: str) -> str:
+        return f"2024-01-01 00:00:{self.version % 60:02d}-06"
+
+    def observations(self, series_id: str, start: str, end: str | None) -> bytes:
+        rows = [
+            {"realtime_start": "2024-01-01", "realtime_end": "2024-01-01", "date": d, "value": v}
+            for d, v in self.series[series_id]
+            if d >= start and (end is None or d <= end)
+        ]
+        return json.dumps({"units": "lin", "count": len(rows), "observations": rows}).encode()
+
+
+def make_handler(fred: FakeFred):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path == "/_advance":
+                fred.advance()
+                self._send(200, json.dumps({"version": fred.version}).encode())
+            else:
+                self._send(404)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/_stats":
+                stats = {"requests": fred.requests, "injected": fred.injected}
+                return self._send(200, json.dumps(stats).encode())
+            if fred.latency:
+                time.sleep(fred.latency)
+            status = fred.fault()
+            if status == 429:
+                return self._send(429, headers={"Retry-After": "0"})
+            if status is not None:
+                return self._send(status)
+
+            series_id = params.get("series_id")
+            if series_id not in fred.series:
+                return self._send(400, b'{"error_message": "Bad Request. The series does not exist."}')
+            if url.path.endswith("/series/observations"):
+                body = fred.observations(
+                    series_id, params.get("observation_start", "1776-07-04"), params.get("observation_end"),
+                )
+            elif url.path.endswith("/series"):
+                body = json.dumps({
+                    "seriess": [{"id": series_id, "last_updated": fred.last_updated(series_id)}],
+                }).encode()
+            else:
+                return self._send(404)
+            self._send(200, body)
+
+    return Handler
+
+
+def serve(port: int = 0, ready=None, **options) -> None:
+    """Serve forever; puts the bound port on ``ready`` (a queue) once listening."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeFred(**options)))
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_port)
+    server.serve_forever()
+
+
+def start_server(**options) -> tuple[multiprocessing.Process, str]:
+    """Run the fake in a child process; returns ``(process, base_url)``.
+
+    A separate process keeps the server's CPU time and allocations out of
+    the ingest measurements.
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, kwargs={"ready": ready, **options}, daemon=True)
+    process.start()
+    port = ready.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def series_spec(monthly: int, weekly: int, daily: int) -> dict[str, str]:
+    spec = {}
+    for frequency, count in (("monthly", monthly), ("weekly", weekly), ("daily", daily)):
+        for i in range(count):
+            spec[f"{frequency[0].upper()}{i:03d}"] = frequency
+    return spec
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--monthly", type=int, default=19)
+    parser.add_argument("--weekly", type=int, default=1)
+    parser.add_argument("--daily", type=int, default=0)
+    parser.add_argument("--years", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--burst-every", type=int, default=0, help="start a 429 burst every N requests")
+    parser.add_argument("--burst-len", type=int, default=0, help="requests per 429 burst")
+
+
+def server_options(args: argparse.Namespace) -> dict:
+    return {
+        "series": series_spec(args.monthly, args.weekly, args.daily),
+        "years": args.years,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "burst_every": args.burst_every,
+        "burst_len": args.burst_len,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    print(f"Fake FRED on http://127.0.0.1:{args.port}/fred/series/observations")
+    serve(args.port, **server_options(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Import a Cloud Function's modules outside its deployment.
+
+Both functions define top-level ``main``, ``config``, ``logs`` and
+``warehouse`` modules, so each function is imported with the other's copies evicted from
+``sys.modules`` and its modules are handed back as a namespace rather than
+imported by name. Used by the tests and by scripts/run_event_pipeline.py.
+"""
+
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+FUNCTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions")
+
+# Module names both functions define; each function gets its own copies
+SHARED_MODULES = ["main", "config", "logs", "warehouse"]
+
+
+def load_function(name: str, modules: tuple[str, ...] = ("main",)) -> SimpleNamespace:
+    """Import ``modules`` from functions/<name> alongside the other function's."""
+    for module in SHARED_MODULES:
+        sys.modules.pop(module, None)
+    path = os.path.join(FUNCTIONS, name)
+    sys.path.insert(0, path)
+    try:
+        return SimpleNamespace(**{module: importlib.import_module(module) for module in modules})
+    finally:
+        sys.path.remove(path)
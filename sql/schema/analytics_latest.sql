@@ -0,0 +1,17 @@
+-- Latest-value snapshot (for reference). The transform builds it as
+-- analytics_latest_<run id> and publishes it through the analytics_latest view.
+-- One row per series: its newest analytics_monthly row and the observation
+-- before it, for the overview scorecard.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.analytics_latest` (
+    series_id             STRING  NOT NULL,
+    observation_date      DATE    NOT NULL,
+    value                 FLOAT64,
+    mom_change            FLOAT64,
+    mom_pct_change        FLOAT64,
+    yoy_change            FLOAT64,
+    yoy_pct_change        FLOAT64,
+    z_score_5y            FLOAT64,
+    prev_observation_date DATE,
+    prev_value            FLOAT64
+)
+CLUSTER BY series_id;
@@ -1,4 +1,5 @@
--- Analytics monthly table (managed by Terraform, this file is for reference).
+-- Analytics monthly table (for reference). The transform builds it as
+-- analytics_monthly_<run id> and publishes it through the analytics_monthly view.
 CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.analytics_monthly` (
     series_id        STRING    NOT NULL,
     observation_date DATE      NOT NULL,
@@ -0,0 +1,18 @@
+-- Weekly analytics table (for reference). The transform builds it as
+-- analytics_weekly_<run id> and publishes it through the analytics_weekly view.
+-- Weekly series (ICSA) with week-based windows; analytics_monthly also holds
+-- them, with its windows sized to the same spans of time.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.analytics_weekly` (
+    series_id        STRING    NOT NULL,
+    observation_date DATE      NOT NULL,
+    value            FLOAT64,
+    wow_change       FLOAT64,
+    wow_pct_change   FLOAT64,
+    yoy_change       FLOAT64,
+    yoy_pct_change   FLOAT64,
+    ma_4w            FLOAT64,
+    iso_year         INT64,
+    week_of_year     INT64
+)
+PARTITION BY DATE_TRUNC(observation_date, MONTH)
+CLUSTER BY series_id;
@@ -0,0 +1,10 @@
+-- Backfill window checkpoints (managed by Terraform, this file is for reference).
+-- One row per (backfill_id, series_id, window) merged successfully.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.backfill_checkpoints` (
+    backfill_id  STRING    NOT NULL,
+    series_id    STRING    NOT NULL,
+    window_start DATE      NOT NULL,
+    window_end   DATE      NOT NULL,
+    rows_loaded  INT64,
+    completed_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,10 @@
+-- Published data versions (managed by Terraform, this file is for reference).
+-- One row per publish of the analytics views: the version (one more than the
+-- previous), when the views were repointed and the table behind each view.
+-- The dashboard caches query results per version.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.data_versions` (
+    version      INT64     NOT NULL,
+    published_at TIMESTAMP NOT NULL,
+    run_id       STRING,
+    tables       STRING    NOT NULL
+);
@@ -0,0 +1,11 @@
+-- Asynchronous ingest jobs (managed by Terraform, this file is for reference).
+-- One row per job; progress and result hold JSON documents.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.ingest_jobs` (
+    job_id     STRING    NOT NULL,
+    status     STRING    NOT NULL,
+    request    STRING,
+    progress   STRING,
+    result     STRING,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
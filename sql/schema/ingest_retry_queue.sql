@@ -0,0 +1,11 @@
+-- Per-series retry queue for failed ingests (managed by Terraform, this file is for reference).
+-- One row per failing series; the row is deleted once the series ingests successfully.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.ingest_retry_queue` (
+    series_id       STRING    NOT NULL,
+    status          STRING    NOT NULL,
+    attempts        INT64     NOT NULL,
+    last_error      STRING,
+    first_failed_at TIMESTAMP NOT NULL,
+    next_attempt_at TIMESTAMP,
+    updated_at      TIMESTAMP NOT NULL
+);
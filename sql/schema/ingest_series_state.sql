@@ -0,0 +1,7 @@
+-- Per-series ingest state (managed by Terraform, this file is for reference).
+-- Stores FRED's last_updated stamp so unchanged series can be skipped.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.ingest_series_state` (
+    series_id         STRING    NOT NULL,
+    fred_last_updated STRING,
+    updated_at        TIMESTAMP NOT NULL
+);
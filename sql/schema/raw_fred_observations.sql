@@ -1,11 +1,14 @@
 -- Raw FRED observations table (managed by Terraform, this file is for reference).
+-- Ingest upserts on (series_id, observation_date), so this is also the
+-- deduplicated current-values layer read by the transform and dashboard.
 CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.raw_fred_observations` (
     series_id        STRING    NOT NULL,
     observation_date DATE      NOT NULL,
     value            FLOAT64,
     realtime_start   DATE,
     realtime_end     DATE,
-    ingested_at      TIMESTAMP NOT NULL
+    ingested_at      TIMESTAMP NOT NULL,
+    PRIMARY KEY (series_id, observation_date) NOT ENFORCED
 )
 PARTITION BY DATE_TRUNC(observation_date, MONTH)
 CLUSTER BY series_id;
@@ -0,0 +1,10 @@
+-- Transform lease (managed by Terraform, this file is for reference).
+-- At most one row per lock name, held by the transform run that took it
+-- until the run releases it or expires_at passes. Runs wait for the lease
+-- before updating and publishing the analytics tables.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.transform_lock` (
+    name        STRING    NOT NULL,
+    holder      STRING    NOT NULL,
+    acquired_at TIMESTAMP NOT NULL,
+    expires_at  TIMESTAMP NOT NULL
+);
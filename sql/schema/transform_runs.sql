@@ -0,0 +1,19 @@
+-- Transform run history (managed by Terraform, this file is for reference).
+-- One row per analytics table per run: its mode, dry-run estimate and the
+-- bytes, slot time and wall time its jobs actually used.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.transform_runs` (
+    run_id          STRING    NOT NULL,
+    run_at          TIMESTAMP NOT NULL,
+    table_name      STRING    NOT NULL,
+    mode            STRING    NOT NULL,
+    series          INT64,
+    rows_merged     INT64,
+    estimated_bytes INT64,
+    bytes_processed INT64,
+    slot_ms         INT64,
+    elapsed_seconds FLOAT64,
+    budget_bytes    INT64,
+    jobs            STRING,
+    data_version    INT64
+)
+PARTITION BY DATE(run_at);
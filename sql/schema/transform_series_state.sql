@@ -0,0 +1,10 @@
+-- Per-series transform watermarks (managed by Terraform, this file is for
+-- reference). One row per analytics table and series: the newest raw
+-- ingested_at of the series the table reflects. Incremental runs recompute
+-- only series with raw rows newer than this.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.transform_series_state` (
+    table_name  STRING    NOT NULL,
+    series_id   STRING    NOT NULL,
+    ingested_at TIMESTAMP NOT NULL,
+    updated_at  TIMESTAMP NOT NULL
+);
@@ -0,0 +1,7 @@
+-- Transform watermarks (managed by Terraform, this file is for reference).
+-- One row per analytics table: the newest raw ingested_at it reflects.
+CREATE TABLE IF NOT EXISTS `jobs-dashboard.labor_market.transform_state` (
+    table_name STRING    NOT NULL,
+    watermark  TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL
+);
@@ -20,41 +20,35 @@ resource "google_bigquery_table" "raw_fred_observations" {
 
   clustering = ["series_id"]
 
+  # One row per key, kept by ingest's upserts (not enforced by BigQuery);
+  # the transform and dashboard read current values straight from this table.
+  table_constraints {
+    primary_key {
+      columns = ["series_id", "observation_date"]
+    }
+  }
+
   schema = jsonencode([
     { name = "series_id", type = "STRING", mode = "REQUIRED", description = "FRED series identifier" },
     { name = "observation_date", type = "DATE", mode = "REQUIRED", description = "Date of observation" },
     { name = "value", type = "FLOAT64", mode = "NULLABLE", description = "Observed value" },
     { name = "realtime_start", type = "DATE", mode = "NULLABLE", description = "FRED real-time period start" },
     { name = "realtime_end", type = "DATE", mode = "NULLABLE", description = "FRED real-time period end" },
-    { name = "ingested_at", type = "TIMESTAMP", mode = "REQUIRED", description = "Ingestion timestamp" },
+    { name = "ingested_at", type = "TIMESTAMP", mode = "REQUIRED", description = "Time of the ingest MERGE that last wrote the row" },
   ])
 }
 
-resource "google_bigquery_table" "analytics_monthly" {
-  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
-  table_id            = "analytics_monthly"
-  project             = var.project_id
-  deletion_protection = false
+# analytics_monthly, analytics_weekly and analytics_latest are views the
+# transform publishes over tables named after each run
+# (analytics_monthly_<run id>, ...), so they are not managed here; their
+# schemas are in sql/schema/. The transform replaces the analytics_monthly
+# table this file used to manage on its first run.
+removed {
+  from = google_bigquery_table.analytics_monthly
 
-  time_partitioning {
-    type  = "MONTH"
-    field = "observation_date"
+  lifecycle {
+    destroy = false
   }
-
-  clustering = ["series_id"]
-
-  schema = jsonencode([
-    { name = "series_id", type = "STRING", mode = "REQUIRED" },
-    { name = "observation_date", type = "DATE", mode = "REQUIRED" },
-    { name = "value", type = "FLOAT64", mode = "NULLABLE" },
-    { name = "mom_change", type = "FLOAT64", mode = "NULLABLE", description = "Month-over-month change" },
-    { name = "mom_pct_change", type = "FLOAT64", mode = "NULLABLE", description = "Month-over-month % change" },
-    { name = "yoy_change", type = "FLOAT64", mode = "NULLABLE", description = "Year-over-year change" },
-    { name = "yoy_pct_change", type = "FLOAT64", mode = "NULLABLE", description = "Year-over-year % change" },
-    { name = "ma_3m", type = "FLOAT64", mode = "NULLABLE", description = "3-month moving average" },
-    { name = "ma_12m", type = "FLOAT64", mode = "NULLABLE", description = "12-month moving average" },
-    { name = "z_score_5y", type = "FLOAT64", mode = "NULLABLE", description = "Z-score vs trailing 5-year window" },
-  ])
 }
 
 resource "google_bigquery_table" "series_metadata" {
@@ -73,3 +67,151 @@ resource "google_bigquery_table" "series_metadata" {
     { name = "category", type = "STRING", mode = "NULLABLE" },
   ])
 }
+
+resource "google_bigquery_table" "ingest_series_state" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "ingest_series_state"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "series_id", type = "STRING", mode = "REQUIRED", description = "FRED series identifier" },
+    { name = "fred_last_updated", type = "STRING", mode = "NULLABLE", description = "FRED last_updated stamp at last successful load" },
+    { name = "updated_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When this row was last written" },
+  ])
+}
+
+resource "google_bigquery_table" "backfill_checkpoints" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "backfill_checkpoints"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "backfill_id", type = "STRING", mode = "REQUIRED", description = "Identifier shared by all attempts of one backfill" },
+    { name = "series_id", type = "STRING", mode = "REQUIRED", description = "FRED series identifier" },
+    { name = "window_start", type = "DATE", mode = "REQUIRED", description = "First date of the window (inclusive)" },
+    { name = "window_end", type = "DATE", mode = "REQUIRED", description = "Last date of the window (inclusive)" },
+    { name = "rows_loaded", type = "INT64", mode = "NULLABLE", description = "Observations merged for this window" },
+    { name = "completed_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the window was checkpointed" },
+  ])
+}
+
+resource "google_bigquery_table" "ingest_jobs" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "ingest_jobs"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "job_id", type = "STRING", mode = "REQUIRED", description = "Identifier returned to the caller" },
+    { name = "status", type = "STRING", mode = "REQUIRED", description = "queued, running, succeeded, partial or failed" },
+    { name = "request", type = "STRING", mode = "NULLABLE", description = "Ingest request body (JSON)" },
+    { name = "progress", type = "STRING", mode = "NULLABLE", description = "Per-series progress (JSON)" },
+    { name = "result", type = "STRING", mode = "NULLABLE", description = "Final ingest response (JSON)" },
+    { name = "created_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the job was submitted" },
+    { name = "updated_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the job row was last written" },
+  ])
+}
+
+resource "google_bigquery_table" "ingest_retry_queue" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "ingest_retry_queue"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "series_id", type = "STRING", mode = "REQUIRED", description = "FRED series identifier" },
+    { name = "status", type = "STRING", mode = "REQUIRED", description = "pending or dead_letter" },
+    { name = "attempts", type = "INT64", mode = "REQUIRED", description = "Consecutive failed ingests" },
+    { name = "last_error", type = "STRING", mode = "NULLABLE", description = "Error from the most recent failure" },
+    { name = "first_failed_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the current failure streak began" },
+    { name = "next_attempt_at", type = "TIMESTAMP", mode = "NULLABLE", description = "When a retry run next picks the series up (null once dead-lettered)" },
+    { name = "updated_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When this row was last written" },
+  ])
+}
+
+resource "google_bigquery_table" "transform_state" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "transform_state"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "table_name", type = "STRING", mode = "REQUIRED", description = "Analytics table maintained by the transform" },
+    { name = "watermark", type = "TIMESTAMP", mode = "NULLABLE", description = "Newest raw ingested_at reflected in the table" },
+    { name = "updated_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When this row was last written" },
+  ])
+}
+
+resource "google_bigquery_table" "transform_series_state" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "transform_series_state"
+  project             = var.project_id
+  deletion_protection = false
+
+  clustering = ["table_name", "series_id"]
+
+  schema = jsonencode([
+    { name = "table_name", type = "STRING", mode = "REQUIRED", description = "Analytics table maintained by the transform" },
+    { name = "series_id", type = "STRING", mode = "REQUIRED", description = "FRED series identifier" },
+    { name = "ingested_at", type = "TIMESTAMP", mode = "REQUIRED", description = "Newest raw ingested_at of the series reflected in the table" },
+    { name = "updated_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When this row was last written" },
+  ])
+}
+
+resource "google_bigquery_table" "transform_runs" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "transform_runs"
+  project             = var.project_id
+  deletion_protection = false
+
+  time_partitioning {
+    type  = "DAY"
+    field = "run_at"
+  }
+
+  schema = jsonencode([
+    { name = "run_id", type = "STRING", mode = "REQUIRED", description = "Transform run identifier" },
+    { name = "run_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the run started" },
+    { name = "table_name", type = "STRING", mode = "REQUIRED", description = "Analytics table updated" },
+    { name = "mode", type = "STRING", mode = "REQUIRED", description = "full, incremental or refused (over budget)" },
+    { name = "series", type = "INT64", mode = "NULLABLE", description = "Series recomputed (null for a full rebuild)" },
+    { name = "rows_merged", type = "INT64", mode = "NULLABLE", description = "Rows written" },
+    { name = "estimated_bytes", type = "INT64", mode = "NULLABLE", description = "Bytes estimated by the dry runs" },
+    { name = "bytes_processed", type = "INT64", mode = "NULLABLE", description = "Bytes processed by the table's jobs" },
+    { name = "slot_ms", type = "INT64", mode = "NULLABLE", description = "Slot-milliseconds of the table's jobs" },
+    { name = "elapsed_seconds", type = "FLOAT64", mode = "NULLABLE", description = "Wall time of the table's update" },
+    { name = "budget_bytes", type = "INT64", mode = "NULLABLE", description = "Per-statement byte budget (null for none)" },
+    { name = "jobs", type = "STRING", mode = "NULLABLE", description = "Per-job statistics (JSON)" },
+    { name = "data_version", type = "INT64", mode = "NULLABLE", description = "Data version published after the run" },
+  ])
+}
+
+resource "google_bigquery_table" "data_versions" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "data_versions"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "version", type = "INT64", mode = "REQUIRED", description = "Data version, increasing by one per publish" },
+    { name = "published_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the views were repointed" },
+    { name = "run_id", type = "STRING", mode = "NULLABLE", description = "Transform run that published the version" },
+    { name = "tables", type = "STRING", mode = "REQUIRED", description = "Table behind each analytics view (JSON)" },
+  ])
+}
+
+resource "google_bigquery_table" "transform_lock" {
+  dataset_id          = google_bigquery_dataset.labor_market.dataset_id
+  table_id            = "transform_lock"
+  project             = var.project_id
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "name", type = "STRING", mode = "REQUIRED", description = "Lock name" },
+    { name = "holder", type = "STRING", mode = "REQUIRED", description = "Transform run holding the lease" },
+    { name = "acquired_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the lease was taken" },
+    { name = "expires_at", type = "TIMESTAMP", mode = "REQUIRED", description = "When the lease lapses if not released" },
+  ])
+}
@@ -42,14 +42,23 @@ resource "google_cloudfunctions2_function" "ingest_fred" {
   }
 
   service_config {
-    max_instance_count    = 1
+    # One coordinator plus INGEST_SHARDS shards, with headroom for a shard
+    # retried while its first attempt's instance is still draining and for a
+    # job worker or scheduled run overlapping the coordinator
+    max_instance_count    = var.ingest_shards + 4
     available_memory      = "512Mi"
     timeout_seconds       = 300
     service_account_email = google_service_account.ingest.email
 
     environment_variables = {
-      GCP_PROJECT = var.project_id
-      BQ_DATASET  = google_bigquery_dataset.labor_market.dataset_id
+      GCP_PROJECT                  = var.project_id
+      BQ_DATASET                   = google_bigquery_dataset.labor_market.dataset_id
+      INGEST_SHARDS                = tostring(var.ingest_shards)
+      INGEST_JOB_DISPATCH          = "tasks"
+      INGEST_TASKS_QUEUE           = google_cloud_tasks_queue.ingest_jobs.id
+      INGEST_TASKS_SERVICE_ACCOUNT = google_service_account.ingest.email
+      INGEST_EVENTS                = "pubsub"
+      INGEST_EVENTS_TOPIC          = google_pubsub_topic.ingest_completed.name
     }
 
     secret_environment_variables {
@@ -67,6 +76,25 @@ resource "google_cloudfunctions2_function" "ingest_fred" {
   ]
 }
 
+# Asynchronous ingest jobs: each task invokes ingest-fred with {"job_id": ...}
+resource "google_cloud_tasks_queue" "ingest_jobs" {
+  name     = "ingest-jobs"
+  location = var.region
+  project  = var.project_id
+
+  rate_limits {
+    max_concurrent_dispatches = 1
+  }
+
+  retry_config {
+    max_attempts = 3
+    min_backoff  = "60s"
+    max_backoff  = "600s"
+  }
+
+  depends_on = [google_project_service.apis["cloudtasks.googleapis.com"]]
+}
+
 # --- Transform analytics function ---
 
 data "archive_file" "transform" {
@@ -105,13 +133,62 @@ resource "google_cloudfunctions2_function" "transform_analytics" {
     service_account_email = google_service_account.ingest.email
 
     environment_variables = {
-      GCP_PROJECT = var.project_id
-      BQ_DATASET  = google_bigquery_dataset.labor_market.dataset_id
+      GCP_PROJECT         = var.project_id
+      BQ_DATASET          = google_bigquery_dataset.labor_market.dataset_id
+      TRANSFORM_MAX_BYTES = tostring(var.transform_max_bytes)
+    }
+  }
+
+  depends_on = [
+    google_project_service.apis["cloudfunctions.googleapis.com"],
+    google_project_service.apis["run.googleapis.com"],
+  ]
+}
+
+# Same source, run for each ingest completion event. Its runs and the HTTP
+# function's take turns through the lease in transform_lock; runs that fail
+# or find it held (see TRANSFORM_LOCK_WAIT_SECONDS) are retried by
+# redelivering the event.
+resource "google_cloudfunctions2_function" "transform_on_ingest" {
+  name     = "transform-on-ingest"
+  location = var.region
+  project  = var.project_id
+
+  build_config {
+    runtime     = "python312"
+    entry_point = "transform_on_ingest"
+    source {
+      storage_source {
+        bucket = google_storage_bucket.functions_source.name
+        object = google_storage_bucket_object.transform_source.name
+      }
+    }
+  }
+
+  service_config {
+    max_instance_count    = 1
+    available_memory      = "512Mi"
+    timeout_seconds       = 300
+    service_account_email = google_service_account.ingest.email
+
+    environment_variables = {
+      GCP_PROJECT         = var.project_id
+      BQ_DATASET          = google_bigquery_dataset.labor_market.dataset_id
+      TRANSFORM_MAX_BYTES = tostring(var.transform_max_bytes)
     }
   }
 
+  event_trigger {
+    trigger_region        = var.region
+    event_type            = "google.cloud.pubsub.topic.v1.messagePublished"
+    pubsub_topic          = google_pubsub_topic.ingest_completed.id
+    retry_policy          = "RETRY_POLICY_RETRY"
+    service_account_email = google_service_account.ingest.email
+  }
+
   depends_on = [
     google_project_service.apis["cloudfunctions.googleapis.com"],
     google_project_service.apis["run.googleapis.com"],
+    google_project_service.apis["eventarc.googleapis.com"],
   ]
 }
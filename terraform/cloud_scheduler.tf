@@ -1,5 +1,7 @@
 # Monthly ingestion: Saturday after first-Friday BLS release (9th-15th), 6 AM ET.
 # FRED updates lag BLS by hours; Saturday morning provides a safe buffer.
+# Submitted as an async job, so the scheduler is acknowledged immediately and
+# the run is retried by the Cloud Tasks queue rather than by this job.
 resource "google_cloud_scheduler_job" "ingest_monthly" {
   name      = "ingest-monthly"
   project   = var.project_id
@@ -10,7 +12,7 @@ resource "google_cloud_scheduler_job" "ingest_monthly" {
   http_target {
     uri         = google_cloudfunctions2_function.ingest_fred.url
     http_method = "POST"
-    body        = base64encode(jsonencode({ backfill = false }))
+    body        = base64encode(jsonencode({ backfill = false, async = true }))
     headers     = { "Content-Type" = "application/json" }
 
     oidc_token {
@@ -55,40 +57,39 @@ resource "google_cloud_scheduler_job" "ingest_weekly" {
   depends_on = [google_project_service.apis["cloudscheduler.googleapis.com"]]
 }
 
-# Transform analytics: 30 minutes after monthly ingestion.
-resource "google_cloud_scheduler_job" "transform_monthly" {
-  name      = "transform-monthly"
+# Hourly retry of series that failed in an earlier ingest run. Only series
+# in the ingest_retry_queue table whose backoff has elapsed are fetched, so
+# most invocations do a single small query and return.
+resource "google_cloud_scheduler_job" "ingest_retry" {
+  name      = "ingest-retry"
   project   = var.project_id
   region    = var.region
-  schedule  = "30 6 9-15 * 6"
+  schedule  = "30 * * * *"
   time_zone = "America/New_York"
 
   http_target {
-    uri         = google_cloudfunctions2_function.transform_analytics.url
+    uri         = google_cloudfunctions2_function.ingest_fred.url
     http_method = "POST"
-    body        = base64encode(jsonencode({}))
+    body        = base64encode(jsonencode({ retry = true }))
     headers     = { "Content-Type" = "application/json" }
 
     oidc_token {
       service_account_email = google_service_account.scheduler.email
-      audience              = google_cloudfunctions2_function.transform_analytics.url
+      audience              = google_cloudfunctions2_function.ingest_fred.url
     }
   }
 
-  retry_config {
-    retry_count          = 2
-    max_backoff_duration = "3600s"
-  }
-
   depends_on = [google_project_service.apis["cloudscheduler.googleapis.com"]]
 }
 
-# Transform after weekly claims ingestion.
-resource "google_cloud_scheduler_job" "transform_weekly" {
-  name      = "transform-weekly"
+# Transform sweep: ingest events normally trigger the transform within
+# seconds (transform-on-ingest). This daily incremental run catches anything
+# an event missed, such as a failed publish or a watermark a scoped run held.
+resource "google_cloud_scheduler_job" "transform_sweep" {
+  name      = "transform-sweep"
   project   = var.project_id
   region    = var.region
-  schedule  = "30 12 * * 4"
+  schedule  = "0 7 * * *"
   time_zone = "America/New_York"
 
   http_target {
@@ -38,6 +38,52 @@ resource "google_secret_manager_secret_iam_member" "ingest_fred_key" {
   member    = "serviceAccount:${google_service_account.ingest.email}"
 }
 
+# The ingest SA enqueues its own job workers and signs their OIDC tokens.
+resource "google_cloud_tasks_queue_iam_member" "ingest_enqueuer" {
+  project  = var.project_id
+  location = var.region
+  name     = google_cloud_tasks_queue.ingest_jobs.name
+  role     = "roles/cloudtasks.enqueuer"
+  member   = "serviceAccount:${google_service_account.ingest.email}"
+}
+
+resource "google_service_account_iam_member" "ingest_act_as_self" {
+  service_account_id = google_service_account.ingest.name
+  role               = "roles/iam.serviceAccountUser"
+  member             = "serviceAccount:${google_service_account.ingest.email}"
+}
+
+resource "google_cloud_run_v2_service_iam_member" "ingest_invoke_self" {
+  project  = var.project_id
+  location = var.region
+  name     = google_cloudfunctions2_function.ingest_fred.service_config[0].service
+  role     = "roles/run.invoker"
+  member   = "serviceAccount:${google_service_account.ingest.email}"
+}
+
+# The ingest SA publishes completion events, and the transform-on-ingest
+# trigger delivers them to the function as this SA.
+resource "google_pubsub_topic_iam_member" "ingest_publisher" {
+  project = var.project_id
+  topic   = google_pubsub_topic.ingest_completed.name
+  role    = "roles/pubsub.publisher"
+  member  = "serviceAccount:${google_service_account.ingest.email}"
+}
+
+resource "google_project_iam_member" "ingest_event_receiver" {
+  project = var.project_id
+  role    = "roles/eventarc.eventReceiver"
+  member  = "serviceAccount:${google_service_account.ingest.email}"
+}
+
+resource "google_cloud_run_v2_service_iam_member" "ingest_invoke_transform_on_ingest" {
+  project  = var.project_id
+  location = var.region
+  name     = google_cloudfunctions2_function.transform_on_ingest.service_config[0].service
+  role     = "roles/run.invoker"
+  member   = "serviceAccount:${google_service_account.ingest.email}"
+}
+
 # --- Dashboard SA permissions ---
 
 resource "google_project_iam_member" "dashboard_bq_viewer" {
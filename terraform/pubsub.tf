@@ -0,0 +1,10 @@
+# Ingest publishes the series each run changed; transform-on-ingest
+# transforms exactly those series as soon as the event arrives.
+resource "google_pubsub_topic" "ingest_completed" {
+  name    = "ingest-completed"
+  project = var.project_id
+
+  message_retention_duration = "86400s"
+
+  depends_on = [google_project_service.apis["pubsub.googleapis.com"]]
+}
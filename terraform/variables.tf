@@ -30,3 +30,15 @@ variable "dashboard_domain" {
   description = "Custom domain for the dashboard Cloud Run service"
   type        = string
 }
+
+variable "transform_max_bytes" {
+  description = "Bytes a single transform statement may process, from its dry run (0 for no budget)"
+  type        = number
+  default     = 10737418240
+}
+
+variable "ingest_shards" {
+  description = "Parallel shard invocations an ingest run fans out to"
+  type        = number
+  default     = 4
+}
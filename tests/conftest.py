@@ -0,0 +1,29 @@
+"""Shared fixtures for the function and script tests.
+
+Each function's modules are loaded with ``function_modules.load_function``
+(see scripts/function_modules.py) and handed to tests as a namespace.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from function_modules import load_function  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def ingest() -> SimpleNamespace:
+    return load_function("ingest_fred", (
+        "main", "config", "warehouse", "coordinator", "delta", "events", "fred_client", "jobs", "metrics",
+        "retries", "staging",
+    ))
+
+
+@pytest.fixture(scope="session")
+def transform() -> SimpleNamespace:
+    return load_function("transform", ("main", "config", "warehouse", "engine", "registry"))
@@ -0,0 +1,37 @@
+"""Configuration and modules the functions keep separate copies of."""
+
+import json
+import os
+import re
+
+SEED = os.path.join(os.path.dirname(__file__), "..", "sql", "seed", "series_metadata.sql")
+FUNCTIONS = os.path.join(os.path.dirname(__file__), "..", "functions")
+
+
+def test_transform_frequencies_match_ingest_config(ingest, transform):
+    ingested = {s["series_id"]: s["frequency"] for s in ingest.config.FRED_SERIES}
+    assert set(transform.config.SERIES_FREQUENCY) <= set(ingested)
+    assert {sid: transform.config.frequency_of(sid) for sid in ingested} == ingested
+    assert set(ingested.values()) <= set(transform.config.PERIODS_PER_YEAR)
+
+
+def test_series_metadata_seed_matches_ingest_config(ingest):
+    ingested = {s["series_id"]: s["frequency"] for s in ingest.config.FRED_SERIES}
+    with open(SEED) as f:
+        seeded = dict(re.findall(r"STRUCT\('(\w+)'.*?'(monthly|weekly|daily)'", f.read()))
+    assert seeded
+    assert {sid: ingested.get(sid) for sid in seeded} == seeded
+
+
+def test_structured_logging_is_shared(ingest, transform, capsys):
+    copies = []
+    for function in ("ingest_fred", "transform"):
+        with open(os.path.join(FUNCTIONS, function, "logs.py")) as f:
+            copies.append(f.read())
+    assert copies[0] == copies[1]
+
+    transform.main._log_over_budget("analytics_monthly", "refused", 10, 5)
+    assert json.loads(capsys.readouterr().out) == {
+        "severity": "WARNING", "message": "transform_over_budget", "event": "transform_over_budget",
+        "table": "analytics_monthly", "action": "refused", "estimated_bytes": 10, "budget_bytes": 5,
+    }
@@ -0,0 +1,553 @@
+"""Ingest building blocks against the offline fakes in scripts/."""
+
+import functools
+import importlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import fake_fred
+from fake_bigquery import FakeBigQueryClient
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+PAYLOAD = json.dumps({
+    "units": "lin",
+    "notes": 'Quoted "observations": [1, 2] and {braces} in a string',
+    "count": 4,
+    "observations": [
+        {"date": "2024-01-01", "value": "1.5", "realtime_start": "2024-02-02"},
+        {"date": "2024-02-01", "value": ".", "realtime_start": "2024-03-01"},
+        {"date": "2024-03-01", "value": "-0.25", "footnote": "naïve café, ±3 σ"},
+        {"date": "2024-04-01", "value": "1e-12", "nested": {"a": [1, {"b": "]"}]}},
+    ],
+}, ensure_ascii=False).encode()
+
+OBSERVATIONS = json.loads(PAYLOAD)["observations"]
+
+
+def split(data: bytes, sizes) -> list[bytes]:
+    chunks = []
+    pos = 0
+    for size in sizes:
+        if pos >= len(data):
+            break
+        chunks.append(data[pos:pos + size])
+        pos += size
+    if pos < len(data):
+        chunks.append(data[pos:])
+    return chunks
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13, 64, len(PAYLOAD)])
+def test_iter_json_array_fixed_chunks(ingest, size):
+    chunks = split(PAYLOAD, [size] * len(PAYLOAD))
+    assert list(ingest.fred_client.iter_json_array(chunks, "observations")) == OBSERVATIONS
+
+
+def test_iter_json_array_random_chunks(ingest):
+    rng = random.Random(0)
+    for _ in range(200):
+        chunks = split(PAYLOAD, [rng.randint(1, 40) for _ in PAYLOAD])
+        assert list(ingest.fred_client.iter_json_array(chunks, "observations")) == OBSERVATIONS
+
+
+def test_iter_json_array_splits_inside_multibyte_character(ingest):
+    at = PAYLOAD.index("ï".encode()) + 1
+    chunks = [PAYLOAD[:at], PAYLOAD[at:]]
+    assert list(ingest.fred_client.iter_json_array(chunks, "observations")) == OBSERVATIONS
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'{"observations": []}', []),
+    (b'{"observations" : [ ] }', []),
+    (b'{"count": 0}', []),
+    (b'', []),
+])
+def test_iter_json_array_empty(ingest, body, expected):
+    assert list(ingest.fred_client.iter_json_array(split(body, [1] * len(body)), "observations")) == expected
+
+
+def test_iter_json_array_truncated_body_raises(ingest):
+    truncated = PAYLOAD[:PAYLOAD.index(b"2024-03-01")]
+    items = ingest.fred_client.iter_json_array(split(truncated, [4] * len(truncated)), "observations")
+    with pytest.raises(json.JSONDecodeError):
+        list(items)
+
+
+def test_parse_retry_after(ingest):
+    parse = ingest.fred_client.parse_retry_after
+    assert parse(None) is None
+    assert parse("") is None
+    assert parse("soon") is None
+    assert parse("0") == 0.0
+    assert parse("2.5") == 2.5
+    assert parse("-3") == 0.0
+    in_30s = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse(in_30s) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(hours=1), usegmt=True)
+    assert parse(past) == 0.0
+
+
+def test_rate_limiter_allows_burst_then_paces(ingest):
+    limiter = ingest.fred_client.RateLimiter(requests_per_minute=600, burst=3)
+    t0 = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - t0 < 0.05
+    for _ in range(3):
+        limiter.acquire()
+    # Three more tokens at 10 per second
+    assert 0.25 <= time.monotonic() - t0 < 1.0
+
+
+@pytest.fixture(scope="module")
+def fred_server():
+    series = {"M000": "monthly", "M001": "monthly", "W000": "weekly"}
+    process, base_url = fake_fred.start_server(series=series, years=3, burst_every=4, burst_len=2)
+    yield base_url, series
+    process.terminate()
+    process.join()
+
+
+def test_client_retries_429_bursts_honouring_retry_after(ingest, fred_server, monkeypatch):
+    base_url, series = fred_server
+    monkeypatch.setattr(ingest.fred_client, "FRED_BASE_URL", f"{base_url}/fred/series/observations")
+    before = requests.get(f"{base_url}/_stats").json()["injected"]
+    client = ingest.fred_client.FredClient("offline", max_retries=4, backoff_base=5.0)
+    try:
+        counts = {sid: len(list(client.iter_observations(sid, "1900-01-01"))) for sid in series}
+        stats = client.stats()
+    finally:
+        client.close()
+
+    assert counts == {"M000": 36, "M001": 36, "W000": 156}
+    injected = requests.get(f"{base_url}/_stats").json()["injected"] - before
+    assert injected > 0
+    assert stats["retries"] == injected
+    # Retry-After: 0 overrides the (here, long) exponential backoff
+    assert stats["retry_seconds"] == 0
+
+
+def test_client_raises_after_last_retry(ingest):
+    process, base_url = fake_fred.start_server(series={"M000": "monthly"}, years=1, error_rate=1.0)
+    client = ingest.fred_client.FredClient("offline", max_retries=2, backoff_base=0.01)
+    try:
+        with pytest.raises(requests.HTTPError):
+            client.get(f"{base_url}/fred/series", {"series_id": "M000"})
+        assert client.stats()["retries"] == 2
+    finally:
+        client.close()
+        process.terminate()
+        process.join()
+
+
+def staged(ingest, rows, fmt="parquet"):
+    """A StagingFile holding ``(series_id, date, value, realtime_start, realtime_end)`` rows."""
+    columns = ingest.staging.ObservationColumns()
+    for row in rows:
+        columns.append(*row)
+    staging = ingest.staging.StagingFile(NOW, fmt=fmt)
+    staging.write(columns)
+    return staging
+
+
+def history(series_id: str, months: int, start: float = 100.0) -> list[tuple]:
+    rows = []
+    for m in range(months):
+        day = f"{2020 + m // 12}-{m % 12 + 1:02d}-01"
+        rows.append((series_id, day, start + m * 0.1 + (m % 7) * 1e-9, day, "9999-12-31"))
+    return rows
+
+
+def raw_values(warehouse) -> dict:
+    """``(series_id, date)`` to ``(value, realtime_start, realtime_end)`` for either backend."""
+    if isinstance(warehouse, FakeBigQueryClient):
+        return {key: row[:3] for key, row in warehouse.raw.items()}
+    rows = warehouse.con.execute(f"""
+        SELECT series_id, observation_date, value, realtime_start, realtime_end
+        FROM {warehouse.dataset}.raw_fred_observations
+    """).fetchall()
+    return {
+        (sid, day.isoformat()): (value, start and start.isoformat(), end and end.isoformat())
+        for sid, day, value, start, end in rows
+    }
+
+
+def filter_rows(ingest, stored, rows):
+    delta = ingest.delta.DeltaFilter(stored)
+    out = []
+    for _, day, value, realtime_start, realtime_end in rows:
+        out += delta.add(day, value, realtime_start, realtime_end)
+    out += delta.flush()
+    return [row[0] for row in out], delta.counts()
+
+
+def test_fingerprint_matches_stored_fingerprints(ingest):
+    rows = history("PAYEMS", 24) + [
+        ("PAYEMS", "2022-01-01", 0.1 + 0.2, None, None),
+        ("PAYEMS", "2022-01-08", -1234567.890123, None, None),
+        ("PAYEMS", "2022-01-15", 1e-12, None, None),
+        ("PAYEMS", "2022-01-22", 123456789012.0, None, None),
+    ]
+    duckdb = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    duckdb.upsert_observations(staged(ingest, rows), ["PAYEMS"])
+    fake = FakeBigQueryClient("test")
+    ingest.warehouse.BigQueryWarehouse("test", "test", client=fake).upsert_observations(
+        staged(ingest, rows), ["PAYEMS"],
+    )
+
+    stored = duckdb.stored_fingerprints(["PAYEMS"], "2000-01-01")["PAYEMS"]
+    assert stored == ingest.warehouse.BigQueryWarehouse("test", "test", client=fake).stored_fingerprints(
+        ["PAYEMS"], "2000-01-01",
+    )["PAYEMS"]
+    for month, (fingerprint, _) in stored.items():
+        month_rows = [(day, value) for _, day, value, _, _ in rows if day.startswith(month)]
+        assert ingest.delta.fingerprint(month_rows) == fingerprint
+
+
+def test_delta_filter_stages_only_changes(ingest):
+    rows = history("UNRATE", 24)
+    duckdb = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    duckdb.upsert_observations(staged(ingest, rows), ["UNRATE"])
+    stored = duckdb.stored_fingerprints(["UNRATE"], "2000-01-01")["UNRATE"]
+
+    assert filter_rows(ingest, stored, rows) == (
+        [], {"rows_inserted": 0, "rows_revised": 0, "rows_unchanged": 24},
+    )
+
+    revised = list(rows)
+    revised[5] = (*rows[5][:2], rows[5][2] + 0.5, *rows[5][3:])
+    appended = [("UNRATE", "2021-12-15", 4.2, None, None), ("UNRATE", "2022-01-01", 4.1, None, None)]
+    days, counts = filter_rows(ingest, stored, revised + appended)
+    assert days == ["2020-06-01", "2021-12-15", "2022-01-01"]
+    assert counts == {"rows_inserted": 2, "rows_revised": 1, "rows_unchanged": 23}
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "json"])
+def test_small_delta_and_batch_merge_agree(ingest, monkeypatch, fmt):
+    initial = history("PAYEMS", 30) + history("ICSA", 30, start=200.0)
+    update = (
+        [(sid, day, value + 1, start, end) for sid, day, value, start, end in initial[10:20]]
+        + history("PAYEMS", 36)[30:]
+        + [("JTSJOL", "2024-01-01", 9.0, None, None)]  # not in series_ids: never merged
+    )
+    series_ids = ["PAYEMS", "ICSA"]
+
+    results = []
+    for small_delta_rows in (10 ** 6, 0):
+        monkeypatch.setattr(ingest.warehouse, "SMALL_DELTA_ROWS", small_delta_rows)
+        client = FakeBigQueryClient("test")
+        warehouse = ingest.warehouse.BigQueryWarehouse("test", "test", client=client)
+        warehouse.upsert_observations(staged(ingest, initial, fmt), series_ids)
+        warehouse.upsert_observations(staged(ingest, update, fmt), series_ids)
+        assert warehouse.metrics.counters["small_delta_writes"] == (
+            2 if small_delta_rows else 0
+        )
+        assert not client.temp_tables
+        results.append(raw_values(client))
+
+    duckdb = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    duckdb.upsert_observations(staged(ingest, initial), series_ids)
+    duckdb.upsert_observations(staged(ingest, update), series_ids)
+
+    assert results[0] == results[1] == raw_values(duckdb)
+    assert len(results[0]) == 66
+    assert results[0][("PAYEMS", "2020-11-01")][0] == pytest.approx(102.0 + 3e-9)
+
+
+@pytest.mark.parametrize("small_delta_rows", [10 ** 6, 0])
+def test_duplicate_staged_keys_keep_one_row(ingest, monkeypatch, small_delta_rows):
+    monkeypatch.setattr(ingest.warehouse, "SMALL_DELTA_ROWS", small_delta_rows)
+    rows = history("PAYEMS", 3) + [("PAYEMS", "2020-02-01", 5.0, "2024-06-01", "9999-12-31")]
+    client = FakeBigQueryClient("test")
+    ingest.warehouse.BigQueryWarehouse("test", "test", client=client).upsert_observations(
+        staged(ingest, rows), ["PAYEMS"],
+    )
+    duckdb = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    duckdb.upsert_observations(staged(ingest, rows), ["PAYEMS"])
+    [(total, keys)] = duckdb.con.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT (series_id, observation_date)) FROM test.raw_fred_observations
+    """).fetchall()
+
+    assert total == keys == 3
+    # The newest real-time period wins
+    for warehouse in (client, duckdb):
+        assert raw_values(warehouse)[("PAYEMS", "2020-02-01")][0] == 5.0
+
+
+def test_sharded_backfill_job_stops_when_a_pass_makes_no_progress(ingest, monkeypatch):
+    warehouse = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    warehouse.create_job("job", {"backfill": True})
+    passes = []
+
+    def run_ingest(request_json, progress=None, worker_url=""):
+        # Like a sharded run: per-series results only, no progress callbacks
+        passes.append(request_json)
+        done = min(len(passes), 2)
+        results = {
+            sid: {"status": "partial", "windows_done": done, "windows_total": 5, "metrics": {}}
+            for sid in ("PAYEMS", "UNRATE")
+        }
+        return {"results": results, "errors": {}, "backfill": {"complete": False}}, 200
+
+    monkeypatch.setattr(ingest.main, "get_warehouse", lambda *args, **kwargs: warehouse)
+    monkeypatch.setattr(ingest.main, "run_ingest", run_ingest)
+    monkeypatch.setattr(ingest.main, "JOB_DISPATCH", "thread")
+
+    assert ingest.main.run_job("job") == {"job_id": "job", "status": "partial"}
+    assert len(passes) == 3
+    job = warehouse.get_job("job")
+    assert job["progress"]["PAYEMS"] == {"status": "partial", "windows_done": 2, "windows_total": 5}
+
+
+class ShardResponse:
+    def __init__(self, status_code: int, headers: dict | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self) -> dict:
+        return {"results": {}}
+
+
+@pytest.fixture
+def shard_posts(ingest, monkeypatch):
+    """Queue of responses ``_post_shard`` will receive, with no real token or HTTP."""
+    import google.oauth2.id_token
+
+    responses = []
+    monkeypatch.setattr(google.oauth2.id_token, "fetch_id_token", lambda request, audience: "token")
+    monkeypatch.setattr(ingest.coordinator.requests, "post", lambda *args, **kwargs: responses.pop(0))
+    monkeypatch.setattr(ingest.coordinator, "SHARD_BACKOFF_SECONDS", 0.01)
+    return responses
+
+
+def test_post_shard_retries_429_and_503(ingest, shard_posts):
+    shard_posts += [ShardResponse(429, {"Retry-After": "0"}), ShardResponse(503), ShardResponse(207)]
+    assert ingest.coordinator._post_shard("http://worker", {}) == ({"results": {}}, 207)
+    assert not shard_posts
+
+
+def test_post_shard_calls_and_authenticates_the_https_url(ingest, monkeypatch):
+    import google.oauth2.id_token
+
+    calls = []
+    monkeypatch.setattr(
+        google.oauth2.id_token, "fetch_id_token", lambda request, audience: calls.append(audience) or "token",
+    )
+    monkeypatch.setattr(
+        ingest.coordinator.requests, "post",
+        lambda url, **kwargs: calls.append((url, kwargs["headers"])) or ShardResponse(200),
+    )
+    ingest.coordinator._post_shard("http://worker", {})
+    assert calls == ["https://worker", ("https://worker", {"Authorization": "Bearer token"})]
+
+
+def test_post_shard_does_not_retry_other_errors(ingest, shard_posts):
+    shard_posts += [ShardResponse(500), ShardResponse(200)]
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        ingest.coordinator._post_shard("http://worker", {})
+    assert len(shard_posts) == 1
+
+
+def test_post_shard_gives_up_after_last_retry(ingest, shard_posts, monkeypatch):
+    monkeypatch.setattr(ingest.coordinator, "SHARD_RETRIES", 2)
+    shard_posts += [ShardResponse(429, {"Retry-After": "0"})] * 4
+    with pytest.raises(RuntimeError, match="HTTP 429"):
+        ingest.coordinator._post_shard("http://worker", {})
+    assert len(shard_posts) == 1
+
+
+def test_sharded_run_publishes_one_event_for_all_shards(ingest, monkeypatch):
+    bodies, events = [], []
+
+    def post_shard(worker_url, body):
+        bodies.append(body)
+        results = {sid: {"status": "ok", "rows_loaded": int(sid != "UNRATE")} for sid in body["series"]}
+        return {
+            "results": results, "errors": {}, "metrics": {"wall_seconds": 0.1}, "fred_client": {},
+            "changed_series": ingest.events.changed_series(results),
+        }, 200
+
+    monkeypatch.setattr(ingest.coordinator, "_post_shard", post_shard)
+    monkeypatch.setattr(ingest.events, "EVENTS_BACKEND", "local")
+    topic = ingest.events.EVENTS_TOPIC
+    ingest.events.local_bus.subscribe(topic, events.append)
+    try:
+        response, _ = ingest.main.run_ingest(
+            {"series": ["PAYEMS", "UNRATE", "ICSA"], "shards": 3}, worker_url="https://ingest",
+        )
+    finally:
+        ingest.events.local_bus.unsubscribe(topic, events.append)
+
+    assert len(bodies) == 3 and not any(body["publish"] for body in bodies)
+    assert [event["series"] for event in events] == [["ICSA", "PAYEMS"]]
+    assert response["changed_series"] == ["ICSA", "PAYEMS"]
+
+
+@pytest.mark.parametrize("k_service, expected", [("ingest-fred", "tasks"), (None, "thread")])
+def test_jobs_dispatch_through_tasks_on_cloud_run(ingest, monkeypatch, k_service, expected):
+    jobs = sys.modules["jobs"]
+    monkeypatch.delenv("INGEST_JOB_DISPATCH", raising=False)
+    if k_service:
+        monkeypatch.setenv("K_SERVICE", k_service)
+    else:
+        monkeypatch.delenv("K_SERVICE", raising=False)
+    try:
+        assert importlib.reload(jobs).JOB_DISPATCH == expected
+    finally:
+        monkeypatch.undo()
+        importlib.reload(jobs)
+
+
+def test_retry_queue_backs_off_dead_letters_and_clears(ingest, monkeypatch):
+    monkeypatch.setattr(ingest.retries, "RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(ingest.retries, "RETRY_BACKOFF_SECONDS", 60)
+    warehouse = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    failed = {"status": "error", "error": "HTTP 500"}
+    ok = {"status": "ok"}
+
+    queued = ingest.retries.update_retry_queue(warehouse, {"PAYEMS": failed, "UNRATE": failed, "ICSA": ok}, NOW)
+    assert sorted(queued) == ["PAYEMS", "UNRATE"]
+    assert warehouse.due_retries(NOW) == []
+    assert sorted(warehouse.due_retries(NOW + timedelta(seconds=60))) == ["PAYEMS", "UNRATE"]
+
+    # Exponential backoff, then dead-lettered at the last attempt
+    queued = ingest.retries.update_retry_queue(warehouse, {"PAYEMS": failed, "UNRATE": ok}, NOW)
+    assert (queued["PAYEMS"]["attempts"], queued["PAYEMS"]["next_attempt_at"]) == (
+        2, (NOW + timedelta(seconds=120)).isoformat(),
+    )
+    assert warehouse.due_retries(NOW + timedelta(days=1)) == ["PAYEMS"]
+    queued = ingest.retries.update_retry_queue(warehouse, {"PAYEMS": failed}, NOW)
+    assert queued["PAYEMS"]["status"] == "dead_letter"
+    assert warehouse.due_retries(NOW + timedelta(days=1)) == []
+
+    # Any later success clears the entry
+    ingest.retries.update_retry_queue(warehouse, {"PAYEMS": ok}, NOW)
+    assert warehouse.retry_entries(["PAYEMS", "UNRATE"]) == {}
+
+
+class StatusRequest:
+    method = "GET"
+
+    def __init__(self, job_id: str):
+        self.args = {"job_id": job_id}
+
+
+def test_async_job_is_acknowledged_then_reports_progress(ingest, monkeypatch):
+    warehouse = ingest.warehouse.DuckDBWarehouse(":memory:", "test")
+    release = threading.Event()
+
+    def run_ingest(request_json, progress=None, worker_url=""):
+        progress("PAYEMS", {"status": "ok", "rows_loaded": 3})
+        release.wait(5)
+        progress("UNRATE", {"status": "ok", "rows_loaded": 0})
+        return {"results": {"PAYEMS": {"status": "ok"}, "UNRATE": {"status": "ok"}}, "errors": {}}, 200
+
+    monkeypatch.setattr(ingest.main, "get_warehouse", lambda *args, **kwargs: warehouse)
+    monkeypatch.setattr(ingest.main, "run_ingest", run_ingest)
+    monkeypatch.setattr(ingest.jobs, "JOB_DISPATCH", "thread")
+    monkeypatch.setattr(ingest.main, "JobProgress", functools.partial(ingest.jobs.JobProgress, interval=0))
+
+    ack = ingest.main.submit_job({"async": True, "series": ["PAYEMS", "UNRATE"]}, "http://ingest/")
+    assert ack["status"] == "queued" and ack["status_url"].endswith(f"?job_id={ack['job_id']}")
+    [worker] = [t for t in threading.enumerate() if t.name == ack["job_id"]]
+    try:
+        deadline = time.monotonic() + 5
+        while warehouse.get_job(ack["job_id"])["progress"].get("PAYEMS") is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        body, status_code, _ = ingest.main.ingest(StatusRequest(ack["job_id"]))
+        status = json.loads(body)
+        assert (status_code, status["status"], status["series_done"]) == (200, "running", 1)
+        assert status["request"] == {"series": ["PAYEMS", "UNRATE"]}
+    finally:
+        release.set()
+        worker.join(5)
+
+    status = json.loads(ingest.main.ingest(StatusRequest(ack["job_id"]))[0])
+    assert (status["status"], status["series_done"]) == ("succeeded", 2)
+    assert ingest.main.ingest(StatusRequest("missing"))[1] == 404
+
+
+def test_job_progress_writes_are_throttled(ingest):
+    writes = []
+
+    class Warehouse:
+        def update_job(self, job_id, status, progress=None):
+            writes.append(progress)
+
+    progress = ingest.jobs.JobProgress(Warehouse(), "job", interval=60)
+    progress("PAYEMS", {"status": "running"})
+    progress("PAYEMS", {"status": "ok", "rows_loaded": 3})
+    progress("UNRATE", {"status": "ok"})
+    assert writes == [{"PAYEMS": {"status": "running"}}]
+
+    progress.flush("succeeded")
+    assert writes[-1] == {"PAYEMS": {"status": "ok", "rows_loaded": 3}, "UNRATE": {"status": "ok"}}
+
+
+def test_shards_balance_frequency_cost(ingest):
+    series = (
+        [{"series_id": f"M{i}", "frequency": "monthly"} for i in range(6)]
+        + [{"series_id": "W0", "frequency": "weekly"}, {"series_id": "W1", "frequency": "weekly"}]
+    )
+    shards = ingest.coordinator.plan_shards(series, 3)
+
+    assert sorted(sid for shard in shards for sid in shard) == sorted(s["series_id"] for s in series)
+    assert [shard[0] for shard in shards[:2]] == ["W0", "W1"]
+    weight = {s["series_id"]: ingest.coordinator.FREQUENCY_WEIGHT[s["frequency"]] for s in series}
+    loads = [sum(weight[sid] for sid in shard) for shard in shards]
+    assert [round(load, 1) for load in loads] == [5.3, 4.3, 5.0]
+    assert ingest.coordinator.plan_shards(series[:2], 5) == [["M0"], ["M1"]]
+
+
+def test_merge_sums_shards_and_fails_only_the_lost_shard(ingest):
+    def shard(series_id, rows, status_code=200):
+        return {
+            "results": {series_id: {"status": "ok", "rows_loaded": rows}},
+            "errors": {},
+            "metrics": {"wall_seconds": 1.0, "rows_loaded": rows},
+            "fred_client": {"requests": 2},
+            "retry_queue": {},
+            "changed_series": [series_id] if rows else [],
+        }, status_code
+
+    response, status_code = ingest.coordinator._merge(
+        [["PAYEMS"], ["UNRATE"], ["ICSA"]],
+        [shard("PAYEMS", 3), shard("UNRATE", 0), RuntimeError("HTTP 500: boom")],
+        time.monotonic(),
+        None,
+    )
+
+    assert status_code == 207
+    assert response["results"]["PAYEMS"]["rows_loaded"] == 3
+    assert response["errors"] == {"ICSA": "shard 2: HTTP 500: boom"}
+    assert response["metrics"]["rows_loaded"] == 3
+    assert response["fred_client"] == {"requests": 4}
+    assert response["changed_series"] == ["PAYEMS"]
+    assert response["metrics"]["shards"][2]["error"] == "HTTP 500: boom"
+
+
+def test_completion_event_names_only_changed_series(ingest):
+    events = []
+    topic = ingest.events.EVENTS_TOPIC
+    ingest.events.local_bus.subscribe(topic, events.append)
+    try:
+        unchanged = {"PAYEMS": {"status": "ok", "rows_loaded": 0}, "UNRATE": {"status": "error"}}
+        assert ingest.events.publish_ingest_completed("test", "incremental", unchanged, NOW) == []
+        assert events == []
+
+        results = {**unchanged, "ICSA": {"status": "ok", "rows_loaded": 2}}
+        assert ingest.events.publish_ingest_completed("test", "incremental", results, NOW) == ["ICSA"]
+    finally:
+        ingest.events.local_bus.unsubscribe(topic, events.append)
+    assert events == [{"mode": "incremental", "series": ["ICSA"], "ingested_at": NOW.isoformat()}]
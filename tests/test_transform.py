@@ -0,0 +1,319 @@
+"""Incremental transform runs against an in-memory DuckDB warehouse."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+ANALYTICS_TABLES = ["analytics_monthly", "analytics_weekly", "analytics_latest"]
+
+
+@pytest.fixture
+def warehouse(transform):
+    warehouse = transform.warehouse.DuckDBWarehouse(":memory:", "labor_market")
+    warehouse.con.execute("""
+        CREATE TABLE labor_market.raw_fred_observations (
+            series_id VARCHAR, observation_date DATE, value DOUBLE, ingested_at TIMESTAMPTZ
+        )
+    """)
+    for sid in ["PAYEMS", "UNRATE", "ICSA"]:
+        step = 7 if sid == "ICSA" else 30
+        warehouse.con.executemany(
+            "INSERT INTO labor_market.raw_fred_observations VALUES (?, ?, ?, ?)",
+            [[sid, date(2000, 1, 1) + timedelta(days=step * i), float(i * i % 17), T0] for i in range(100)],
+        )
+    return warehouse
+
+
+def revise_last(warehouse, series_id: str, ingested_at: datetime) -> None:
+    warehouse.con.execute("""
+        UPDATE labor_market.raw_fred_observations
+        SET value = value + 1, ingested_at = $ingested_at
+        WHERE series_id = $series_id AND observation_date = (
+            SELECT MAX(observation_date) FROM labor_market.raw_fred_observations WHERE series_id = $series_id
+        )
+    """, {"series_id": series_id, "ingested_at": ingested_at})
+
+
+def published(warehouse) -> dict[str, pd.DataFrame]:
+    return {
+        name: warehouse.con.execute(f"SELECT * FROM labor_market.{name} ORDER BY ALL").df()
+        for name in ANALYTICS_TABLES
+    }
+
+
+def assert_matches_full_rebuild(transform, warehouse) -> None:
+    incremental = published(warehouse)
+    transform.main.run_transform(warehouse, full=True)
+    for name, rebuilt in published(warehouse).items():
+        pd.testing.assert_frame_equal(incremental[name], rebuilt, check_exact=False)
+
+
+def test_incremental_runs_match_full_rebuild(transform, warehouse):
+    assert transform.main.run_transform(warehouse)["mode"] == "full"
+    for hours in range(1, 4):
+        revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=hours))
+        result = transform.main.run_transform(warehouse)
+        assert result["mode"] == "incremental"
+        assert "PAYEMS" in result["series"]
+    assert_matches_full_rebuild(transform, warehouse)
+
+
+def test_late_commit_below_watermark_is_picked_up(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    transform.main.run_transform(warehouse)
+
+    # A MERGE that started before PAYEMS's but committed after the transform
+    # read its watermark: the newest stamp does not move.
+    revise_last(warehouse, "UNRATE", T0 + timedelta(hours=1) - timedelta(seconds=30))
+    result = transform.main.run_transform(warehouse)
+    assert "UNRATE" in result["series"]
+    assert_matches_full_rebuild(transform, warehouse)
+
+
+def test_rows_already_processed_are_not_recomputed(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    result = transform.main.run_transform(warehouse)
+    # Only the revised last row is emitted, though every series has rows
+    # stamped within the lookback of the previous watermark
+    assert (result["series"], result["rows_merged"]) == (["PAYEMS"], 1)
+    result = transform.main.run_transform(warehouse)
+    assert (result["series"], result["rows_merged"]) == ([], 0)
+    revise_last(warehouse, "UNRATE", T0 + timedelta(hours=2))
+    result = transform.main.run_transform(warehouse)
+    assert (result["series"], result["rows_merged"]) == (["UNRATE"], 1)
+    assert_matches_full_rebuild(transform, warehouse)
+
+
+def test_lock_is_exclusive_until_released_or_expired(warehouse):
+    assert warehouse.acquire_lock("transform", "run_a", 60)
+    assert warehouse.acquire_lock("transform", "run_a", 60)
+    assert not warehouse.acquire_lock("transform", "run_b", 60)
+    warehouse.release_lock("transform", "run_b")
+    assert not warehouse.acquire_lock("transform", "run_b", 60)
+    warehouse.release_lock("transform", "run_a")
+    # A lease that has already lapsed is free to take
+    assert warehouse.acquire_lock("transform", "run_b", -1)
+    assert warehouse.acquire_lock("transform", "run_a", 60)
+
+
+def test_busy_run_leaves_the_tables_alone(transform, warehouse, monkeypatch):
+    transform.main.run_transform(warehouse)
+    before = published(warehouse)
+    tables = set(warehouse.versions(1)[0]["tables"].values())
+    monkeypatch.setattr(transform.main, "TRANSFORM_LOCK_WAIT", 0)
+    assert warehouse.acquire_lock("transform", "other_run", 60)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    with pytest.raises(transform.main.TransformBusy):
+        transform.main.run_transform(warehouse)
+
+    assert [entry["version"] for entry in warehouse.versions(10)] == [1]
+    [(count,)] = warehouse.query(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name LIKE 'analytics_%' AND table_type = 'BASE TABLE'"
+    )
+    assert count == len(tables)
+    for name, frame in published(warehouse).items():
+        pd.testing.assert_frame_equal(frame, before[name])
+
+
+def test_failed_run_drops_its_tables(transform, warehouse, monkeypatch):
+    transform.main.run_transform(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(transform.main, "update_latest", fail)
+    with pytest.raises(RuntimeError, match="boom"):
+        transform.main.run_transform(warehouse)
+    [(count,)] = warehouse.query(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name LIKE 'analytics_%' AND table_type = 'BASE TABLE'"
+    )
+    assert count == len(ANALYTICS_TABLES)
+    # The lease was released despite the failure
+    assert warehouse.acquire_lock("transform", "next_run", 60)
+
+
+def test_versions_are_not_taken_twice(transform, warehouse):
+    result = transform.main.run_transform(warehouse)
+    run = result["run_id"].removeprefix("transform_")
+    assert warehouse.versions(1)[0]["tables"] == {name: f"{name}_{run}" for name in ANALYTICS_TABLES}
+    assert not warehouse.save_version(1, {}, "other_run", T0)
+    assert warehouse.save_version(2, {}, "other_run", T0)
+    assert not warehouse.save_version(2, {}, "third_run", T0)
+
+
+def test_month_over_month_spans_a_month_of_weekly_rows(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    rows = warehouse.con.execute("""
+        SELECT value, mom_change FROM labor_market.analytics_monthly
+        WHERE series_id = 'ICSA' ORDER BY observation_date
+    """).fetchall()
+    values = [value for value, _ in rows]
+    assert [change for _, change in rows] == [None] * 4 + [b - a for a, b in zip(values, values[4:])]
+
+
+def test_first_publish_replaces_unversioned_tables_with_views(transform, warehouse):
+    warehouse.con.execute("CREATE TABLE labor_market.analytics_monthly AS SELECT 1 AS stale")
+    transform.main.run_transform(warehouse)
+    types = dict(warehouse.query(
+        "SELECT table_name, table_type FROM information_schema.tables WHERE table_name LIKE 'analytics_%'"
+    ))
+    assert all(types[name] == "VIEW" for name in ANALYTICS_TABLES)
+    assert not [name for name in types if name.endswith(transform.warehouse.LEGACY_SUFFIX)]
+
+
+def test_publish_leaves_views_alone_if_the_version_is_taken(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    [current] = warehouse.versions(1)
+    before = published(warehouse)
+    assert warehouse.save_version(2, current["tables"], "other_run", T0)
+    warehouse.con.execute("CREATE TABLE labor_market.analytics_monthly_other AS SELECT 1 AS stale")
+    with pytest.raises(RuntimeError, match="published by another run"):
+        transform.main.publish(warehouse, {"analytics_monthly": "analytics_monthly_other"}, current, "run")
+    for name, frame in published(warehouse).items():
+        pd.testing.assert_frame_equal(frame, before[name])
+
+
+@pytest.fixture
+def estimates(warehouse, monkeypatch):
+    """Dry-run byte estimates for the DuckDB warehouse, which has none:
+    ``create`` for a rebuild, ``merge`` for an incremental MERGE."""
+    sizes = {"create": 1000, "merge": 10}
+    create_table_as, merge_into = warehouse.create_table_as, warehouse.merge_into
+
+    def estimated(run, kind):
+        return lambda *args, dry_run=False, **kwargs: sizes[kind] if dry_run else run(*args, **kwargs)
+
+    monkeypatch.setattr(warehouse, "create_table_as", estimated(create_table_as, "create"))
+    monkeypatch.setattr(warehouse, "merge_into", estimated(merge_into, "merge"))
+    return sizes
+
+
+def test_rebuild_over_budget_falls_back_to_incremental(transform, warehouse, estimates):
+    transform.main.run_transform(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    result = transform.main.run_transform(warehouse, full=True, budget=100)
+
+    monthly = result["tables"]["analytics_monthly"]
+    assert (monthly["mode"], monthly.get("fallback"), monthly["series"]) == ("incremental", True, ["PAYEMS"])
+    assert result["refused"] == [] and result["data_version"] == 2
+    runs = warehouse.query(
+        "SELECT table_name, estimated_bytes, budget_bytes FROM labor_market.transform_runs "
+        "WHERE run_id = @run_id ORDER BY table_name", {"run_id": result["run_id"]},
+    )
+    assert runs == [("analytics_latest", 10, 100), ("analytics_monthly", 10, 100), ("analytics_weekly", 0, 100)]
+    assert_matches_full_rebuild(transform, warehouse)
+
+
+def test_over_budget_updates_are_refused_and_retried(transform, warehouse, estimates, monkeypatch):
+    transform.main.run_transform(warehouse)
+    before = published(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    monkeypatch.setattr(transform.main, "TRANSFORM_OVER_BUDGET", "refuse")
+    result = transform.main.run_transform(warehouse, full=True, budget=100)
+    assert result["refused"] == ["analytics_monthly", "analytics_weekly"]
+    assert result["data_version"] == 1
+    for name, frame in published(warehouse).items():
+        pd.testing.assert_frame_equal(frame, before[name])
+
+    # An incremental MERGE over budget is refused too
+    estimates["merge"] = 1000
+    assert transform.main.run_transform(warehouse, budget=100)["refused"] == ["analytics_monthly"]
+
+    # Refused tables keep their watermark, so the change is picked up later
+    result = transform.main.run_transform(warehouse)
+    assert (result["mode"], result["series"], result["data_version"]) == ("incremental", ["PAYEMS"], 2)
+
+
+def test_first_build_over_budget_is_refused(transform, warehouse, estimates):
+    result = transform.main.run_transform(warehouse, budget=100)
+    assert result["refused"] == ["analytics_monthly", "analytics_weekly"]
+    assert result["data_version"] == 0 and warehouse.versions(1) == []
+
+
+def test_weekly_table_holds_weekly_series_only(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    rows = warehouse.con.execute("""
+        SELECT series_id, value, wow_change, yoy_change FROM labor_market.analytics_weekly
+        ORDER BY observation_date
+    """).fetchall()
+    assert {sid for sid, *_ in rows} == {"ICSA"}
+    values = [value for _, value, _, _ in rows]
+    assert [wow for *_, wow, _ in rows] == [None] + [b - a for a, b in zip(values, values[1:])]
+    assert [yoy for *_, yoy in rows] == [None] * 52 + [b - a for a, b in zip(values, values[52:])]
+
+
+def test_windows_are_sized_by_frequency(transform):
+    registry = transform.registry
+    ma_12m = {"name": "ma_12m", "kind": "mean", "months": 12}
+    assert (registry.window_rows(ma_12m, "monthly"), registry.window_rows(ma_12m, "weekly")) == (12, 52)
+    # z_score_5y reads 5 years of rows including the current one
+    assert registry.lookback_rows(registry.ANALYTICS_METRICS, "monthly") == 59
+    assert registry.lookback_rows(registry.ANALYTICS_METRICS, "weekly") == 259
+    assert registry.lookback_rows(registry.WEEKLY_METRICS, "weekly") == 52
+
+
+def test_latest_snapshot_tracks_the_newest_row_per_series(transform, warehouse):
+    def expected():
+        return warehouse.con.execute("""
+            SELECT series_id, observation_date, value, prev_observation_date, prev_value
+            FROM (
+                SELECT
+                    series_id, observation_date, value,
+                    LAG(observation_date) OVER w AS prev_observation_date,
+                    LAG(value) OVER w AS prev_value,
+                    ROW_NUMBER() OVER (PARTITION BY series_id ORDER BY observation_date DESC) AS rn
+                FROM labor_market.raw_fred_observations
+                WINDOW w AS (PARTITION BY series_id ORDER BY observation_date)
+            )
+            WHERE rn = 1
+            ORDER BY series_id
+        """).fetchall()
+
+    def latest():
+        return warehouse.con.execute("""
+            SELECT series_id, observation_date, value, prev_observation_date, prev_value
+            FROM labor_market.analytics_latest ORDER BY series_id
+        """).fetchall()
+
+    transform.main.run_transform(warehouse)
+    assert latest() == expected()
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    result = transform.main.run_transform(warehouse)
+    assert result["tables"]["analytics_latest"]["series"] == ["PAYEMS"]
+    assert latest() == expected()
+
+
+def test_ingest_event_scopes_the_transform_to_its_series(transform, warehouse):
+    transform.main.run_transform(warehouse)
+    revise_last(warehouse, "PAYEMS", T0 + timedelta(hours=1))
+    revise_last(warehouse, "UNRATE", T0 + timedelta(hours=1))
+    event = {"mode": "incremental", "series": ["PAYEMS"], "ingested_at": (T0 + timedelta(hours=1)).isoformat()}
+
+    result = transform.main.handle_ingest_completed(event, warehouse)
+    assert (result["series"], result["rows_merged"]) == (["PAYEMS"], 1)
+    # UNRATE is left for the run of its own event
+    result = transform.main.handle_ingest_completed({**event, "series": ["UNRATE"]}, warehouse)
+    assert result["series"] == ["UNRATE"]
+    assert_matches_full_rebuild(transform, warehouse)
+
+
+def test_registry_computes_each_window_aggregate_once(transform):
+    metrics = [
+        {"name": "z_score_5y", "kind": "zscore", "months": 60},
+        {"name": "ma_5y", "kind": "mean", "months": 60},
+        {"name": "yoy_change", "kind": "diff", "months": 12},
+        {"name": "yoy_pct_change", "kind": "pct", "months": 12},
+    ]
+    sql = transform.registry.select_sql(metrics, "monthly", "SELECT * FROM raw")
+    assert sql.count("AVG(value) OVER rows_60") == 1
+    assert sql.count("STDDEV(value) OVER rows_60") == 1
+    assert sql.count("LAG(value, 12)") == 1
+    assert sql.count("rows_60 AS (") == 1
+
+    with pytest.raises(ValueError, match="median"):
+        transform.registry.select_sql([{"name": "median_1y", "kind": "median", "months": 12}], "monthly", "raw")
@@ -0,0 +1,142 @@
+"""The Python metric evaluator against the SQL generated from the registry.
+
+Runs the generated SQL (via the DuckDB backend) and ``engine.evaluate``
+over the same raw rows and compares every column: NULLs must match exactly
+and values to a relative tolerance. This covers the analytics_monthly and
+analytics_weekly metrics as built by main.py and EXTRA_METRICS, which
+exercises every metric kind. The input mixes random synthetic series with
+edge cases the SQL handles specially: series shorter than each window, zero
+and negative values (SAFE_DIVIDE, ABS), constant series (zero standard
+deviation), NULL values and a weekly series (ICSA), which uses the weekly
+window sizes.
+"""
+
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+SERIES = 200
+PERIODS = 300
+RTOL = 1e-6
+
+EDGE_CASES = {
+    "EDGE_SHORT": [5.0, 6.0, 7.0],
+    "EDGE_ZEROS": [0.0, 0.0, 1.0, 0.0, -2.0, 0.0] * 15,
+    "EDGE_CONSTANT": [3.25] * 80,
+    "EDGE_NULLS": [float(i) if i % 7 else None for i in range(1, 90)],
+    "EDGE_SIGNS": [(-1) ** i * (i % 13) * 0.5 for i in range(130)],
+    "ICSA": list(2e5 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.05, 600)))),
+}
+
+# Every kind, with windows longer and shorter than the shipped metrics
+EXTRA_METRICS = [
+    {"name": "lag_3", "kind": "lag", "rows": 3},
+    {"name": "ma_24m", "kind": "mean", "months": 24, "round": 4},
+    {"name": "std_12m", "kind": "std", "months": 12},
+    {"name": "min_24m", "kind": "min", "months": 24},
+    {"name": "max_7", "kind": "max", "rows": 7},
+    {"name": "z_score_10y", "kind": "zscore", "months": 120},
+    {"name": "year", "kind": "date_part", "part": "YEAR"},
+    {"name": "month", "kind": "date_part", "part": "MONTH"},
+]
+
+
+def synthetic_raw(n_series: int, periods: int, seed: int = 0) -> pa.Table:
+    """Monthly random walks from 2000-01-01 of varying length and level,
+    like ``bench_transform.synthetic_raw``, plus EDGE_CASES."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(max(1, periods // 2), periods + 1, size=n_series)
+    levels = 10.0 ** rng.uniform(0, 5, size=n_series)
+    ids = list(np.repeat([f"S{i:05d}" for i in range(n_series)], lengths))
+    offsets = [int(m) for n in lengths for m in range(n)]
+    values = list(np.repeat(levels, lengths) * np.exp(np.cumsum(rng.normal(0, 0.01, size=len(offsets)))))
+    for sid, series in EDGE_CASES.items():
+        ids += [sid] * len(series)
+        offsets += range(len(series))
+        values += series
+    return pa.table({
+        "series_id": ids,
+        "observation_date": pa.array([date(2000 + m // 12, m % 12 + 1, 1) for m in offsets], pa.date32()),
+        "value": pa.array(values, pa.float64()),
+        "ingested_at": pa.array(np.full(len(ids), np.datetime64("2024-01-01T00:00:00", "us")),
+                                pa.timestamp("us", tz="UTC")),
+    })
+
+
+@pytest.fixture(scope="module")
+def parity(transform):
+    """DuckDB warehouse holding the raw rows, and the rows in series/date order."""
+    raw = synthetic_raw(SERIES, PERIODS)
+    warehouse = transform.warehouse.DuckDBWarehouse(":memory:", "parity")
+    warehouse.con.register("raw_rows", raw)
+    warehouse.con.execute(f"CREATE TABLE {warehouse.table(transform.main.RAW_TABLE)} AS SELECT * FROM raw_rows")
+    warehouse.con.unregister("raw_rows")
+    ordered = raw.sort_by([("series_id", "ascending"), ("observation_date", "ascending")])
+    series_ids = ordered["series_id"].to_numpy()
+    return {
+        "warehouse": warehouse,
+        "series_ids": series_ids,
+        "values": ordered["value"].to_numpy(zero_copy_only=False),
+        "dates": ordered["observation_date"].to_numpy(),
+        "frequencies": np.array([transform.config.frequency_of(sid) for sid in series_ids]),
+    }
+
+
+def extra_sql(transform, raw_table: str) -> str:
+    """EXTRA_METRICS over every series, grouped by frequency like analytics_sql."""
+    parts = [
+        transform.registry.select_sql(EXTRA_METRICS, frequency, transform.main.FULL_SOURCE.format(
+            raw_table=raw_table, series_filter=transform.main.series_filter(frequency),
+        ))
+        for frequency in transform.config.PERIODS_PER_YEAR
+    ]
+    return "\nUNION ALL\n".join(f"SELECT * FROM ({part})" for part in parts)
+
+
+def checks(transform) -> dict:
+    """Metrics, SQL builder and frequencies covered, per checked table."""
+    frequencies = list(transform.config.PERIODS_PER_YEAR)
+    return {
+        "analytics_monthly": (transform.registry.ANALYTICS_METRICS, transform.main.analytics_sql, frequencies),
+        "analytics_weekly": (transform.registry.WEEKLY_METRICS, transform.main.weekly_sql, ["weekly"]),
+        "extra_metrics": (EXTRA_METRICS, lambda raw_table: extra_sql(transform, raw_table), frequencies),
+    }
+
+
+@pytest.mark.parametrize("check", ["analytics_monthly", "analytics_weekly", "extra_metrics"])
+def test_engine_matches_sql(transform, parity, check):
+    metrics, build_sql, covered = checks(transform)[check]
+    warehouse = parity["warehouse"]
+    warehouse.create_table_as("parity_expected", build_sql(warehouse.table(transform.main.RAW_TABLE)))
+    expected = warehouse.con.execute(
+        f"SELECT * FROM {warehouse.table('parity_expected')} ORDER BY series_id, observation_date"
+    ).df()
+
+    frequencies = parity["frequencies"]
+    in_table = np.isin(frequencies, covered)
+    actual = {m["name"]: np.full(len(frequencies), np.nan) for m in metrics}
+    for frequency in covered:
+        rows = frequencies == frequency
+        if rows.any():
+            evaluated = transform.engine.evaluate(
+                metrics, parity["series_ids"][rows], parity["values"][rows], frequency, parity["dates"][rows],
+            )
+            for name, column in evaluated.items():
+                actual[name][rows] = column
+
+    assert len(expected) == in_table.sum()
+    mismatched = {}
+    for metric in metrics:
+        name = metric["name"]
+        want = expected[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        got = actual[name][in_table]
+        both = ~np.isnan(want) & ~np.isnan(got)
+        # ROUND(x, d) may land on the other side of a tie by one unit
+        atol = 10.0 ** -metric["round"] if "round" in metric else RTOL
+        bad = int((np.isnan(want) != np.isnan(got)).sum())
+        bad += int((~np.isclose(got[both], want[both], rtol=RTOL, atol=atol)).sum())
+        if bad:
+            mismatched[name] = bad
+    assert not mismatched, f"rows differing from the SQL, by metric: {mismatched}"